@@ -1,5 +1,5 @@
 from writer_studio.pipeline import generate_articles
-from writer_studio.renderer import set_specific_feature, set_style as set_renderer_style
+from writer_studio.renderer import RenderContext, set_specific_feature, set_style as set_renderer_style
 from writer_studio.themes import build_style
 
 # ================= 🚀 全局变量与接口 =================
@@ -15,13 +15,22 @@ def set_style(theme_name, author_name=None):
     STYLE = build_style(theme_name, author_name)
     set_renderer_style(STYLE)
 
-def main(target_md=None, input_dir="input", output_dir="output", theme="black_gold", author_name="作者"):
-    set_style(theme, author_name)
+def main(target_md=None, input_dir="input", output_dir="output", theme="black_gold", author_name="作者", workers=None, progress=None):
+    # 每次生成使用独立的渲染上下文，不再修改模块级 STYLE，多个会话可并行生成。
+    style = build_style(theme, author_name)
     print(f"🎨 Theme set to: {theme}")
     
     if author_name:
         print(f"✍️ Author set to: {author_name}")
 
-    generate_articles(target_md=target_md, input_dir=input_dir, output_dir=output_dir, style=STYLE)
+    generate_articles(
+        target_md=target_md,
+        input_dir=input_dir,
+        output_dir=output_dir,
+        style=style,
+        context=RenderContext(style),
+        workers=workers,
+        progress=progress,
+    )
 
 if __name__ == "__main__": main()
@@ -0,0 +1,90 @@
+"""对比文字图正文的两条绘制路径：ImageDraw.text 与字形缓存贴图（social_glyph_atlas）。
+
+用法：
+    ./venv/bin/python3 scripts/bench_glyph_atlas.py [--pages 6] [--theme black_gold]
+
+输出两条路径各自的耗时，以及逐页的像素差异（不同像素数和最大通道差）。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from PIL import Image, ImageChops
+
+from writer_studio.glyph_atlas import GLYPH_ATLAS_STYLE_KEY, clear_glyph_atlases
+from writer_studio.renderers.social_cards import create_social_cards
+from writer_studio.themes import build_style
+
+
+SAMPLE_PARAGRAPH = (
+    "写作是一种**把模糊的想法变清楚**的过程。我们在 2024 年整理了 120 篇文章，"
+    "发现真正有效的表达往往来自反复删改，而不是一次写成。"
+    "Writer Studio 把排版、配图和发布串在一起，让作者把注意力留给内容本身。"
+)
+
+
+def build_markdown(pages):
+    paragraphs = []
+    for index in range(pages * 4):
+        if index % 5 == 0:
+            paragraphs.append(f"## 第 {index // 5 + 1} 部分：重复出现的常用汉字")
+        paragraphs.append(SAMPLE_PARAGRAPH)
+    return "# 字形缓存基准\n\n" + "\n\n".join(paragraphs) + "\n"
+
+
+def render(content, output_dir, style):
+    started = time.perf_counter()
+    paths = create_social_cards(content, output_dir, style, base_name="BENCH")
+    return paths, time.perf_counter() - started
+
+
+def compare(left_path, right_path):
+    with Image.open(left_path) as left, Image.open(right_path) as right:
+        diff = ImageChops.difference(left.convert("RGB"), right.convert("RGB"))
+    changed = diff.width * diff.height - diff.convert("L").histogram()[0]
+    max_delta = max(high for _, high in diff.getextrema())
+    return changed, max_delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=6)
+    parser.add_argument("--theme", default="black_gold")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content = build_markdown(args.pages)
+    base_style = build_style(args.theme, "Benchmark")
+    work_dir = tempfile.mkdtemp(prefix="ws-bench-atlas-")
+    try:
+        results = {}
+        for label, enabled in [("draw.text", False), ("glyph atlas", True)]:
+            style = {**base_style, GLYPH_ATLAS_STYLE_KEY: enabled}
+            clear_glyph_atlases()
+            timings = []
+            for attempt in range(args.repeat):
+                output_dir = os.path.join(work_dir, f"{enabled}-{attempt}")
+                paths, elapsed = render(content, output_dir, style)
+                timings.append(elapsed)
+            results[label] = (paths, timings)
+            print(f"{label:>12}: {len(paths)} 页，首次 {timings[0]:.3f}s，最快 {min(timings):.3f}s")
+
+        baseline_paths, _ = results["draw.text"]
+        atlas_paths, _ = results["glyph atlas"]
+        print("逐页像素差异（不同像素数 / 最大通道差）：")
+        for baseline, atlas in zip(baseline_paths, atlas_paths):
+            changed, max_delta = compare(baseline, atlas)
+            print(f"  {os.path.basename(baseline)}: {changed} / {max_delta}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
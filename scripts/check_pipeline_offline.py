@@ -12,6 +12,8 @@ if ROOT_DIR not in sys.path:
 from PIL import Image
 
 import app
+from writer_studio.renderer import style_subset
+from writer_studio.themes import build_style
 
 
 def assert_true(condition, message):
@@ -19,7 +21,7 @@ def assert_true(condition, message):
         raise AssertionError(message)
 
 
-def generate(input_dir, output_dir, md_name, content):
+def generate(input_dir, output_dir, md_name, content, workers=None):
     with open(os.path.join(input_dir, md_name), 'w', encoding='utf-8') as f:
         f.write(content)
     app.main(
@@ -28,6 +30,7 @@ def generate(input_dir, output_dir, md_name, content):
         output_dir=output_dir,
         theme='black_gold',
         author_name='Pipeline Tester',
+        workers=workers,
     )
 
 
@@ -110,17 +113,40 @@ def test_missing_image_line_kept_verbatim():
         shutil.rmtree(output_dir, ignore_errors=True)
 
 
-def test_asset_filenames_are_stamped_and_unique():
+def test_asset_filenames_are_content_addressed():
     input_dir = tempfile.mkdtemp(prefix='ws-pipe-in-')
     output_dir = tempfile.mkdtemp(prefix='ws-pipe-out-')
     try:
         generate(input_dir, output_dir, 'doc.md', '# A\n\n## B\n\n## C\n\n>> D\n')
         names = asset_names(output_dir, 'doc')
-        pattern = re.compile(r'^(COVER|HEADER|H|Q)_\d+_\d+\.(png|gif)$')
+        pattern = re.compile(r'^(COVER|HEADER|H|Q)_[0-9a-f]{16}\.(png|gif)$')
 
         for name in names:
             assert_true(bool(pattern.match(name)), f'unexpected asset filename format: {name}')
-        assert_true(len(names) == len(set(names)), f'asset filenames should be unique: {names}')
+        assert_true(len(names) == 5, f'each block should get its own asset: {names}')
+
+        shutil.rmtree(Path(output_dir, 'doc'))
+        generate(input_dir, output_dir, 'doc.md', '# A\n\n## B\n\n## C\n\n>> D\n')
+        assert_true(asset_names(output_dir, 'doc') == names, 'same content should produce the same asset names')
+        preview = Path(output_dir, 'doc', 'PREVIEW_doc.html').read_text(encoding='utf-8')
+        assert_true('?t=' not in preview, 'preview should reference stable asset URLs')
+
+        app.main(
+            target_md='doc.md',
+            input_dir=input_dir,
+            output_dir=output_dir,
+            theme='tech_blue',
+            author_name='Pipeline Tester',
+        )
+        assert_true(not set(asset_names(output_dir, 'doc')) & set(names), 'a new theme should rename every asset')
+
+        # 封面和头图画了颗粒，颗粒种子不同画出的像素不同，必须计入文件名
+        style = build_style('black_gold', 'Pipeline Tester')
+        for kind in ('cover', 'header'):
+            assert_true(
+                style_subset(style, kind) != style_subset({**style, 'grain_seed': 7}, kind),
+                f'grain seed should be part of the {kind} fingerprint',
+            )
     finally:
         shutil.rmtree(input_dir, ignore_errors=True)
         shutil.rmtree(output_dir, ignore_errors=True)
@@ -142,13 +168,68 @@ def test_output_dir_is_rebuilt_each_run():
         shutil.rmtree(output_dir, ignore_errors=True)
 
 
+def test_unchanged_blocks_are_reused_on_regeneration():
+    input_dir = tempfile.mkdtemp(prefix='ws-pipe-in-')
+    output_dir = tempfile.mkdtemp(prefix='ws-pipe-out-')
+    try:
+        content = '# 标题\n\n## 第一节\n\n正文有错字。\n\n## 第二节\n\n>> 金句\n'
+        generate(input_dir, output_dir, 'doc.md', content)
+        assets_dir = Path(output_dir, 'doc', 'assets')
+        first = {name: assets_dir.joinpath(name).stat().st_mtime_ns for name in asset_names(output_dir, 'doc')}
+
+        generate(input_dir, output_dir, 'doc.md', content.replace('正文有错字。', '正文没错字。'))
+        second = {name: assets_dir.joinpath(name).stat().st_mtime_ns for name in asset_names(output_dir, 'doc')}
+        assert_true(first == second, f'typo fix should reuse every asset: {first} vs {second}')
+        assert_true('正文没错字。' in read_final(output_dir, 'doc', 'doc.md'), 'FINAL should reflect the edited text')
+
+        gifs_before = re.findall(r'assets/(H_[^)]+)', read_final(output_dir, 'doc', 'doc.md'))
+        generate(input_dir, output_dir, 'doc.md', content.replace('## 第二节', '## 第二节改'))
+        third = asset_names(output_dir, 'doc')
+        gifs_after = re.findall(r'assets/(H_[^)]+)', read_final(output_dir, 'doc', 'doc.md'))
+        assert_true(gifs_before[0] in gifs_after, f'unchanged heading should be reused: {gifs_before} vs {gifs_after}')
+        assert_true(gifs_before[1] not in gifs_after, f'changed heading should be redrawn: {gifs_before} vs {gifs_after}')
+        assert_true(len(third) == len(first), f'stale assets should be pruned: {third}')
+        final = read_final(output_dir, 'doc', 'doc.md')
+        for name in third:
+            if not name.startswith('COVER_'):
+                assert_true(f'assets/{name}' in final, f'kept asset should be referenced in FINAL: {name}')
+    finally:
+        shutil.rmtree(input_dir, ignore_errors=True)
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def test_process_pool_output_matches_serial():
+    input_dir = tempfile.mkdtemp(prefix='ws-pipe-in-')
+    serial_dir = tempfile.mkdtemp(prefix='ws-pipe-out-')
+    pooled_dir = tempfile.mkdtemp(prefix='ws-pipe-out-')
+    try:
+        Image.new('RGB', (48, 48), '#808080').save(os.path.join(input_dir, 'pic.png'))
+        content = '# 标题 | 副标题\n\n' + '\n\n'.join(
+            f'## 第{i}节\n\n正文{i}\n\n>> 金句{i}\n\n![](pic.png)' for i in range(4)
+        )
+        generate(input_dir, serial_dir, 'doc.md', content, workers=0)
+        generate(input_dir, pooled_dir, 'doc.md', content, workers=2)
+
+        assert_true(asset_names(serial_dir, 'doc') == asset_names(pooled_dir, 'doc'), 'pooled run should produce the same assets')
+        assert_true(
+            read_final(serial_dir, 'doc', 'doc.md') == read_final(pooled_dir, 'doc', 'doc.md'),
+            'pooled run should assemble the same markdown in the same order',
+        )
+        assert_true(not any('.tmp' in name for name in asset_names(pooled_dir, 'doc')), 'temp files should be renamed')
+    finally:
+        for path in [input_dir, serial_dir, pooled_dir]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
 def run_check():
     tests = [
         test_block_markers_generate_expected_assets,
         test_local_image_copied_and_rewritten,
         test_missing_image_line_kept_verbatim,
-        test_asset_filenames_are_stamped_and_unique,
+        test_asset_filenames_are_content_addressed,
         test_output_dir_is_rebuilt_each_run,
+        test_unchanged_blocks_are_reused_on_regeneration,
+        test_process_pool_output_matches_serial,
     ]
     for test in tests:
         test()
@@ -1,18 +1,39 @@
+import gc
 import os
 import shutil
 import sys
 import tempfile
+import threading
+import weakref
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
-from PIL import Image
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageSequence, ImageStat
 
 import app
-from writer_studio import renderer
+from writer_studio import advance_tables, grain, image_cache, renderer
+from writer_studio.autofit import fit_font_size, fit_text_width
+from writer_studio import glyph_atlas as glyph_atlas_module
+from writer_studio.glyph_atlas import glyph_atlas
+from writer_studio.fonts import FontRegistry, get_font_registry
+from writer_studio.themes import build_style
+from writer_studio.renderers.social_cards import (
+    carry_bold_state,
+    create_social_cards,
+    extract_social_image_text,
+    measure_social_blocks,
+    paginate_blocks,
+    paginate_measured_blocks,
+    plan_social_pages,
+    load_social_fonts,
+    render_image_to_box,
+    social_page_template,
+)
+from writer_studio.typography import clear_wrap_cache, wrap_cache_info, wrap_text_by_width
 from writer_studio.renderer import (
-    _truetype_cached,
+    RenderContext,
     get_rich_bbox,
     load_font,
     process_text_lines,
@@ -26,13 +47,45 @@ def assert_true(condition, message):
 
 def test_load_font_is_cached():
     app.set_style('black_gold', 'Renderer Tester')
-    _truetype_cached.cache_clear()
+    registry = get_font_registry()
+    registry.clear()
     first = load_font(48)
     second = load_font(48)
-    info = _truetype_cached.cache_info()
+    info = registry.cache_info()
 
     assert_true(first is second, 'same path+size should return the cached font object')
-    assert_true(info.hits >= 1, f'expected at least one cache hit, got {info}')
+    assert_true(info['hits'] >= 1, f'expected at least one cache hit, got {info}')
+
+
+def test_font_registry_resolves_once_and_bounds_faces():
+    font_dir = tempfile.mkdtemp(prefix='ws-fonts-')
+    try:
+        theme_font = get_font_registry().resolve(build_style('black_gold'))
+        if theme_font:
+            shutil.copy(theme_font, os.path.join(font_dir, 'SourceHanSansSC-Medium.otf'))
+        registry = FontRegistry(search_dirs=[font_dir, os.path.join(ROOT_DIR, 'fonts')], cache_size=4)
+        style = build_style('black_gold')
+
+        probes = []
+        original_exists = os.path.exists
+        os.path.exists = lambda path: probes.append(path) or original_exists(path)
+        try:
+            for _ in range(3):
+                registry.resolve(style)
+                registry.resolve(style, 'medium')
+        finally:
+            os.path.exists = original_exists
+        assert_true(len(probes) <= 12, f'font files should be probed once per name: {probes}')
+
+        if theme_font:
+            medium = registry.resolve(style, 'medium')
+            assert_true(medium and medium.startswith(font_dir), f'configured dirs should be searched first: {medium}')
+        for size in range(10, 20):
+            registry.load(size, style)
+        assert_true(registry.cache_info()['faces'] == 4, f'face cache should stay bounded: {registry.cache_info()}')
+        assert_true(registry.warm_up([style]) > 0, 'warm up should preload theme sizes')
+    finally:
+        shutil.rmtree(font_dir, ignore_errors=True)
 
 
 def test_process_text_lines_splits_on_pipe():
@@ -74,12 +127,375 @@ def test_draw_functions_produce_valid_images():
         shutil.rmtree(out_dir, ignore_errors=True)
 
 
+def test_render_contexts_run_in_parallel_threads():
+    app.set_style('black_gold', 'Renderer Tester')
+    global_style = renderer.STYLE
+    out_dir = tempfile.mkdtemp(prefix='ws-render-ctx-')
+    errors = []
+    themes = ['black_gold', 'paper_white', 'tech_blue', 'vintage_press']
+
+    def render(theme):
+        try:
+            context = RenderContext(build_style(theme, 'Thread Tester'))
+            renderer.draw_cover('并行标题', os.path.join(out_dir, f'{theme}.png'), context=context)
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=render, args=(theme,)) for theme in themes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert_true(not errors, f'parallel rendering failed: {errors}')
+        assert_true(renderer.STYLE is global_style, 'explicit contexts should not touch the global style')
+        for theme in themes:
+            expected = Image.new('RGB', (1, 1), build_style(theme)['cover_bg_color']).getpixel((0, 0))
+            with Image.open(os.path.join(out_dir, f'{theme}.png')) as img:
+                actual = img.convert('RGB').getpixel((img.width - 2, img.height // 2))
+            assert_true(
+                all(abs(a - b) <= 12 for a, b in zip(actual, expected)),
+                f'{theme} cover background should come from its own context: {actual} vs {expected}',
+            )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def test_film_grain_is_cached_and_deterministic():
+    grain.clear_noise_cache()
+    base = Image.new('RGB', (320, 180), '#336699')
+    first = grain.add_film_grain(base, seed=7)
+    second = grain.add_film_grain(base.copy(), seed=7)
+    other = grain.add_film_grain(base, seed=8)
+
+    assert_true(first.tobytes() == second.tobytes(), 'same seed should produce identical grain')
+    assert_true(first.tobytes() != other.tobytes(), 'different seeds should produce different grain')
+    assert_true(grain.noise_frame((320, 180), 0.08, 7) is grain.noise_frame((320, 180), 0.08, 7), 'noise frames should be cached')
+
+    for width in range(grain.NOISE_CACHE_SIZE + 4):
+        grain.noise_frame((16 + width, 16), 0.08, 0)
+    assert_true(len(grain._NOISE_CACHE) <= grain.NOISE_CACHE_SIZE, 'noise cache should stay bounded')
+
+    app.set_style('black_gold', 'Renderer Tester')
+    out_dir = tempfile.mkdtemp(prefix='ws-render-grain-')
+    try:
+        paths = [os.path.join(out_dir, f'cover_{index}.png') for index in range(2)]
+        for path in paths:
+            renderer.draw_cover('同一个标题', path)
+        with open(paths[0], 'rb') as a, open(paths[1], 'rb') as b:
+            assert_true(a.read() == b.read(), 'identical covers should be byte-identical PNGs')
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def test_heading_gif_only_emits_ring_deltas():
+    context = RenderContext(build_style('black_gold', 'Renderer Tester'))
+    style = context.style
+    out_dir = tempfile.mkdtemp(prefix='ws-render-gif-')
+    try:
+        gif = os.path.join(out_dir, 'heading.gif')
+        renderer.draw_heading_gif('小节标题 | 第二行', gif, 2, context=context)
+        ring_size = (style['h_num_radius'] + 5) * 2 + 2
+        with Image.open(gif) as img:
+            canvas = img.size
+            extents, frames = [], []
+            for frame in ImageSequence.Iterator(img):
+                extents.append(frame.tile[0][1] if frame.tile else None)
+                frames.append(frame.convert('RGB'))
+        assert_true(len(frames) > 1, f'heading gif should be animated: {len(frames)} frames')
+        assert_true(extents[0] == (0, 0) + canvas, f'first frame should cover the canvas: {extents[0]}')
+        for extent in extents[1:]:
+            assert_true(
+                extent and extent[2] - extent[0] <= ring_size and extent[3] - extent[1] <= ring_size,
+                f'later frames should only carry the ring region: {extent} vs {ring_size}',
+            )
+        assert_true(
+            any(ImageChops.difference(frames[0], frame).getbbox() for frame in frames[1:]),
+            'ring should pulse between frames',
+        )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def test_autofit_matches_linear_scan_with_fewer_measurements():
+    title = '这是一个需要自动缩小字号才能放进封面宽度的很长很长的标题'
+    for max_width in [300, 600, 900, 2000]:
+        calls = []
+
+        def fits(size):
+            calls.append(size)
+            return load_font(size).getlength(title) <= max_width
+
+        linear = 130
+        while not fits(linear) and linear > 60:
+            linear -= 2
+        calls.clear()
+        size = fit_font_size(fits, 130, 60, step=2)
+        assert_true(size == linear, f'bisection should pick the same size as the linear scan: {size} vs {linear}')
+        assert_true(len(calls) <= 8, f'bisection should measure only a few sizes: {calls}')
+
+    size, font = fit_text_width(load_font, title, 600, 130, 60)
+    assert_true(font is load_font(size), 'autofit should return the cached face for the chosen size')
+
+
+def test_glyph_atlas_matches_draw_text():
+    font = load_font(36, build_style('black_gold'))
+    text = 'Writer Studio 把排版、配图和发布串在一起 fox 2024'
+    atlas = glyph_atlas(font)
+    for x in [12, 40.25, 77.75]:
+        expected = Image.new('RGB', (1200, 80), '#F4F4EF')
+        ImageDraw.Draw(expected).text((x, 10), text, font=font, fill='#171717')
+        actual = Image.new('RGB', (1200, 80), '#F4F4EF')
+        width = atlas.draw(ImageDraw.Draw(actual), (x, 10), text, '#171717')
+        assert_true(
+            ImageChops.difference(expected, actual).getbbox() is None,
+            f'glyph atlas output should match ImageDraw.text at x={x}',
+        )
+        assert_true(abs(width - font.getlength(text)) < 0.01, f'atlas advance mismatch: {width}')
+    cached = len(atlas)
+    atlas.draw(ImageDraw.Draw(Image.new('RGB', (1200, 80))), (12, 10), text, '#171717')
+    assert_true(len(atlas) == cached, 'repeated text should reuse cached glyphs')
+
+    original_limit = glyph_atlas_module.MAX_ATLAS_GLYPHS
+    glyph_atlas_module.MAX_ATLAS_GLYPHS = 8
+    try:
+        atlas.draw(ImageDraw.Draw(Image.new('RGB', (1200, 80))), (12, 10), '缓存上限之外的新字形一二三四五', '#171717')
+        assert_true(len(atlas) == 8, f'glyph cache should be bounded: {len(atlas)}')
+    finally:
+        glyph_atlas_module.MAX_ATLAS_GLYPHS = original_limit
+
+    # 缓存不能让字体常驻：字体被释放后对应的字形缓存也要随之回收
+    evicted = ImageFont.truetype(font.path, 37)
+    glyph_atlas(evicted).draw(ImageDraw.Draw(Image.new('RGB', (1200, 80))), (12, 10), text, '#171717')
+    watcher = weakref.ref(evicted)
+    del evicted
+    gc.collect()
+    assert_true(watcher() is None, 'glyph atlas should not keep evicted fonts alive')
+
+
+def test_feature_image_is_reduced_and_cached():
+    out_dir = tempfile.mkdtemp(prefix='ws-render-feature-')
+    try:
+        feature = os.path.join(out_dir, 'feature.jpg')
+        Image.new('RGB', (4000, 3000), '#336699').save(feature, quality=80)
+        image_cache.clear_image_cache()
+        first = image_cache.load_fitted_image(feature, (920, 690))
+        second = image_cache.load_fitted_image(feature, (920, 690))
+        assert_true(first is second, 'same path, mtime and box should reuse the fitted image')
+        assert_true(first.size == (920, 690) and first.mode == 'RGBA', f'unexpected fitted image: {first.size} {first.mode}')
+
+        stat = os.stat(feature)
+        os.utime(feature, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        third = image_cache.load_fitted_image(feature, (920, 690))
+        assert_true(third is not first, 'a modified feature image should be decoded again')
+
+        context = RenderContext(build_style('black_gold', 'Renderer Tester'), 'feature.jpg')
+        header = os.path.join(out_dir, 'header.png')
+        renderer.draw_header('主标题 | 副标题', header, read_time_mins=3, asset_dir=out_dir, context=context)
+        with Image.open(header) as img:
+            center = img.convert('RGB').getpixel((img.width // 2, img.height // 2))
+        assert_true(
+            all(abs(a - b) <= 16 for a, b in zip(center, (0x33, 0x66, 0x99))),
+            f'feature image should be pasted into the header: {center}',
+        )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def test_render_image_to_box_resamples_only_visible_window():
+    out_dir = tempfile.mkdtemp(prefix='ws-render-box-')
+    try:
+        photo = Image.merge('RGB', (
+            Image.radial_gradient('L').resize((3200, 2400)),
+            Image.effect_noise((800, 600), 60).resize((3200, 2400), Image.BICUBIC),
+            Image.linear_gradient('L').resize((3200, 2400)),
+        ))
+        for ext in ('.png', '.jpg'):
+            path = os.path.join(out_dir, f'photo{ext}')
+            photo.save(path)
+            for box, zoom, fit, crop in [
+                ((924, 520), 180, 'cover', (40, -60)),
+                ((500, 700), 140, 'contain', (-100, 100)),
+                ((400, 400), 100, 'contain', (0, 0)),
+            ]:
+                with Image.open(path) as source:
+                    full = source.convert('RGB')
+                zoom_scale = zoom / 100
+                scale = (max if fit == 'cover' else min)(box[0] / full.width, box[1] / full.height) * zoom_scale
+                resized = full.resize((round(full.width * scale), round(full.height * scale)), Image.LANCZOS)
+                if resized.width <= box[0] and resized.height <= box[1]:
+                    expected = Image.new('RGB', box, '#FBFAF5')
+                    expected.paste(resized, ((box[0] - resized.width) // 2, (box[1] - resized.height) // 2))
+                else:
+                    left = round(max(0, resized.width - box[0]) * (crop[0] + 100) / 200)
+                    top = round(max(0, resized.height - box[1]) * (crop[1] + 100) / 200)
+                    expected = resized.crop((left, top, left + box[0], top + box[1]))
+                with Image.open(path) as source:
+                    rendered = render_image_to_box(source, *box, zoom, *crop, fit=fit)
+                assert_true(rendered.size == box and rendered.mode == 'RGB', f'unexpected box image: {rendered.size} {rendered.mode}')
+                mean_diff = sum(ImageStat.Stat(ImageChops.difference(rendered, expected)).mean) / 3
+                assert_true(mean_diff < 1.5, f'windowed resample should match full resize then crop: {ext} {box} {zoom} {mean_diff:.2f}')
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def test_advance_table_matches_freetype_and_persists():
+    font_dir = tempfile.mkdtemp(prefix='ws-advance-')
+    try:
+        source = get_font_registry().resolve(build_style('black_gold'))
+        if not source:
+            return
+        font_path = os.path.join(font_dir, os.path.basename(source))
+        shutil.copy(source, font_path)
+        font = FontRegistry(search_dirs=[font_dir]).face(font_path, 30)
+
+        advance_tables.clear_advance_tables()
+        table = advance_tables.build_advance_table(font)
+        for ch in '中文排版，。A z%「':
+            assert_true(table.advance(ch) == font.getlength(ch), f'advance mismatch for {ch!r}')
+        assert_true(os.path.exists(advance_tables.table_path(advance_tables.table_key(font))), 'table should be saved next to the font')
+
+        advance_tables.clear_advance_tables()
+        loaded = advance_tables.get_advance_table(font)
+        assert_true(loaded is not None and loaded.cjk == table.cjk, 'saved table should load without rebuilding')
+
+        text = '写作是一种把模糊的想法变清楚的过程。Writer Studio 把排版、配图和发布串在一起，' * 4
+        with_table = wrap_text_by_width(text, font, 600)
+        advance_tables.clear_advance_tables()
+        shutil.rmtree(os.path.join(font_dir, advance_tables.ADVANCE_TABLE_DIR))
+        assert_true(with_table == wrap_text_by_width(text, font, 600), 'advance table must not change line breaks')
+    finally:
+        shutil.rmtree(font_dir, ignore_errors=True)
+
+
+def test_social_pagination_wraps_each_block_once():
+    class CountingFont:
+        size = 20
+
+        def __init__(self):
+            self.calls = 0
+
+        def getlength(self, text):
+            self.calls += 1
+            return len(text) * 20
+
+    font = CountingFont()
+    blocks = [
+        {'kind': 'heading', 'text': '小标题', 'block_index': 0, 'keep_with_next': True},
+        {'kind': 'body', 'text': '正文段落需要和小标题放在同一页。' * 6, 'block_index': 1},
+        {'kind': 'heading', 'text': '第二节', 'block_index': 2, 'keep_with_next': True},
+        {'kind': 'body', 'text': '第二段正文同样会被估高一次再正式分页。' * 6, 'block_index': 3},
+    ]
+    clear_wrap_cache()
+    pages = paginate_blocks(blocks, font, font, 400, 30, 20, 100, 1300, {}, font, [])
+    info = wrap_cache_info()
+    assert_true(sum(len(page) for page in pages) == 4, f'every block should be placed: {pages}')
+    assert_true(info['misses'] == 4, f'each block should be wrapped once: {info}')
+    assert_true(info['hits'] == 0, f'keep_with_next should reuse measured heights instead of wrapping again: {info}')
+
+    calls = font.calls
+    paginate_blocks(blocks, font, font, 400, 30, 20, 100, 1300, {}, font, [])
+    assert_true(font.calls == calls, 'repeated pagination should not measure text again')
+    assert_true(wrap_cache_info()['misses'] == 4, f'repeated pagination should only hit the cache: {wrap_cache_info()}')
+
+    measured = measure_social_blocks(blocks, font, font, 400, 30, 1200, {}, font, [])
+    hits = wrap_cache_info()['hits']
+    repaginated = paginate_measured_blocks(measured, 30, 20, 100, 1300)
+    assert_true(wrap_cache_info()['hits'] == hits, 'pagination of measured blocks should not wrap text')
+    def outline(result):
+        return [[(part.block.block_index, part.lines) for part in page] for page in result]
+
+    assert_true(outline(repaginated) == outline(pages), 'pagination of measured blocks should be a pure function of the measurements')
+    assert_true(not hasattr(measured[0], '__dict__'), 'measured blocks should use slots')
+
+
+def test_social_pages_render_in_parallel_with_carried_bold_state():
+    paragraph = '写作是一种把模糊的想法变清楚的过程，我们在长文里反复删改，直到每一句都站得住。'
+    content = '# 并行分页\n\n' + '\n\n'.join([paragraph] * 12) + '\n\n**' + paragraph * 60 + '**\n\n' + '\n\n'.join([paragraph] * 6)
+    style = build_style('black_gold', 'Tester')
+    _, pages = plan_social_pages(extract_social_image_text(content)[1], style)[1:]
+    starts = [False]
+    for layout in pages[:-1]:
+        starts.append(carry_bold_state(layout, starts[-1]))
+    assert_true(any(starts), f'a page inside the bold paragraph should start bold: {starts}')
+
+    work_dir = tempfile.mkdtemp(prefix='ws-social-pool-')
+    try:
+        serial = create_social_cards(content, os.path.join(work_dir, 'serial'), style, base_name='P', workers=0)
+        pooled = create_social_cards(content, os.path.join(work_dir, 'pooled'), style, base_name='P', workers=2)
+        assert_true(len(serial) > 2 and len(serial) == len(pooled), f'page count mismatch: {len(serial)} vs {len(pooled)}')
+        for serial_path, pooled_path in zip(serial, pooled):
+            with Image.open(serial_path) as left, Image.open(pooled_path) as right:
+                assert_true(ImageChops.difference(left, right).getbbox() is None, f'pooled page differs: {pooled_path}')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_social_images_are_probed_and_decoded_once():
+    work_dir = tempfile.mkdtemp(prefix='ws-social-image-cache-')
+    try:
+        Image.new('RGB', (1600, 1200), '#336699').save(os.path.join(work_dir, 'photo.jpg'), quality=85)
+        paragraph = '写作是一种把模糊的想法变清楚的过程。'
+        content = f'# 图片缓存\n\n{paragraph}\n\n![同一张图](photo.jpg)\n\n{paragraph}\n\n![同一张图](photo.jpg)\n\n{paragraph}'
+        style = build_style('black_gold', 'Tester')
+        image_cache.clear_image_cache()
+        create_social_cards(content, os.path.join(work_dir, 'first'), style, base_name='C', image_dirs=[work_dir], workers=0)
+        info = image_cache.image_cache_info()
+        assert_true(info['info']['misses'] == 1, f'the image header should be read once: {info}')
+        assert_true(info['pixels']['misses'] == 1 and info['pixels']['hits'] >= 1, f'the same box should be decoded once: {info}')
+
+        create_social_cards(content, os.path.join(work_dir, 'second'), style, base_name='C', image_dirs=[work_dir], workers=0)
+        again = image_cache.image_cache_info()
+        assert_true(again['info']['misses'] == 1 and again['pixels']['misses'] == 1, f'regeneration should reuse cached pixels: {again}')
+        assert_true(image_cache.image_size(os.path.join(work_dir, 'photo.jpg')) == (1600, 1200), 'cached size should match the file')
+    finally:
+        image_cache.clear_image_cache()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_social_page_template_is_drawn_once_per_style_and_date():
+    style = build_style('black_gold', 'Tester')
+    chrome_fonts = load_social_fonts(style)[3:]
+    first = social_page_template(style, *chrome_fonts, '2026.01.01')
+    assert_true(social_page_template(style, *chrome_fonts, '2026.01.01') is first, 'same style and date should reuse the template')
+    assert_true(social_page_template(style, *chrome_fonts, '2026.01.02') is not first, 'a new date should redraw the header')
+    draft = social_page_template(style, *load_social_fonts(style, 0.5)[3:], '2026.01.01', 0.5)
+    assert_true(draft.size == (first.width // 2, first.height // 2), f'draft template should be scaled: {draft.size}')
+
+    work_dir = tempfile.mkdtemp(prefix='ws-social-template-')
+    try:
+        content = '# 模板\n\n' + '\n\n'.join(['写作是一种把模糊的想法变清楚的过程。' * 6] * 10)
+        pages = create_social_cards(content, work_dir, style, base_name='T', workers=0)
+        with Image.open(pages[0]) as page_one, Image.open(pages[1]) as page_two:
+            header_box = (0, 0, page_one.width, style.get('social_margin_top', 76) + 72)
+            assert_true(
+                ImageChops.difference(page_one.crop(header_box), page_two.crop(header_box)).getbbox() is None,
+                'pages should share the same header',
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
 def run_check():
     tests = [
         test_load_font_is_cached,
+        test_font_registry_resolves_once_and_bounds_faces,
         test_process_text_lines_splits_on_pipe,
         test_get_rich_bbox_ignores_bold_markers,
         test_draw_functions_produce_valid_images,
+        test_render_contexts_run_in_parallel_threads,
+        test_film_grain_is_cached_and_deterministic,
+        test_heading_gif_only_emits_ring_deltas,
+        test_autofit_matches_linear_scan_with_fewer_measurements,
+        test_glyph_atlas_matches_draw_text,
+        test_feature_image_is_reduced_and_cached,
+        test_render_image_to_box_resamples_only_visible_window,
+        test_advance_table_matches_freetype_and_persists,
+        test_social_pagination_wraps_each_block_once,
+        test_social_pages_render_in_parallel_with_carried_bold_state,
+        test_social_images_are_probed_and_decoded_once,
+        test_social_page_template_is_drawn_once_per_style_and_date,
     ]
     for test in tests:
         test()
@@ -6,7 +6,15 @@ ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
-from writer_studio.typography import auto_format_text, meaningful_length, wrap_text_by_width
+from writer_studio.typography import (
+    auto_format_text,
+    format_document,
+    meaningful_length,
+    refine_wrapped_lines,
+    tokenize_wrap_text,
+    wrap_text_by_width,
+    wrap_text_optimal,
+)
 
 
 class FakeFont:
@@ -14,6 +22,30 @@ class FakeFont:
         return len(text) * 10
 
 
+class KerningFont:
+    size = 10
+
+    def getlength(self, text):
+        return len(text) * 10 - text.count("V中") * 3
+
+
+def naive_wrap_breaks(text, font, max_width):
+    lines = []
+    current = ""
+    for token in tokenize_wrap_text(text):
+        if token.isspace() and not current:
+            continue
+        candidate = current + token
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current.rstrip())
+            current = token.lstrip()
+        else:
+            current = candidate
+    if current:
+        lines.append(current.rstrip())
+    return refine_wrapped_lines(lines, font, max_width)
+
+
 CASES = {
     "这是一个**test**测试。": "这是一个 **test** 测试。",
     "测试“引号”测试": "测试「引号」测试",
@@ -40,6 +72,20 @@ def run_check():
         )
         raise AssertionError(f"Text formatting check failed:\n{details}")
 
+    document = "\n".join([
+        "# 标题“Title”",
+        "  ![图1说明](images/图1.png){layout=side}",
+        "正文“跨",
+        "行”用Python写**bold**字",
+        "- 列表‘单引号’和\"直引号\"与“落单",
+    ])
+    expected_document = "\n".join(
+        line if line.strip().startswith("![") else auto_format_text(line)
+        for line in document.split("\n")
+    )
+    if format_document(document) != expected_document:
+        raise AssertionError(f"format_document should match per-line formatting: {format_document(document)!r}")
+
     wrapped = wrap_text_by_width("梁泽祖把车停下，打开 OPPO 手机。", FakeFont(), 110)
     if any(line.startswith(("，", "。", "！", "？", "；", "：", "、")) for line in wrapped):
         raise AssertionError(f"closing punctuation should not start a line: {wrapped}")
@@ -54,6 +100,33 @@ def run_check():
     if meaningful_length(short_line[-1]) < 3:
         raise AssertionError(f"last line should have at least 3 meaningful chars: {short_line}")
 
+    kerned = "AV中文AV中AV中测试 AV中排版AV中AV中断行 AV中"
+    for max_width in [60, 77, 97, 120]:
+        expected = naive_wrap_breaks(kerned, KerningFont(), max_width)
+        actual = wrap_text_by_width(kerned, KerningFont(), max_width)
+        if actual != expected:
+            raise AssertionError(f"incremental wrap should match whole-line measurement at {max_width}: {actual} vs {expected}")
+
+    paragraph = "梁泽祖把车停下，打开 OPPO 手机。「这是一个重要判断」。2025 年的一个工作日下午一点多。"
+    for max_width in [70, 110, 125, 160]:
+        optimal = wrap_text_optimal(paragraph, FakeFont(), max_width)
+        if "".join(optimal).replace(" ", "") != paragraph.replace(" ", ""):
+            raise AssertionError(f"optimal wrap should keep every character: {optimal}")
+        if any(FakeFont().getlength(line.rstrip("，。」")) > max_width for line in optimal):
+            raise AssertionError(f"optimal wrap should respect max width {max_width}: {optimal}")
+        if any(line.startswith(("，", "。", "！", "？", "；", "：", "、", "」")) for line in optimal[1:]):
+            raise AssertionError(f"closing punctuation should not start a line: {optimal}")
+        if len(optimal) > 1 and meaningful_length(optimal[-1]) < 3:
+            raise AssertionError(f"last line should have at least 3 meaningful chars: {optimal}")
+
+    for trailing in ["abc def ghi  ", "一二三四五六 "]:
+        optimal = wrap_text_optimal(trailing, FakeFont(), 50)
+        greedy = wrap_text_by_width(trailing, FakeFont(), 50)
+        if "".join(optimal).replace(" ", "") != "".join(greedy).replace(" ", ""):
+            raise AssertionError(f"trailing whitespace should be dropped like the greedy wrap: {optimal} vs {greedy}")
+        if any(line != line.strip() for line in optimal):
+            raise AssertionError(f"optimal lines should not keep trailing whitespace: {optimal}")
+
     print("text-formatting-ok")
 
 
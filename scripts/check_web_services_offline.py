@@ -1,6 +1,7 @@
 import os
 import shutil
 import sys
+import zipfile
 from pathlib import Path
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -9,8 +10,10 @@ if ROOT_DIR not in sys.path:
 
 from PIL import Image
 
-from writer_studio import web_services
+from writer_studio import jobs, web_services
 from writer_studio.file_safety import get_session_paths, sanitize_session_id
+from writer_studio.renderers.social_cards import load_social_fonts
+from writer_studio.themes import build_style
 
 
 class FakeUploadFile:
@@ -123,7 +126,24 @@ def test_generate_social_image_returns_artifacts():
         assert_true(len(image_artifacts) == len(result['image_urls']), 'image artifact count should match image URLs')
         assert_true(len(zip_artifacts) == 1, 'social zip artifact missing')
         assert_true(result['zip_url'] == zip_artifacts[0]['url'], 'zip URL should match zip artifact')
-        assert_true(Path(output_dir, 'social article', zip_artifacts[0]['filename']).exists(), 'zip file should exist')
+        zip_path = Path(output_dir, 'social article', zip_artifacts[0]['filename'])
+        assert_true(not zip_path.exists(), 'zip should only be built when it is downloaded')
+        _, aborted = web_services.open_social_zip(session_id, 'social article', zip_artifacts[0]['filename'])
+        next(aborted)
+        aborted.close()
+        leftovers = list(Path(output_dir, 'social article').glob('*.tmp'))
+        assert_true(not zip_path.exists() and not leftovers, f'an aborted download should leave no zip: {leftovers}')
+        cached_path, chunks = web_services.open_social_zip(session_id, 'social article', zip_artifacts[0]['filename'])
+        assert_true(cached_path is None, 'first download should stream the zip')
+        streamed = b''.join(chunks)
+        assert_true(zip_path.read_bytes() == streamed, 'streamed zip should be cached on disk')
+        with zipfile.ZipFile(zip_path) as archive:
+            infos = archive.infolist()
+            assert_true(len(infos) == result['page_count'], 'zip should contain every page')
+            assert_true(all(info.compress_type == zipfile.ZIP_STORED for info in infos), 'pages should be stored uncompressed')
+            assert_true(archive.testzip() is None, 'streamed zip should be valid')
+        cached_path, chunks = web_services.open_social_zip(session_id, 'social article', zip_artifacts[0]['filename'])
+        assert_true(cached_path == str(zip_path) and chunks is None, 'unchanged pages should reuse the cached zip')
         assert_true(isinstance(result['quality_checks'], list), 'quality checks should be returned')
         assert_true(isinstance(result['page_layout'], list), 'page layout should be returned')
         assert_true(result['page_layout'], 'page layout should not be empty')
@@ -138,6 +158,148 @@ def test_generate_social_image_returns_artifacts():
         cleanup_session(session_id)
 
 
+def test_social_layout_matches_generated_pages_without_drawing():
+    session_id = 'web-services-offline-social-layout'
+    cleanup_session(session_id)
+    try:
+        input_dir, output_dir = get_session_paths(session_id)
+        Path(input_dir).mkdir(parents=True, exist_ok=True)
+        Image.new('RGB', (900, 520), '#dce5dc').save(Path(input_dir, 'demo.png'))
+        paragraph = '梁泽祖把车停下，打开 OPPO 手机，开始理解那些用手机的人。这是一段用于测试分页预览的正文。'
+        payload = {
+            'filename': 'layout article',
+            'session_id': session_id,
+            'theme': 'editorial_card',
+            'social_block_controls': {
+                '2': {'order': 2, 'page_break_before': True},
+                '4': {'order': 4, 'keep_with_next': True},
+            },
+            'content': '# 标题\n\n## 小标题\n\n' + '\n\n'.join([paragraph] * 6) + '\n\n![样图](demo.png)\n\n' + '\n\n'.join([paragraph] * 6),
+        }
+        layout = web_services.social_layout(payload)
+        assert_true(layout['status'] == 'success', f'social layout failed: {layout}')
+        assert_true(not Path(output_dir, 'layout article').exists(), 'layout-only request should not write images')
+
+        generated = web_services.generate_social_image(payload)
+        assert_true(layout['page_layout'] == generated['page_layout'], 'layout preview should match generated pages')
+        assert_true(layout['page_count'] == generated['page_count'], 'layout page count should match generated pages')
+        assert_true(layout['quality_checks'] == generated['quality_checks'], 'layout quality checks should match generation')
+    finally:
+        cleanup_session(session_id)
+
+
+def test_social_regeneration_reuses_unchanged_pages():
+    session_id = 'web-services-offline-social-reuse'
+    cleanup_session(session_id)
+    try:
+        paragraphs = [f'第 {index} 段：梁泽祖把车停下，打开 OPPO 手机，开始理解那些用手机的人。' * 2 for index in range(24)]
+        payload = {
+            'filename': 'reuse article',
+            'session_id': session_id,
+            'theme': 'editorial_card',
+            'content': '# 标题\n\n' + '\n\n'.join(paragraphs),
+        }
+        first = web_services.generate_social_image(payload)
+        assert_true(first['page_count'] > 2, f'reuse check needs several pages: {first["page_count"]}')
+        assert_true(all(first['image_changed']), 'first generation should draw every page')
+
+        _, output_dir = get_session_paths(session_id)
+        zip_path = Path(output_dir, 'reuse article', first['zip_filename'])
+        b''.join(web_services.open_social_zip(session_id, 'reuse article', first['zip_filename'])[1])
+        second = web_services.generate_social_image(payload)
+        assert_true(second['image_urls'] == first['image_urls'], 'unchanged pages should keep their URLs')
+        assert_true(not any(second['image_changed']), 'unchanged pages should be reused')
+        cached_path, _ = web_services.open_social_zip(session_id, 'reuse article', second['zip_filename'])
+        assert_true(cached_path == str(zip_path), 'zip should be reused when no page changed')
+
+        paragraphs[-1] = '最后一段改过了。'
+        third = web_services.generate_social_image({**payload, 'content': '# 标题\n\n' + '\n\n'.join(paragraphs)})
+        assert_true(third['image_changed'][0] is False, 'pages before the edit should be reused')
+        assert_true(third['image_changed'][-1] is True, 'the edited page should be redrawn')
+        assets_dir = Path(output_dir, 'reuse article', 'assets')
+        page_files = sorted(path.name for path in assets_dir.glob('SOCIAL_*.png'))
+        current_files = sorted(url.rsplit('/', 1)[-1] for url in third['image_urls'])
+        assert_true(page_files == current_files, f'stale pages should be pruned: {page_files}')
+        cached_path, chunks = web_services.open_social_zip(session_id, 'reuse article', third['zip_filename'])
+        assert_true(cached_path is None, 'changed pages should invalidate the cached zip')
+        b''.join(chunks)
+        with zipfile.ZipFile(zip_path) as archive:
+            assert_true(len(archive.namelist()) == third['page_count'], 'zip should be rebuilt with the new pages')
+
+        # 字体文件原地替换（路径不变、修改时间变了）时所有页面都要重画
+        font_path = load_social_fonts(build_style('editorial_card'))[0].path
+        font_stat = os.stat(font_path)
+        os.utime(font_path, ns=(font_stat.st_atime_ns, font_stat.st_mtime_ns + 1_000_000_000))
+        try:
+            replaced = web_services.generate_social_image({**payload, 'content': '# 标题\n\n' + '\n\n'.join(paragraphs)})
+        finally:
+            os.utime(font_path, ns=(font_stat.st_atime_ns, font_stat.st_mtime_ns))
+        assert_true(all(replaced['image_changed']), 'a replaced font file should redraw every page')
+    finally:
+        cleanup_session(session_id)
+
+
+def test_social_preview_quality_draws_scaled_drafts():
+    session_id = 'web-services-offline-social-preview'
+    cleanup_session(session_id)
+    try:
+        payload = {
+            'filename': 'preview article',
+            'session_id': session_id,
+            'theme': 'editorial_card',
+            'content': '# 标题\n\n' + '\n\n'.join(f'第 {index} 段：**梁泽祖**把车停下，打开 OPPO 手机。' * 3 for index in range(16)),
+        }
+        preview = web_services.generate_social_image({**payload, 'quality': 'preview'})
+        full = web_services.generate_social_image(payload)
+        assert_true(preview['quality'] == 'preview' and full['quality'] == 'full', 'quality should be echoed')
+        assert_true(preview['page_layout'] == full['page_layout'], 'preview pagination should match full resolution')
+        assert_true(not preview['zip_url'], 'preview should not build a zip')
+        assert_true(not any(item['type'] == 'zip' for item in preview['artifacts']), 'preview should not list a zip artifact')
+        assert_true(full['zip_url'], 'full resolution export should build a zip')
+
+        _, output_dir = get_session_paths(session_id)
+        assets_dir = Path(output_dir, 'preview article', 'assets')
+        preview_names = [url.rsplit('/', 1)[-1] for url in preview['image_urls']]
+        assert_true(all(name.startswith('DRAFT_') for name in preview_names), f'preview pages should be drafts: {preview_names}')
+        assert_true(all((assets_dir / name).is_file() for name in preview_names), 'full export should keep draft pages')
+        with Image.open(assets_dir / preview_names[0]) as draft, Image.open(assets_dir / full['image_urls'][0].rsplit('/', 1)[-1]) as page:
+            assert_true(draft.width * 2 == page.width and draft.height * 2 == page.height, f'draft should be half size: {draft.size} {page.size}')
+    finally:
+        cleanup_session(session_id)
+
+
+def test_generation_job_reports_failure_as_error_event():
+    def failing(data, progress):
+        progress('layout')
+        raise RuntimeError('boom')
+
+    job = jobs.submit_job('failing', failing, {})
+    events = ''.join(jobs.sse_events(job))
+    assert_true('event: progress' in events and '"stage": "layout"' in events, f'progress should be streamed: {events}')
+    assert_true(events.rstrip().split('\n')[-2] == 'event: error', f'job should end with an error event: {events}')
+    snapshot = job.snapshot()
+    assert_true(snapshot['job_status'] == 'error', 'failed job status should be error')
+    assert_true(snapshot['result'] == {'status': 'error', 'message': 'boom'}, f'error result mismatch: {snapshot}')
+
+    try:
+        web_services.submit_generation_job('unknown', {})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('unknown job kind should be rejected')
+
+    original_limit = jobs.MAX_ACTIVE_JOBS
+    jobs.MAX_ACTIVE_JOBS = 0
+    try:
+        jobs.submit_job('failing', failing, {})
+    except jobs.JobQueueFull:
+        pass
+    else:
+        raise AssertionError('full queue should reject new jobs')
+    finally:
+        jobs.MAX_ACTIVE_JOBS = original_limit
+
+
 def test_upload_content_image():
     session_id = 'web-services-offline-upload'
     cleanup_session(session_id)
@@ -223,6 +385,10 @@ def run_check():
         test_normalize_theme,
         test_generate_preview_sanitizes_and_writes_session_files,
         test_generate_social_image_returns_artifacts,
+        test_social_layout_matches_generated_pages_without_drawing,
+        test_social_regeneration_reuses_unchanged_pages,
+        test_social_preview_quality_draws_scaled_drafts,
+        test_generation_job_reports_failure_as_error_event,
         test_upload_content_image,
         test_upload_feature_image_replaces_old_feature,
         test_remove_feature_image,
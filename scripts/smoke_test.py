@@ -1,8 +1,11 @@
+import io
 import json
 import os
 import shutil
+import subprocess
 import sys
 import tempfile
+import zipfile
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if ROOT_DIR not in sys.path:
@@ -71,6 +74,36 @@ def test_api_sanitizes_filename_and_generates_preview():
     assert_true(payload["artifacts"][0]["type"] == "html", "preview artifact missing")
 
 
+def test_api_serves_content_addressed_assets_as_immutable():
+    client = web.app_server.test_client()
+    session_id = "smoke-cache-session"
+    response = client.post(
+        "/api/save_and_generate",
+        data=json.dumps({
+            "filename": "cache-smoke",
+            "session_id": session_id,
+            "theme": "black_gold",
+            "author_name": "Smoke",
+            "content": "# 标题\n\n>> 金句",
+        }),
+        content_type="application/json",
+    )
+    payload = response.get_json()
+    assert_true(payload["status"] == "success", f"generation failed: {payload}")
+    preview = client.get(payload["preview_url"])
+    preview_html = preview.get_data(as_text=True)
+    preview.close()
+    asset = preview_html.split('src="assets/', 1)[1].split('"', 1)[0]
+    asset_url = payload["preview_url"].rsplit("/", 1)[0] + "/assets/" + asset
+
+    asset_response = client.get(asset_url)
+    cache_control = asset_response.headers.get("Cache-Control", "")
+    asset_response.close()
+    assert_true(asset_response.status_code == 200, f"asset should be served: {asset_url}")
+    assert_true("immutable" in cache_control, f"content-addressed asset should be immutable: {cache_control}")
+    assert_true("immutable" not in preview.headers.get("Cache-Control", ""), "preview html must stay revalidated")
+
+
 def test_api_generates_social_cards_with_artifacts():
     client = web.app_server.test_client()
     session_id = "smoke-social-session"
@@ -97,10 +130,132 @@ def test_api_generates_social_cards_with_artifacts():
     assert_true(len(image_artifacts) == len(payload["image_urls"]), "social image artifacts mismatch")
     assert_true(len(zip_artifacts) == 1, "social zip artifact missing")
     assert_true(payload["zip_url"] == zip_artifacts[0]["url"], "social zip URL mismatch")
+    for attempt in ("streamed", "cached"):
+        zip_response = client.get(payload["zip_url"])
+        assert_true(zip_response.status_code == 200, f"{attempt} social zip download failed: {zip_response.status_code}")
+        assert_true(zip_response.mimetype == "application/zip", f"unexpected zip mimetype: {zip_response.mimetype}")
+        assert_true("attachment" in zip_response.headers.get("Content-Disposition", ""), "social zip should download as attachment")
+        with zipfile.ZipFile(io.BytesIO(zip_response.data)) as archive:
+            assert_true(len(archive.namelist()) == payload["page_count"], f"{attempt} social zip page count mismatch")
+        zip_response.close()
     assert_true(isinstance(payload["quality_checks"], list), "social quality checks missing")
     assert_true(isinstance(payload["page_layout"], list), "social page layout missing")
     assert_true(payload["social_preset"] == "longform", "social preset mismatch")
 
+    layout_response = client.post(
+        "/api/social_layout",
+        data=json.dumps({
+            "filename": "social-smoke",
+            "session_id": session_id,
+            "theme": "editorial_card",
+            "social_preset": "longform",
+            "content": "# 标题\n\n" + "\n\n".join([paragraph] * 18),
+        }),
+        content_type="application/json",
+    )
+    layout = layout_response.get_json()
+    assert_true(layout_response.status_code == 200, f"unexpected layout status: {layout_response.status_code}")
+    assert_true(layout["page_layout"] == payload["page_layout"], "layout-only endpoint should match generated pages")
+
+
+def read_sse_events(body):
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_api_runs_social_generation_as_background_job():
+    client = web.app_server.test_client()
+    session_id = "smoke-social-job-session"
+    paragraph = "梁泽祖把车停下，打开 OPPO 手机，开始理解那些用手机的人。这是一段用于测试后台任务的正文。"
+    response = client.post(
+        "/api/jobs/generate_social_image",
+        data=json.dumps({
+            "filename": "social-job-smoke",
+            "session_id": session_id,
+            "theme": "editorial_card",
+            "quality": "preview",
+            "content": "# 标题\n\n" + "\n\n".join([paragraph] * 12),
+        }),
+        content_type="application/json",
+    )
+    submitted = response.get_json()
+    assert_true(response.status_code == 200, f"unexpected job submit status: {response.status_code}")
+    assert_true(submitted["status"] == "success" and submitted["job_id"], f"job submit failed: {submitted}")
+
+    events_response = client.get(submitted["events_url"])
+    assert_true(events_response.mimetype == "text/event-stream", f"unexpected events mimetype: {events_response.mimetype}")
+    events = read_sse_events(events_response.get_data(as_text=True))
+    events_response.close()
+    names = [name for name, _ in events]
+    stages = [data["stage"] for name, data in events if name == "progress"]
+    assert_true(names[-1] == "success", f"job should end with success: {names}")
+    assert_true(stages[:2] == ["queued", "started"] and "layout" in stages, f"missing progress stages: {stages}")
+    pages = [data for name, data in events if name == "progress" and data["stage"] == "pages"]
+    assert_true(pages and pages[-1]["done"] == pages[-1]["total"], f"page progress should reach total: {pages}")
+    result = events[-1][1]["result"]
+    assert_true(result["status"] == "success" and result["image_urls"], f"job result should match sync response: {result}")
+    assert_true(result["page_count"] == pages[-1]["total"], "page progress total should match page count")
+
+    resumed = read_sse_events(client.get(submitted["events_url"], headers={"Last-Event-ID": "1"}).get_data(as_text=True))
+    assert_true(len(resumed) == len(events) - 2, "Last-Event-ID should resume after the given event")
+    # 从最后一个事件或更靠后的过期 id 续传时重发结束事件后关闭，不能空转发送保活
+    for resume_headers, resume_url in (
+        ({"Last-Event-ID": str(len(events) - 1)}, submitted["events_url"]),
+        ({}, submitted["events_url"] + "?after=999"),
+    ):
+        chunks = []
+        for chunk in client.get(resume_url, headers=resume_headers, buffered=False).response:
+            chunks.append(chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk)
+            assert_true(len(chunks) <= 2, f"finished job stream should end: {chunks[:3]}")
+        tail = read_sse_events("".join(chunks))
+        assert_true(tail == events[-1:], f"resuming a finished job should resend only the final event: {tail}")
+
+    status = client.get(submitted["status_url"]).get_json()
+    assert_true(status["job_status"] == "success" and status["result"] == result, f"job status mismatch: {status}")
+    assert_true(client.get("/api/jobs/missing-job").status_code == 404, "missing job should be 404")
+    assert_true(client.post("/api/jobs/unknown_kind", json={}).status_code == 400, "unknown job kind should be rejected")
+
+
+def test_social_export_actions_never_expose_draft_pages():
+    client = web.app_server.test_client()
+    payload = {
+        "filename": "social-export-smoke",
+        "session_id": "smoke-social-export-session",
+        "theme": "editorial_card",
+        "content": "# 标题\n\n" + "\n\n".join(["梁泽祖把车停下，打开 OPPO 手机。"] * 6),
+    }
+    preview = client.post("/api/generate_social_image", json={**payload, "quality": "preview"}).get_json()
+    full = client.post("/api/generate_social_image", json=payload).get_json()
+    assert_true(all("/DRAFT_" in url for url in preview["image_urls"]), "preview should return draft pages")
+    assert_true(not any("DRAFT_" in url for url in full["image_urls"]), "full export should never return draft pages")
+
+    node = shutil.which("node")
+    if not node:
+        print("social-export-js-check-skipped: node not found")
+        return
+    # 导出面板的复制链接、打开目录、导出 ZIP 都经 socialExportUrls 取页面，草稿输出必须得到空列表以触发全尺寸生成
+    script = """
+const fs = require('fs');
+const vm = require('vm');
+const context = { window: {} };
+vm.runInNewContext(fs.readFileSync('static/js/generation.js', 'utf8'), context);
+const outputs = JSON.parse(process.argv[1]);
+console.log(JSON.stringify(outputs.map(output => context.window.WriterStudioGeneration.socialExportUrls(output))));
+"""
+    outputs = [
+        {"quality": "preview", "imageUrls": preview["image_urls"]},
+        {"quality": "full", "imageUrls": preview["image_urls"]},
+        {"quality": "full", "imageUrls": full["image_urls"]},
+    ]
+    result = subprocess.run([node, "-e", script, json.dumps(outputs)], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    exported = json.loads(result.stdout)
+    assert_true(exported[0] == [] and exported[1] == [], f"draft pages should never be exported: {exported}")
+    assert_true(exported[2] == full["image_urls"], f"full pages should be exported as-is: {exported}")
+
 
 def test_obsidian_loader_copies_local_images_and_blocks_traversal():
     vault_dir = tempfile.mkdtemp(prefix="writer-studio-vault-")
@@ -196,7 +351,10 @@ def test_wechat_draft_uploads_assets_and_builds_article_data():
 if __name__ == "__main__":
     test_generator_escapes_preview_html()
     test_api_sanitizes_filename_and_generates_preview()
+    test_api_serves_content_addressed_assets_as_immutable()
     test_api_generates_social_cards_with_artifacts()
+    test_api_runs_social_generation_as_background_job()
+    test_social_export_actions_never_expose_draft_pages()
     test_obsidian_loader_copies_local_images_and_blocks_traversal()
     test_publisher_reports_missing_generated_draft_before_network()
     test_wechat_format_escapes_content_and_renders_images()
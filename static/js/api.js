@@ -23,16 +23,75 @@ window.WriterStudioApi = (() => {
         return response.json();
     }
 
+    const JOB_RECONNECT_LIMIT = 5;
+    const JOB_POLL_INTERVAL_MS = 1000;
+
+    // 生成接口先提交后台任务，通过 SSE 接收进度，结束时返回与同步接口相同的结果；
+    // 浏览器不支持 EventSource 或任务提交失败时退回同步接口
+    async function runJob(kind, payload, onProgress) {
+        if (typeof EventSource === 'undefined') {
+            return postJson(`/api/${kind}`, payload);
+        }
+        let job;
+        try {
+            job = await postJson(`/api/jobs/${kind}`, payload);
+        } catch (e) {
+            job = null;
+        }
+        if (!job || job.status !== 'success' || !job.events_url) {
+            return postJson(`/api/${kind}`, payload);
+        }
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(job.events_url);
+            let failures = 0;
+            source.addEventListener('progress', event => {
+                failures = 0;
+                if (onProgress) onProgress(JSON.parse(event.data));
+            });
+            source.addEventListener('success', event => {
+                source.close();
+                resolve(JSON.parse(event.data).result);
+            });
+            source.addEventListener('error', event => {
+                // 带 data 的是任务失败事件；没有 data 的是连接断开，浏览器会带 Last-Event-ID 自动重连，
+                // 连接被关闭或多次重连失败时改为轮询任务状态
+                if (event.data) {
+                    source.close();
+                    resolve(JSON.parse(event.data).result);
+                    return;
+                }
+                failures += 1;
+                if (source.readyState === EventSource.CLOSED || failures >= JOB_RECONNECT_LIMIT) {
+                    source.close();
+                    pollJob(job.status_url).then(resolve, reject);
+                }
+            });
+        });
+    }
+
+    async function pollJob(statusUrl) {
+        for (;;) {
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.message || '任务不存在或已过期');
+            if (data.job_status === 'success' || data.job_status === 'error') return data.result;
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        }
+    }
+
     return {
         uploadImage,
         removeFeatureImage(payload) {
             return postJson('/api/remove_feature_image', payload);
         },
-        saveAndGenerate(payload) {
-            return postJson('/api/save_and_generate', payload);
+        saveAndGenerate(payload, onProgress) {
+            return runJob('save_and_generate', payload, onProgress);
+        },
+        generateSocialImage(payload, onProgress) {
+            return runJob('generate_social_image', payload, onProgress);
         },
-        generateSocialImage(payload) {
-            return postJson('/api/generate_social_image', payload);
+        socialLayout(payload) {
+            return postJson('/api/social_layout', payload);
         },
         publishWechat(payload) {
             return postJson('/api/publish', payload);
@@ -44,7 +44,9 @@ const appState = {
             generated: false,
             dirty: false,
             imageUrls: [],
+            imageChanged: [],
             zipUrl: '',
+            quality: 'preview',
             qualityChecks: [],
             pageLayout: [],
             cacheToken: 0
@@ -53,7 +55,9 @@ const appState = {
     socialLayoutOverrides: {},
     socialBlockControls: {},
     socialBlockOrder: [],
-    socialPreset: 'balanced'
+    socialPreset: 'balanced',
+    socialLayoutPreview: null,
+    socialLayoutRequest: 0
 };
 
 theme.initialize(dom.themeSelect);
@@ -117,6 +121,7 @@ function bindEvents() {
     [dom.editor, dom.filenameInput].forEach(element => {
         element.addEventListener('input', () => {
             markAllOutputsDirty();
+            appState.socialLayoutPreview = null;
             renderOutputMode();
         });
     });
@@ -160,12 +165,13 @@ function bindEvents() {
     });
 
     if (dom.generateBtn) dom.generateBtn.addEventListener('click', generatePreview);
-    if (dom.socialImageBtn) dom.socialImageBtn.addEventListener('click', generateSocialImage);
+    if (dom.socialImageBtn) dom.socialImageBtn.addEventListener('click', () => generateSocialImage());
     if (dom.socialPresetSelect) {
         dom.socialPresetSelect.addEventListener('change', () => {
             appState.socialPreset = dom.socialPresetSelect.value || 'balanced';
             markOutputDirty('social_cards');
             renderOutputMode();
+            refreshSocialLayout();
         });
     }
     if (dom.socialExportPanel) {
@@ -252,9 +258,10 @@ function updateFeatureImageStatus() {
     dom.featureRemoveBtn.classList.toggle('is-hidden', !hasFeature);
 }
 
-function generateSocialImage() {
+// 编辑器里生成的是缩小绘制的草稿页，分页与导出一致；全尺寸页面和 ZIP 只在导出时生成
+function generateSocialImage(quality = 'preview') {
     setOutputMode('social_cards');
-    generation.generateSocialImage({
+    return generation.generateSocialImage({
         api,
         dom,
         settings,
@@ -263,12 +270,15 @@ function generateSocialImage() {
         layoutOverrides: appState.socialLayoutOverrides,
         blockControls: buildSocialBlockPayload(),
         socialPreset: appState.socialPreset,
+        quality,
         onSuccess(data, meta) {
             appState.outputs.social_cards = {
                 generated: true,
                 dirty: false,
                 imageUrls: meta.imageUrls,
+                imageChanged: meta.imageChanged || [],
                 zipUrl: meta.zipUrl || '',
+                quality: meta.quality || quality,
                 qualityChecks: meta.qualityChecks || [],
                 pageLayout: meta.pageLayout || [],
                 preset: meta.socialPreset || appState.socialPreset,
@@ -279,6 +289,26 @@ function generateSocialImage() {
     });
 }
 
+function refreshSocialLayout() {
+    if (appState.outputMode !== 'social_cards') return;
+    const requestId = ++appState.socialLayoutRequest;
+    generation.previewSocialLayout({
+        api,
+        dom,
+        settings,
+        sessionId,
+        layoutOverrides: appState.socialLayoutOverrides,
+        blockControls: buildSocialBlockPayload(),
+        socialPreset: appState.socialPreset
+    }).then(preview => {
+        // 连续调整时只采用最后一次请求的结果
+        if (!preview || requestId !== appState.socialLayoutRequest) return;
+        appState.socialLayoutPreview = preview;
+        renderSocialQualityPanel();
+        renderSocialLayoutControls();
+    });
+}
+
 function setOutputMode(mode) {
     if (!mode) return;
     appState.outputMode = mode;
@@ -307,7 +337,7 @@ function renderOutputMode() {
     if (mode === 'wechat_article') {
         generation.renderWechatPreview(dom.previewFrame, output.url, output.cacheToken);
     } else {
-        generation.renderSocialPreview(dom.previewFrame, output.imageUrls, output.cacheToken);
+        generation.renderSocialPreview(dom.previewFrame, output.imageUrls, output.cacheToken, output.imageChanged);
     }
 }
 
@@ -361,7 +391,9 @@ function renderSocialExportPanel() {
     dom.socialExportPanel.classList.remove('is-hidden');
     const summary = document.createElement('div');
     summary.className = 'social-export-summary';
-    summary.textContent = `已生成 ${output.imageUrls.length} 张 PNG`;
+    summary.textContent = output.quality === 'preview'
+        ? `已生成 ${output.imageUrls.length} 张预览，导出时生成全尺寸 PNG`
+        : `已生成 ${output.imageUrls.length} 张 PNG`;
 
     const actions = document.createElement('div');
     actions.className = 'social-export-actions';
@@ -372,6 +404,8 @@ function renderSocialExportPanel() {
         zipLink.textContent = '下载 ZIP';
         zipLink.setAttribute('download', '');
         actions.append(zipLink);
+    } else {
+        actions.append(socialExportButton('导出高清 ZIP', 'export-zip'));
     }
     actions.append(
         socialExportButton('复制图片链接', 'copy-links'),
@@ -389,13 +423,33 @@ function socialExportButton(text, action) {
     return button;
 }
 
+async function fullSocialOutput() {
+    const output = appState.outputs.social_cards;
+    if (generation.socialExportUrls(output).length) return output;
+    const data = await generateSocialImage('full');
+    return data ? appState.outputs.social_cards : null;
+}
+
 async function handleSocialExportAction(event) {
     const button = event.target.closest('[data-social-export-action]');
     if (!button) return;
     const action = button.dataset.socialExportAction;
-    const output = appState.outputs.social_cards;
+    // 编辑器里的是缩小的草稿页，导出类操作一律先生成全尺寸页面，不把草稿交出去
+    button.disabled = true;
+    const output = await fullSocialOutput();
+    button.disabled = false;
+    if (!output) return;
+    if (action === 'export-zip') {
+        if (output.zipUrl) {
+            const zipLink = document.createElement('a');
+            zipLink.href = output.zipUrl;
+            zipLink.setAttribute('download', '');
+            zipLink.click();
+        }
+        return;
+    }
     if (action === 'copy-links') {
-        const text = output.imageUrls.map(url => new URL(url, window.location.origin).href).join('\n');
+        const text = generation.socialExportUrls(output).map(url => new URL(url, window.location.origin).href).join('\n');
         try {
             await navigator.clipboard.writeText(text);
             showNotify('图片链接已复制');
@@ -428,9 +482,15 @@ function renderSocialQualityPanel() {
     }
 
     const output = appState.outputs.social_cards;
-    const checks = output.generated && !output.dirty
-        ? output.qualityChecks
-        : buildLocalSocialQualityChecks(dom.editor.value);
+    const preview = appState.socialLayoutPreview;
+    let checks;
+    if (output.generated && !output.dirty) {
+        checks = output.qualityChecks;
+    } else if (preview) {
+        checks = preview.qualityChecks;
+    } else {
+        checks = buildLocalSocialQualityChecks(dom.editor.value);
+    }
     dom.socialQualityPanel.classList.remove('is-hidden');
 
     const title = document.createElement('div');
@@ -558,6 +618,7 @@ function updateSocialLayoutOverride(event) {
     appState.socialLayoutOverrides[index] = current;
     markOutputDirty('social_cards');
     updateOutputStatuses();
+    refreshSocialLayout();
 }
 
 function normalizeSocialControlValue(field, value) {
@@ -639,6 +700,7 @@ function handleSocialBlockAction(event) {
     }
     markOutputDirty('social_cards');
     renderOutputMode();
+    refreshSocialLayout();
 }
 
 function moveSocialBlock(blockIndex, direction) {
@@ -679,15 +741,18 @@ function buildSocialBlockPayload() {
 
 function renderSocialPageLayout() {
     const output = appState.outputs.social_cards;
-    if (!output.generated || output.dirty || !output.pageLayout.length) return null;
+    const isGenerated = output.generated && !output.dirty;
+    // 生成结果过期后显示仅分页接口返回的预览，不必重新出图
+    const pageLayout = isGenerated ? output.pageLayout : (appState.socialLayoutPreview || {}).pageLayout || [];
+    if (!pageLayout.length) return null;
     const section = document.createElement('div');
     section.className = 'social-page-layout';
     const heading = document.createElement('div');
     heading.className = 'social-layout-title';
-    heading.textContent = '分页结果';
+    heading.textContent = isGenerated ? '分页结果' : '分页预览';
     section.append(heading);
 
-    output.pageLayout.forEach(page => {
+    pageLayout.forEach(page => {
         const row = document.createElement('div');
         row.className = 'social-page-row';
         const label = document.createElement('span');
@@ -817,7 +882,9 @@ function resetOutputs() {
         generated: false,
         dirty: false,
         imageUrls: [],
+        imageChanged: [],
         zipUrl: '',
+        quality: 'preview',
         qualityChecks: [],
         pageLayout: [],
         cacheToken: 0
@@ -825,6 +892,7 @@ function resetOutputs() {
     appState.socialLayoutOverrides = {};
     appState.socialBlockControls = {};
     appState.socialBlockOrder = [];
+    appState.socialLayoutPreview = null;
 }
 
 function markAllOutputsDirty() {
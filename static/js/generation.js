@@ -11,7 +11,7 @@ window.WriterStudioGeneration = (() => {
                 session_id: sessionId,
                 theme: dom.themeSelect.value,
                 author_name: config.author_name || '作者'
-            });
+            }, progressLabel(dom.generateBtn));
 
             if (data.status === 'success') {
                 notify('预览已生成');
@@ -34,25 +34,15 @@ window.WriterStudioGeneration = (() => {
         }
     }
 
-    async function generateSocialImage({ api, dom, settings, sessionId, notify, layoutOverrides, blockControls, socialPreset, onSuccess }) {
+    async function generateSocialImage({ api, dom, settings, sessionId, notify, layoutOverrides, blockControls, socialPreset, quality = 'full', onSuccess }) {
         dom.setButtonBusy(dom.socialImageBtn, true, '生成中...');
-        notify('正在生成文字图...', 'success');
-        const config = settings.getConfig();
+        notify(quality === 'preview' ? '正在生成文字图预览...' : '正在导出高清文字图...', 'success');
 
         try {
             const data = await api.generateSocialImage({
-                content: dom.editor.value,
-                filename: dom.filenameInput.value,
-                session_id: sessionId,
-                theme: dom.themeSelect.value,
-                author_name: config.author_name || '作者',
-                social_brand_name: config.social_brand_name,
-                social_brand_en: config.social_brand_en,
-                social_brand_accent_text: config.social_brand_accent_text,
-                social_preset: socialPreset || 'balanced',
-                social_layout_overrides: layoutOverrides || {},
-                social_block_controls: blockControls || {}
-            });
+                ...buildSocialPayload({ dom, settings, sessionId, layoutOverrides, blockControls, socialPreset }),
+                quality
+            }, progressLabel(dom.socialImageBtn));
 
             if (data.status === 'success') {
                 notify(data.message || '文字图已生成');
@@ -63,7 +53,9 @@ window.WriterStudioGeneration = (() => {
                 if (onSuccess) {
                     onSuccess(data, {
                         imageUrls: imageUrls.filter(Boolean),
+                        imageChanged: Array.isArray(data.image_changed) ? data.image_changed : [],
                         zipUrl: getArtifactUrl(data, 'zip') || data.zip_url || '',
+                        quality: data.quality || quality,
                         qualityChecks: Array.isArray(data.quality_checks) ? data.quality_checks : [],
                         pageLayout: Array.isArray(data.page_layout) ? data.page_layout : [],
                         socialPreset: data.social_preset || socialPreset || 'balanced'
@@ -84,15 +76,67 @@ window.WriterStudioGeneration = (() => {
         return null;
     }
 
+    async function previewSocialLayout({ api, dom, settings, sessionId, layoutOverrides, blockControls, socialPreset }) {
+        try {
+            const data = await api.socialLayout(buildSocialPayload({ dom, settings, sessionId, layoutOverrides, blockControls, socialPreset }));
+            if (data.status !== 'success') return null;
+            return {
+                pageCount: data.page_count || 0,
+                pageLayout: Array.isArray(data.page_layout) ? data.page_layout : [],
+                qualityChecks: Array.isArray(data.quality_checks) ? data.quality_checks : []
+            };
+        } catch (e) {
+            console.error(e);
+            return null;
+        }
+    }
+
+    const PROGRESS_STAGES = {
+        queued: '排队中',
+        started: '生成中',
+        parse: '解析中',
+        assets: '绘制中',
+        html: '排版中',
+        layout: '分页中',
+        pages: '绘制中'
+    };
+
+    function progressLabel(button) {
+        return event => {
+            const label = PROGRESS_STAGES[event.stage] || '生成中';
+            const counter = event.total ? ` ${event.done || 0}/${event.total}` : '';
+            // 只更新文字：再次调用 setButtonBusy 会把进度文字记成按钮原文
+            if (button && button.disabled) button.textContent = `${label}${counter}...`;
+        };
+    }
+
+    function buildSocialPayload({ dom, settings, sessionId, layoutOverrides, blockControls, socialPreset }) {
+        const config = settings.getConfig();
+        return {
+            content: dom.editor.value,
+            filename: dom.filenameInput.value,
+            session_id: sessionId,
+            theme: dom.themeSelect.value,
+            author_name: config.author_name || '作者',
+            social_brand_name: config.social_brand_name,
+            social_brand_en: config.social_brand_en,
+            social_brand_accent_text: config.social_brand_accent_text,
+            social_preset: socialPreset || 'balanced',
+            social_layout_overrides: layoutOverrides || {},
+            social_block_controls: blockControls || {}
+        };
+    }
+
     function renderWechatPreview(frame, previewUrl, cacheToken) {
         frame.removeAttribute('srcdoc');
         frame.src = withCache(previewUrl, cacheToken);
     }
 
-    function renderSocialPreview(frame, imageUrls, cacheToken) {
+    function renderSocialPreview(frame, imageUrls, cacheToken, imageChanged = []) {
         const urls = Array.isArray(imageUrls) ? imageUrls : [imageUrls];
         const imagesHtml = urls.map((imageUrl, index) => {
-            const displayUrl = withCache(imageUrl, cacheToken);
+            // 页面按内容寻址命名，未改动的页 URL 不变，直接用浏览器缓存，不加时间戳强制重新加载
+            const displayUrl = imageChanged[index] === false ? imageUrl : withCache(imageUrl, cacheToken);
             const safeDisplayUrl = escapeAttribute(displayUrl);
             const safeOpenUrl = escapeAttribute(imageUrl);
             const pageLabel = String(index + 1).padStart(2, '0');
@@ -172,6 +216,12 @@ window.WriterStudioGeneration = (() => {
         `;
     }
 
+    // 可以交给导出操作的页面地址：草稿预览（0.5 倍、无颗粒的 DRAFT_ 页）一律不算
+    function socialExportUrls(output) {
+        if (!output || output.quality === 'preview' || !Array.isArray(output.imageUrls)) return [];
+        return output.imageUrls.filter(url => url && !/(^|\/)DRAFT_[^/]*$/.test(url.split('?')[0]));
+    }
+
     function getArtifactUrl(data, type) {
         return getArtifactUrls(data, type)[0] || '';
     }
@@ -199,6 +249,8 @@ window.WriterStudioGeneration = (() => {
     return {
         saveAndGenerate,
         generateSocialImage,
+        previewSocialLayout,
+        socialExportUrls,
         renderWechatPreview,
         renderSocialPreview
     };
@@ -0,0 +1,144 @@
+import base64
+import json
+import os
+import string
+import threading
+from array import array
+
+from .asset_naming import file_signature
+
+
+ADVANCE_TABLE_VERSION = 1
+ADVANCE_TABLE_DIR = ".advance_tables"
+CJK_START, CJK_END = 0x4E00, 0x9FFF
+# ASCII 可见字符和常用全角标点，单独存成字典
+EXTRA_CHARS = string.printable.strip() + " " + "，。！？；：、（）【】《》「」『』“”‘’…—·％～"
+
+_TABLES = {}
+_PENDING = set()
+_TABLES_LOCK = threading.Lock()
+
+
+class AdvanceTable:
+    """某个字体文件某个字号的单字步进表：CJK 统一表意区用定长数组，ASCII 和标点用字典。"""
+
+    def __init__(self, cjk, extra):
+        self.cjk = cjk
+        self.extra = extra
+
+    def advance(self, ch):
+        code = ord(ch)
+        if CJK_START <= code <= CJK_END:
+            return self.cjk[code - CJK_START]
+        return self.extra.get(ch)
+
+    @classmethod
+    def build(cls, font):
+        cjk = array("d", (font.getlength(chr(code)) for code in range(CJK_START, CJK_END + 1)))
+        extra = {ch: font.getlength(ch) for ch in EXTRA_CHARS}
+        return cls(cjk, extra)
+
+    def to_payload(self, signature):
+        return {
+            "version": ADVANCE_TABLE_VERSION,
+            "signature": signature,
+            "cjk": base64.b64encode(self.cjk.tobytes()).decode("ascii"),
+            "extra": self.extra,
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        cjk = array("d")
+        cjk.frombytes(base64.b64decode(payload["cjk"]))
+        if len(cjk) != CJK_END - CJK_START + 1:
+            raise ValueError("advance table has wrong length")
+        return cls(cjk, payload["extra"])
+
+
+def table_key(font):
+    path = getattr(font, "path", None)
+    size = getattr(font, "size", None)
+    if not isinstance(path, str) or not size:
+        return None
+    return path, size, getattr(font, "index", 0)
+
+
+def table_path(key):
+    path, size, index = key
+    name = f"{os.path.basename(path)}-{index}-{size}.json"
+    return os.path.join(os.path.dirname(path), ADVANCE_TABLE_DIR, name)
+
+
+def get_advance_table(font):
+    """返回已就绪的步进表；首次使用时从字体旁的缓存文件加载，
+    没有缓存文件则在后台线程生成并保存，生成完成前返回 None，调用方按 FreeType 精确测量。
+    """
+    key = table_key(font)
+    if key is None:
+        return None
+    with _TABLES_LOCK:
+        if key in _TABLES:
+            return _TABLES[key]
+
+    table = _load_table(key)
+    with _TABLES_LOCK:
+        if table is not None:
+            _TABLES[key] = table
+            return table
+        if key in _PENDING:
+            return None
+        _PENDING.add(key)
+    threading.Thread(target=build_advance_table, args=(font,), daemon=True).start()
+    return None
+
+
+def build_advance_table(font):
+    key = table_key(font)
+    try:
+        table = AdvanceTable.build(font)
+        _save_table(key, table)
+        with _TABLES_LOCK:
+            _TABLES[key] = table
+        return table
+    finally:
+        with _TABLES_LOCK:
+            _PENDING.discard(key)
+
+
+def clear_advance_tables():
+    with _TABLES_LOCK:
+        _TABLES.clear()
+
+
+def _load_table(key):
+    path = table_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != ADVANCE_TABLE_VERSION or payload.get("signature") != _font_signature(key):
+            return None
+        return AdvanceTable.from_payload(payload)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ 步进表读取失败 {path}: {type(e).__name__}: {e}")
+        return None
+
+
+def _save_table(key, table):
+    path = table_path(key)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(table.to_payload(_font_signature(key)), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # 字体目录只读（例如打包后的应用）时只保留内存中的表
+        print(f"⚠️ 步进表无法写入 {path}: {type(e).__name__}: {e}")
+
+
+def _font_signature(key):
+    signature = file_signature(key[0])
+    # 路径本身不参与比较，字体目录整体搬移后缓存仍可用
+    return signature[1:] if signature else None
@@ -19,7 +19,7 @@ def html_artifact(url, filename):
     }
 
 
-def image_artifact(url, filename, index=None, total=None):
+def image_artifact(url, filename, index=None, total=None, changed=None):
     artifact = {
         "type": "image",
         "url": url,
@@ -29,6 +29,8 @@ def image_artifact(url, filename, index=None, total=None):
         artifact["index"] = index
     if total is not None:
         artifact["total"] = total
+    if changed is not None:
+        artifact["changed"] = changed
     return artifact
 
 
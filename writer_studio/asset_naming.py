@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+from functools import lru_cache
+
+
+# 渲染逻辑变化导致同样输入画出的图不同时递增，让所有资源换新文件名。
+ASSET_RENDER_VERSION = 3
+ASSET_HASH_LENGTH = 16
+CONTENT_ADDRESSED_ASSET_PATTERN = re.compile(r'^(?:COVER|HEADER|H|Q|IMG|SOCIAL|DRAFT)_[0-9a-f]{16}\.[A-Za-z0-9]+$')
+
+
+def fingerprint(*parts):
+    payload = json.dumps([ASSET_RENDER_VERSION, *parts], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def asset_name(prefix, block_fingerprint, ext):
+    """按内容寻址的资源文件名：内容不变 URL 就不变，可以被浏览器和上传去重长期缓存。"""
+    return f"{prefix}_{block_fingerprint[:ASSET_HASH_LENGTH]}{ext}"
+
+
+def is_content_addressed_asset(filepath):
+    directory, name = os.path.split(filepath.replace("\\", "/"))
+    return directory == "assets" and bool(CONTENT_ADDRESSED_ASSET_PATTERN.match(name))
+
+
+def file_digest(path):
+    signature = file_signature(path)
+    return _file_digest_cached(*signature) if signature else None
+
+
+@lru_cache(maxsize=256)
+def _file_digest_cached(path, mtime_ns, size):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_signature(path):
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+
+def prune_output_dir(out_dir, keep_names, assets_dir, keep_assets):
+    """删除本次生成未引用的文件，效果等同于旧的 rmtree 重建，但保留可复用资源。"""
+    keep_names = set(keep_names) | {os.path.basename(assets_dir)}
+    for name in os.listdir(out_dir):
+        if name not in keep_names:
+            _remove_path(os.path.join(out_dir, name))
+
+    keep_assets = set(keep_assets)
+    for name in os.listdir(assets_dir):
+        if name not in keep_assets:
+            _remove_path(os.path.join(assets_dir, name))
+
+
+def _remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"⚠️ 无法清理旧文件 {path}: {type(e).__name__}: {e}")
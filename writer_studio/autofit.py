@@ -0,0 +1,66 @@
+from functools import lru_cache
+
+
+# 缓存以字体对象为键（字体对象本身已包含字号），强引用保证对象不会被回收后复用 id。
+MEASURE_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=MEASURE_CACHE_SIZE)
+def measure_text(font, text):
+    return font.getlength(text)
+
+
+@lru_cache(maxsize=MEASURE_CACHE_SIZE)
+def measure_bbox(font, text):
+    return font.getbbox(text)
+
+
+def candidate_sizes(max_size, min_size, step):
+    return list(range(max_size, min_size - 1, -step)) or [max_size]
+
+
+def fit_font_size(fits, max_size, min_size, step=2):
+    """在 max_size 到 min_size 之间（按 step 取档）找能放下的最大字号，都放不下时返回最小一档。
+
+    fits(size) 需要随字号单调：字号越小越容易放下，因此可以二分查找，
+    长标题只需测量 log2(档数) 次，而不是从大到小逐档加载字体、逐档测量。
+    """
+    sizes = candidate_sizes(max_size, min_size, step)
+    if fits(sizes[0]):
+        return sizes[0]
+    low, high = 0, len(sizes) - 1
+    if not fits(sizes[high]):
+        return sizes[high]
+    # 不变式：sizes[low] 放不下，sizes[high] 放得下
+    while high - low > 1:
+        mid = (low + high) // 2
+        if fits(sizes[mid]):
+            high = mid
+        else:
+            low = mid
+    return sizes[high]
+
+
+def fit_text_width(load_font, text, max_width, max_size, min_size, step=2):
+    """单行文字按宽度自适应字号，返回 (字号, 字体)。"""
+    size = fit_font_size(
+        lambda candidate: measure_text(load_font(candidate), text) <= max_width,
+        max_size, min_size, step,
+    )
+    return size, load_font(size)
+
+
+def wrap_chars(font, text, max_width):
+    """逐字折行：放不下下一个字时换行，供竖排感较强的复古封面标题使用。"""
+    lines = []
+    current = ""
+    for ch in text:
+        candidate = current + ch
+        if current and measure_text(font, candidate) > max_width:
+            lines.append(current)
+            current = ch
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
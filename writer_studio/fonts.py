@@ -0,0 +1,184 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+import path_utils
+from .advance_tables import get_advance_table
+from .config import load_server_config
+
+
+FONT_DIRS_ENV = "WRITER_STUDIO_FONT_DIRS"
+FONT_EXTENSIONS = (".otf", ".ttf", ".ttc")
+FACE_CACHE_SIZE = 256
+
+# 字重 → 候选字体文件（按顺序尝试），都找不到时回退到主题字体
+WEIGHT_FILES = {
+    "normal": ("SourceHanSansSC-Normal.otf",),
+    "regular": ("SourceHanSansSC-Regular.otf",),
+    "medium": ("SourceHanSansSC-Medium.otf",),
+    "serif_bold": ("SourceHanSerif-Bold.ttc",),
+}
+WEIGHT_FALLBACKS = {
+    "normal": ("normal", "regular"),
+    "regular": ("regular", "normal"),
+    "medium": ("medium", "regular", "normal"),
+    "serif_bold": ("serif_bold",),
+}
+
+# 文章资源和文字图用到的字号键，服务启动时按主题预热
+ARTICLE_FONT_SIZE_KEYS = (
+    "cover_main_size", "cover_footer_size",
+    "header_main_size", "header_sub_size", "header_footer_size",
+    "h_font_size", "h_num_font_size", "q_font_size",
+)
+SOCIAL_FONT_SPECS = (
+    ("social_font_size", 36, "normal"),
+    ("social_heading_size", 36, "medium"),
+    ("social_caption_size", 20, "regular"),
+    ("social_brand_size", 34, "medium"),
+    ("social_brand_en_size", 15, "regular"),
+    ("social_meta_size", 18, "regular"),
+)
+
+
+def default_font_dirs():
+    """字体搜索目录：环境变量 > config.json 的 font_dirs > 内置 fonts/ > 用户字体目录。"""
+    dirs = [d for d in os.environ.get(FONT_DIRS_ENV, "").split(os.pathsep) if d]
+    configured = load_server_config().get("font_dirs") or []
+    if isinstance(configured, str):
+        configured = [configured]
+    dirs.extend(configured)
+    dirs.append(path_utils.get_internal_path("fonts"))
+    dirs.append("~/Library/Fonts")
+    return [os.path.expanduser(d) for d in dirs]
+
+
+class FontRegistry:
+    """按主题和字重解析字体文件（每种组合只探测一次磁盘），并以 LRU 缓存已加载的字体对象。"""
+
+    def __init__(self, search_dirs=None, cache_size=FACE_CACHE_SIZE):
+        self.search_dirs = list(search_dirs) if search_dirs is not None else default_font_dirs()
+        self.cache_size = cache_size
+        self._paths = {}
+        self._faces = OrderedDict()
+        self._missing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, name):
+        """在搜索目录里找字体文件；name 不带扩展名时依次尝试 .otf/.ttf/.ttc。"""
+        with self._lock:
+            if name in self._paths:
+                return self._paths[name]
+
+        candidates = [name] if name.lower().endswith(FONT_EXTENSIONS) else [name + ext for ext in FONT_EXTENSIONS]
+        path = None
+        for directory in self.search_dirs:
+            path = next((os.path.join(directory, c) for c in candidates if os.path.exists(os.path.join(directory, c))), None)
+            if path:
+                break
+        with self._lock:
+            self._paths[name] = path
+        return path
+
+    def resolve(self, style=None, weight=None):
+        """主题字体（weight 为空）或指定字重的字体路径；找不到返回 None。"""
+        for key in WEIGHT_FALLBACKS.get(weight, ()):
+            for filename in WEIGHT_FILES[key]:
+                path = self.find(filename)
+                if path:
+                    return path
+
+        font_name = (style or {}).get("font_name")
+        if not font_name:
+            return None
+        path = self.find(font_name)
+        if not path:
+            self._warn_missing(font_name)
+        return path
+
+    def face(self, path, size):
+        key = (path, size)
+        with self._lock:
+            font = self._faces.get(key)
+            if font is not None:
+                self._faces.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+
+        font = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+        with self._lock:
+            font = self._faces.setdefault(key, font)
+            self._faces.move_to_end(key)
+            while len(self._faces) > self.cache_size:
+                self._faces.popitem(last=False)
+        return font
+
+    def load(self, size, style=None, weight=None):
+        return self.face(self.resolve(style, weight), size)
+
+    def warm_up(self, styles):
+        """预先加载各主题实际用到的字号，避免服务启动后的第一次生成现场加载字体。"""
+        count = 0
+        for style in styles:
+            for key in ARTICLE_FONT_SIZE_KEYS:
+                if isinstance(style.get(key), int):
+                    self.load(style[key], style)
+                    count += 1
+            if "cover_header_text" in style:
+                for key in ("cover_main_size", "cover_sub_size"):
+                    if isinstance(style.get(key), int):
+                        self.load(style[key], style, "serif_bold")
+                        count += 1
+            for key, default, weight in SOCIAL_FONT_SPECS:
+                # 文字图排版按单字步进表估算宽度，缓存文件不存在时在后台生成
+                get_advance_table(self.load(style.get(key, default), style, weight))
+                count += 1
+        return count
+
+    def cache_info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "faces": len(self._faces), "max_faces": self.cache_size}
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+            self._faces.clear()
+            self._missing.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _warn_missing(self, font_name):
+        with self._lock:
+            if font_name in self._missing:
+                return
+            self._missing.add(font_name)
+        print(f"⚠️ Font not found: {font_name} (searched: {', '.join(self.search_dirs)})")
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_font_registry():
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = FontRegistry()
+        return _REGISTRY
+
+
+def set_font_registry(registry):
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        _REGISTRY = registry
+
+
+def warm_up_fonts_in_background(styles):
+    thread = threading.Thread(target=get_font_registry().warm_up, args=(list(styles),), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,133 @@
+import math
+import threading
+import weakref
+from collections import OrderedDict
+
+from PIL import Image, ImageChops, ImageDraw
+
+
+# 样式开关，默认关闭：开启后文字图正文按字形缓存贴图，跨页重复的汉字只光栅化一次。
+GLYPH_ATLAS_STYLE_KEY = "social_glyph_atlas"
+# FreeType 以 1/64 像素（26.6 定点）定位字形，按同样的精度区分亚像素相位
+SUBPIXEL_STEPS = 64
+# 每个字号最多缓存的字形蒙版数（按最近使用淘汰），常用汉字加几种相位足够
+MAX_ATLAS_GLYPHS = 4096
+
+_ATLASES = weakref.WeakKeyDictionary()
+_ATLASES_LOCK = threading.Lock()
+
+
+class GlyphAtlas:
+    """单个字体对象（即某个字体文件的某个字号）的字形缓存。
+
+    字形按 (字符, 亚像素相位) 光栅化一次，步进和字距对也各自缓存；
+    绘制一段文字时把字形蒙版按最大值合成一张整段蒙版，再用主题颜色一次贴到画布上，
+    与 ImageDraw.text 合成字形的方式一致。
+
+    只弱引用字体：缓存表以字体为弱键，值若强引用字体，字体和它的字形就永远不会被回收。
+    """
+
+    def __init__(self, font):
+        self._font = weakref.ref(font)
+        self._glyphs = OrderedDict()
+        self._glyphs_lock = threading.Lock()
+        self._advances = {}
+        self._kerning = {}
+
+    @property
+    def font(self):
+        return self._font()
+
+    def glyph(self, ch, phase=0):
+        key = (ch, phase)
+        with self._glyphs_lock:
+            glyph = self._glyphs.get(key)
+            if glyph is not None:
+                self._glyphs.move_to_end(key)
+                return glyph
+        glyph = self._rasterize(ch, phase)
+        with self._glyphs_lock:
+            self._glyphs[key] = glyph
+            while len(self._glyphs) > MAX_ATLAS_GLYPHS:
+                self._glyphs.popitem(last=False)
+        return glyph
+
+    def advance(self, ch):
+        advance = self._advances.get(ch)
+        if advance is None:
+            advance = self._advances.setdefault(ch, self.font.getlength(ch))
+        return advance
+
+    def kerning(self, previous, ch):
+        pair = previous + ch
+        kern = self._kerning.get(pair)
+        if kern is None:
+            kern = self._kerning.setdefault(pair, self.font.getlength(pair) - self.advance(previous) - self.advance(ch))
+        return kern
+
+    def _rasterize(self, ch, phase):
+        left, top, right, bottom = self.font.getbbox(ch)
+        if right <= left or bottom <= top:
+            return None, 0, 0
+        # 留出边距并保证绘制坐标为正，避免负坐标截断改变相位
+        pad_x, pad_y = 2 + max(0, -left), 2 + max(0, -top)
+        canvas = Image.new("L", (pad_x + right + 3, pad_y + bottom + 3), 0)
+        ImageDraw.Draw(canvas).text((pad_x + phase / SUBPIXEL_STEPS, pad_y), ch, font=self.font, fill=255)
+        bbox = canvas.getbbox()
+        if not bbox:
+            return None, 0, 0
+        return canvas.crop(bbox), bbox[0] - pad_x, bbox[1] - pad_y
+
+    def layout(self, text, x):
+        """返回 [(蒙版, 左上角 x, 相对基准的 y)] 和整段步进宽度。"""
+        placed = []
+        pen = 0.0
+        previous = None
+        for ch in text:
+            if previous is not None:
+                pen += self.kerning(previous, ch)
+            position = x + pen
+            base = math.floor(position)
+            phase = round((position - base) * SUBPIXEL_STEPS)
+            if phase == SUBPIXEL_STEPS:
+                base, phase = base + 1, 0
+            mask, dx, dy = self.glyph(ch, phase)
+            if mask is not None:
+                placed.append((mask, base + dx, dy))
+            pen += self.advance(ch)
+            previous = ch
+        return placed, pen
+
+    def draw(self, draw, xy, text, fill):
+        """按字形缓存绘制一段文字，返回步进宽度；y 取整数像素，与 ImageDraw.text 的整数行位置一致。"""
+        x, y = xy
+        placed, width = self.layout(text, x)
+        if not placed:
+            return width
+        left = min(px for _, px, _ in placed)
+        top = min(py for _, _, py in placed)
+        right = max(px + mask.width for mask, px, _ in placed)
+        bottom = max(py + mask.height for mask, _, py in placed)
+        run = Image.new("L", (right - left, bottom - top), 0)
+        for mask, px, py in placed:
+            box = (px - left, py - top, px - left + mask.width, py - top + mask.height)
+            run.paste(ImageChops.lighter(run.crop(box), mask), box[:2])
+        draw.bitmap((left, int(y) + top), run, fill=fill)
+        return width
+
+    def __len__(self):
+        return len(self._glyphs)
+
+
+def glyph_atlas(font):
+    with _ATLASES_LOCK:
+        atlas = _ATLASES.get(font)
+        if atlas is None:
+            atlas = GlyphAtlas(font)
+            _ATLASES[font] = atlas
+        return atlas
+
+
+def clear_glyph_atlases():
+    with _ATLASES_LOCK:
+        _ATLASES.clear()
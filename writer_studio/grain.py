@@ -0,0 +1,63 @@
+import random
+import threading
+from collections import OrderedDict
+from statistics import NormalDist
+
+from PIL import Image
+
+
+GRAIN_BLEND_ALPHA = 0.03
+# 默认使用固定种子：同样的输入得到逐字节相同的 PNG，内容寻址的缓存和上传去重都能复用。
+# 传 seed=None 则每个进程随机生成一次噪点。
+DEFAULT_GRAIN_SEED = 0
+NOISE_CACHE_SIZE = 8
+
+_NOISE_CACHE = OrderedDict()
+_NOISE_CACHE_LOCK = threading.Lock()
+
+
+def add_film_grain(img, intensity=0.08, seed=DEFAULT_GRAIN_SEED):
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return Image.blend(img, noise_frame(img.size, intensity, seed), GRAIN_BLEND_ALPHA)
+
+
+def noise_frame(size, intensity=0.08, seed=DEFAULT_GRAIN_SEED):
+    """按 (尺寸, 强度, 种子) 缓存的 RGB 噪点帧，同尺寸的图片共用同一帧，不再逐张生成。"""
+    key = (tuple(size), round(intensity, 4), seed)
+    with _NOISE_CACHE_LOCK:
+        noise = _NOISE_CACHE.get(key)
+        if noise is not None:
+            _NOISE_CACHE.move_to_end(key)
+            return noise
+
+    noise = _build_noise(key[0], key[1], seed)
+    with _NOISE_CACHE_LOCK:
+        _NOISE_CACHE[key] = noise
+        _NOISE_CACHE.move_to_end(key)
+        while len(_NOISE_CACHE) > NOISE_CACHE_SIZE:
+            _NOISE_CACHE.popitem(last=False)
+    return noise
+
+
+def clear_noise_cache():
+    with _NOISE_CACHE_LOCK:
+        _NOISE_CACHE.clear()
+
+
+def _build_noise(size, intensity, seed):
+    # 与 Image.effect_noise 相同：以 128 为中心、标准差 (intensity - 0.02) * 255 的灰度高斯噪点。
+    # 随机字节经查表映射成高斯分布，整帧一次生成，种子固定时结果可复现。
+    width, height = size
+    rng = random.Random(seed)
+    table = _gaussian_table((intensity - 0.02) * 255)
+    pixels = rng.randbytes(width * height).translate(table)
+    return Image.frombytes('L', (width, height), pixels).convert('RGB')
+
+
+def _gaussian_table(sigma):
+    normal = NormalDist()
+    return bytes(
+        max(0, min(255, round(128 + sigma * normal.inv_cdf((value + 0.5) / 256))))
+        for value in range(256)
+    )
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from PIL import Image
+
+from .asset_naming import file_signature
+
+
+# 解码后的像素按 (路径, mtime, 文件大小, 用途和目标尺寸) 缓存，同时限制条目数和总字节数
+PIXEL_CACHE_SIZE = 32
+PIXEL_CACHE_BYTES = 192 * 1024 * 1024
+IMAGE_INFO_CACHE_SIZE = 512
+# 先用整数倍 reduce 缩到目标尺寸的 REDUCING_GAP 倍以内，再做 LANCZOS，
+# 大图缩小时画质几乎不变，但不再对全分辨率像素做卷积。
+REDUCING_GAP = 3.0
+
+ImageInfo = namedtuple("ImageInfo", ["width", "height", "format", "mode"])
+
+_PIXEL_CACHE = OrderedDict()
+_PIXEL_CACHE_LOCK = threading.Lock()
+_pixel_cache_bytes = 0
+_pixel_cache_hits = 0
+_pixel_cache_misses = 0
+
+
+def image_info(path):
+    """读文件头得到 (宽, 高, 格式, 模式)，按 (路径, mtime, 文件大小) 缓存，不解码像素。
+    质量检查、文字图分页和头图排版共用，同一张图每个进程只探测一次。"""
+    signature = file_signature(path)
+    if not signature:
+        raise FileNotFoundError(path)
+    return _image_info_cached(*signature)
+
+
+@lru_cache(maxsize=IMAGE_INFO_CACHE_SIZE)
+def _image_info_cached(path, mtime_ns, size):
+    with Image.open(path) as img:
+        return ImageInfo(img.width, img.height, img.format, img.mode)
+
+
+def image_size(path):
+    """只读文件头拿到原图尺寸，不解码像素。"""
+    info = image_info(path)
+    return info.width, info.height
+
+
+def load_cached_image(path, key, render):
+    """按 (路径, mtime, 文件大小, key) 缓存 render(source) 的结果，source 是尚未解码的 Image.open 结果。
+
+    key 描述用途和目标尺寸，同一张图每个目标尺寸最多解码一次。返回的图片是共享的，调用方不要原地修改。
+    """
+    global _pixel_cache_bytes, _pixel_cache_hits, _pixel_cache_misses
+    signature = file_signature(path)
+    cache_key = (tuple(signature) if signature else path, key)
+    with _PIXEL_CACHE_LOCK:
+        cached = _PIXEL_CACHE.get(cache_key)
+        if cached is not None:
+            _PIXEL_CACHE.move_to_end(cache_key)
+            _pixel_cache_hits += 1
+            return cached
+        _pixel_cache_misses += 1
+
+    with Image.open(path) as source:
+        rendered = render(source)
+
+    with _PIXEL_CACHE_LOCK:
+        previous = _PIXEL_CACHE.pop(cache_key, None)
+        if previous is not None:
+            _pixel_cache_bytes -= image_bytes(previous)
+        _PIXEL_CACHE[cache_key] = rendered
+        _pixel_cache_bytes += image_bytes(rendered)
+        while len(_PIXEL_CACHE) > 1 and (len(_PIXEL_CACHE) > PIXEL_CACHE_SIZE or _pixel_cache_bytes > PIXEL_CACHE_BYTES):
+            _, evicted = _PIXEL_CACHE.popitem(last=False)
+            _pixel_cache_bytes -= image_bytes(evicted)
+    return rendered
+
+
+def image_bytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def load_fitted_image(path, size, mode="RGBA"):
+    """把图片缩放到 size 并按 (路径, mtime, 文件大小, 目标尺寸, 模式) 缓存。
+
+    JPEG 先用 draft 让解码器直接按 1/2、1/4、1/8 缩小解码（结果不小于目标尺寸），
+    同一张特性图反复预览时直接复用缓存结果。返回的图片是共享的，调用方不要原地修改。
+    """
+    def fit(source):
+        source.draft("RGB", tuple(size))
+        return source.convert(mode).resize(tuple(size), Image.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    return load_cached_image(path, ("fitted", tuple(size), mode), fit)
+
+
+def image_cache_info():
+    with _PIXEL_CACHE_LOCK:
+        pixels = {
+            "hits": _pixel_cache_hits,
+            "misses": _pixel_cache_misses,
+            "entries": len(_PIXEL_CACHE),
+            "bytes": _pixel_cache_bytes,
+        }
+    info = _image_info_cached.cache_info()
+    return {
+        "info": {"hits": info.hits, "misses": info.misses, "entries": info.currsize},
+        "pixels": pixels,
+    }
+
+
+def clear_image_cache():
+    global _pixel_cache_bytes, _pixel_cache_hits, _pixel_cache_misses
+    with _PIXEL_CACHE_LOCK:
+        _PIXEL_CACHE.clear()
+        _pixel_cache_bytes = _pixel_cache_hits = _pixel_cache_misses = 0
+    _image_info_cached.cache_clear()
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+JOB_WORKERS_ENV = "WRITER_STUDIO_JOB_WORKERS"
+DEFAULT_JOB_WORKERS = 2
+# 排队加运行中的任务上限，超出时拒绝提交，避免请求堆积占满内存
+MAX_ACTIVE_JOBS = 16
+# 已结束的任务保留一段时间供前端取结果，按完成顺序淘汰
+MAX_FINISHED_JOBS = 64
+FINISHED_JOB_TTL = 30 * 60
+SSE_HEARTBEAT_SECONDS = 15
+
+_EXECUTOR = None
+_JOBS = OrderedDict()
+_JOBS_LOCK = threading.Lock()
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """一次后台生成：按顺序记录进度事件，最后一个事件是 success 或 error。
+
+    事件是 {"stage", "done", "total"} 形式的 dict，id 为在列表中的序号，
+    SSE 断线重连时按 Last-Event-ID 从下一个事件继续。
+    """
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.result = None
+        self.events = []
+        self.finished_at = None
+        self._condition = threading.Condition()
+
+    def report(self, stage, done=None, total=None):
+        self._append({"stage": stage, "done": done, "total": total})
+
+    def start(self):
+        with self._condition:
+            self.status = "running"
+        self.report("started")
+
+    def finish(self, status, result):
+        # 状态和结束事件一起更新，等待方看到任务结束时一定也能取到最后一个事件
+        with self._condition:
+            self.status = status
+            self.result = result
+            self.finished_at = time.time()
+            self.events.append({"stage": status, "result": result})
+            self._condition.notify_all()
+
+    def _append(self, event):
+        with self._condition:
+            self.events.append(event)
+            self._condition.notify_all()
+
+    @property
+    def finished(self):
+        return self.status in ("success", "error")
+
+    def wait_events(self, after, timeout):
+        """返回序号大于 after 的事件 [(序号, 事件)]；暂时没有新事件时最多等待 timeout 秒，超时返回空列表。
+
+        after 超过已有事件（过期或伪造的 Last-Event-ID）时按最后一个事件处理；
+        任务已结束时不再等待，没有剩余事件就重发结束事件，保证调用方总能收到结束事件后关闭。
+        """
+        with self._condition:
+            after = min(after, len(self.events) - 1)
+            if self.finished:
+                after = min(after, len(self.events) - 2)
+            elif len(self.events) <= after + 1:
+                self._condition.wait(timeout)
+            return list(enumerate(self.events))[after + 1:]
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "job_status": self.status,
+                "progress": self.events[-1] if self.events else None,
+                "result": self.result,
+            }
+
+
+def configured_job_workers():
+    try:
+        return max(1, int(os.environ.get(JOB_WORKERS_ENV, DEFAULT_JOB_WORKERS)))
+    except (TypeError, ValueError):
+        return DEFAULT_JOB_WORKERS
+
+
+def get_executor():
+    global _EXECUTOR
+    with _JOBS_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=configured_job_workers(), thread_name_prefix="writer-studio-job")
+        return _EXECUTOR
+
+
+def submit_job(kind, func, data):
+    """把 func(data, progress=...) 放进后台线程池执行，立即返回 Job。
+
+    func 的返回值作为结果；抛出异常时任务以 error 结束，结果是 {"status": "error", "message": ...}。
+    """
+    job = Job(kind)
+    with _JOBS_LOCK:
+        _prune_finished_jobs()
+        active = sum(1 for existing in _JOBS.values() if not existing.finished)
+        if active >= MAX_ACTIVE_JOBS:
+            raise JobQueueFull("生成任务过多，请稍后再试")
+        _JOBS[job.id] = job
+    job.report("queued")
+    get_executor().submit(_run_job, job, func, data)
+    return job
+
+
+def get_job(job_id):
+    with _JOBS_LOCK:
+        return _JOBS.get(str(job_id))
+
+
+def _run_job(job, func, data):
+    job.start()
+    try:
+        result = func(data, progress=job.report)
+    except Exception as e:
+        print(f"⚠️ 后台任务失败 ({job.kind}): {type(e).__name__}: {e}")
+        job.finish("error", {"status": "error", "message": str(e)})
+    else:
+        job.finish("success", result)
+
+
+def sse_events(job, after=-1):
+    """把任务事件编码成 Server-Sent Events：进度为 progress 事件，结束时发送 success 或 error 后关闭；
+    等待 SSE_HEARTBEAT_SECONDS 仍没有新进度时发送注释行保活。"""
+    while True:
+        events = job.wait_events(after, SSE_HEARTBEAT_SECONDS)
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for index, event in events:
+            name = event["stage"] if event["stage"] in ("success", "error") else "progress"
+            yield f"id: {index}\nevent: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if name != "progress":
+                return
+            after = index
+
+
+def _prune_finished_jobs():
+    now = time.time()
+    finished = [job for job in _JOBS.values() if job.finished]
+    expired = [job for job in finished if now - job.finished_at > FINISHED_JOB_TTL]
+    expired += finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]
+    for job in expired:
+        _JOBS.pop(job.id, None)
@@ -2,26 +2,37 @@ import math
 import os
 import re
 import shutil
-import time
+from datetime import datetime
 
+from .asset_naming import (
+    asset_name,
+    file_digest,
+    fingerprint,
+    prune_output_dir,
+)
 from .preview import export_html_preview
+from .render_pool import ignore_progress, run_jobs
 from .renderer import (
-    auto_format_text,
+    current_render_context,
     draw_cover,
     draw_header,
     draw_heading_gif,
     draw_quote,
+    font_signature,
+    resolve_feature_path,
+    style_subset,
 )
+from .typography import format_document
 
 
-def generate_articles(target_md=None, input_dir="input", output_dir="output", style=None):
+def generate_articles(target_md=None, input_dir="input", output_dir="output", style=None, context=None, workers=None, progress=None):
+    # 未显式传入上下文时沿用 renderer 的全局样式，兼容旧的 set_style 调用方式。
+    # progress(阶段, 已完成, 总数) 依次上报 parse、assets（逐个资源）和 html。
+    context = context or current_render_context(consume_feature=True)
+    progress = progress or ignore_progress
     os.makedirs(input_dir, exist_ok=True)
     os.makedirs(output_dir, exist_ok=True)
 
-    # 资源文件名用行号(index)保证同次生成内唯一；run_stamp 仅用于区分不同生成批次，
-    # 不再依赖 time.time() 的单调性来避免碰撞。
-    run_stamp = int(time.time())
-
     if target_md:
         files = [target_md]
     else:
@@ -37,6 +48,7 @@ def generate_articles(target_md=None, input_dir="input", output_dir="output", st
             continue
 
         print(f"📄 处理中: {md_file}")
+        progress("parse")
         with open(source_path, "r", encoding="utf-8") as f:
             full_text = f.read()
 
@@ -45,51 +57,111 @@ def generate_articles(target_md=None, input_dir="input", output_dir="output", st
         out_dir = os.path.join(output_dir, folder_name)
         assets_dir = os.path.join(out_dir, "assets")
 
-        if os.path.exists(out_dir):
-            shutil.rmtree(out_dir)
-        os.makedirs(assets_dir)
-
-        lines = full_text.splitlines()
+        os.makedirs(assets_dir, exist_ok=True)
+
+        # 资源按内容寻址命名：文件名取自指纹（块文本 + 所用样式 + 字体，以及日期、特性图等画进图里的内容），
+        # 同名文件已存在即可直接复用，只重新绘制改动过的块。
+        # 文件名在解析时就已确定，所以解析阶段只收集渲染任务，Markdown 拼装保持有序；
+        # 解析结束后统一渲染，可选交给进程池并行。
+        kept_assets = []
+        fonts = font_signature(context.style)
+        render_jobs = []
+        pending_paths = {}
+
+        def build_block(assets):
+            names = []
+            for name, render_kind, args in assets:
+                path = os.path.join(assets_dir, name)
+                if not os.path.isfile(path) and path not in pending_paths:
+                    # 先写临时文件再改名，避免中断留下残缺文件被当作可复用资源。
+                    stem, ext = os.path.splitext(path)
+                    pending_paths[path] = f"{stem}.tmp{ext}"
+                    render_jobs.append((render_kind, pending_paths[path], args, context))
+                names.append(name)
+            kept_assets.extend(names)
+            return names
+
+        # 整篇只格式化一次（图片行原样保留），下面各分支直接使用格式化后的行
+        lines = format_document(full_text).splitlines()
         final_lines = []
         heading_count = 0
         main_title = "未命名文章"
 
-        for index, raw_line in enumerate(lines):
+        for raw_line in lines:
             line = raw_line.strip()
-            timestamp = f"{run_stamp}_{index}"
 
             if line.startswith("# "):
-                title_text = auto_format_text(line.replace("# ", "").strip())
+                title_text = line.replace("# ", "").strip()
                 main_title = title_text.split('|')[0]
                 if title_text:
-                    draw_cover(title_text, os.path.join(assets_dir, f"COVER_{timestamp}.png"))
-                    header_name = f"HEADER_{timestamp}.png"
-                    draw_header(title_text, os.path.join(assets_dir, header_name), read_time_mins, asset_dir=input_dir)
+                    feature_path = resolve_feature_path(input_dir, context.feature_name)
+                    block_fingerprint = fingerprint(
+                        "title", title_text, read_time_mins, datetime.now().strftime("%Y-%m-%d"),
+                        file_digest(feature_path), style_subset(context.style, "cover", "header"), fonts,
+                    )
+                    _, header_name = build_block([
+                        (asset_name("COVER", block_fingerprint, ".png"), "cover", (title_text,)),
+                        (asset_name("HEADER", block_fingerprint, ".png"), "header", (title_text, read_time_mins, input_dir)),
+                    ])
                     final_lines.append(f"![](assets/{header_name})\n\n")
             elif line.startswith("## "):
-                heading_text = auto_format_text(line.replace("## ", "").strip())
+                heading_text = line.replace("## ", "").strip()
                 if heading_text:
                     heading_count += 1
-                    draw_heading_gif(heading_text, os.path.join(assets_dir, f"H_{timestamp}.gif"), heading_count)
-                    final_lines.append(f"\n![](assets/H_{timestamp}.gif)\n")
+                    block_fingerprint = fingerprint("heading", heading_text, heading_count, style_subset(context.style, "heading"), fonts)
+                    gif_name, = build_block([
+                        (asset_name("H", block_fingerprint, ".gif"), "heading", (heading_text, heading_count)),
+                    ])
+                    final_lines.append(f"\n![](assets/{gif_name})\n")
             elif line.startswith(">> "):
-                quote_text = auto_format_text(line.replace(">> ", "").strip())
+                quote_text = line.replace(">> ", "").strip()
                 if quote_text:
-                    draw_quote(quote_text, os.path.join(assets_dir, f"Q_{timestamp}.png"))
-                    final_lines.append(f"\n![](assets/Q_{timestamp}.png)\n")
+                    block_fingerprint = fingerprint("quote", quote_text, style_subset(context.style, "quote"), fonts)
+                    quote_name, = build_block([
+                        (asset_name("Q", block_fingerprint, ".png"), "quote", (quote_text,)),
+                    ])
+                    final_lines.append(f"\n![](assets/{quote_name})\n")
             elif line.startswith("!["):
-                _copy_markdown_image(line, input_dir, assets_dir, timestamp, final_lines)
+                _copy_markdown_image(line, input_dir, final_lines, build_block)
             else:
-                formatted_line = auto_format_text(line)
-                final_lines.append(formatted_line + "\n" if formatted_line else "\n")
+                final_lines.append(line + "\n" if line else "\n")
 
-        with open(os.path.join(out_dir, "FINAL_" + md_file), "w", encoding="utf-8") as f:
+        progress("assets", 0, len(render_jobs))
+        run_jobs(render_asset, render_jobs, workers, progress=lambda done, total: progress("assets", done, total))
+        for path, tmp_path in pending_paths.items():
+            os.replace(tmp_path, path)
+
+        progress("html")
+
+        final_name = "FINAL_" + md_file
+        with open(os.path.join(out_dir, final_name), "w", encoding="utf-8") as f:
             f.writelines(final_lines)
 
-        export_html_preview(final_lines, out_dir, folder_name, main_title, style or {})
+        preview_path = export_html_preview(final_lines, out_dir, folder_name, main_title, style or {})
+        kept_names = [final_name] + ([os.path.basename(preview_path)] if preview_path else [])
+        prune_output_dir(out_dir, kept_names, assets_dir, kept_assets)
+
+
+def render_asset(job):
+    """渲染单个资源。模块级函数，可以被进程池 pickle 后在子进程里执行。"""
+    render_kind, save_path, args, context = job
+    if render_kind == "cover":
+        draw_cover(args[0], save_path, context=context)
+    elif render_kind == "header":
+        title_text, read_time_mins, asset_dir = args
+        draw_header(title_text, save_path, read_time_mins, asset_dir=asset_dir, context=context)
+    elif render_kind == "heading":
+        draw_heading_gif(args[0], save_path, args[1], context=context)
+    elif render_kind == "quote":
+        draw_quote(args[0], save_path, context=context)
+    elif render_kind == "copy":
+        shutil.copy(args[0], save_path)
+    else:
+        raise ValueError(f"Unknown render job: {render_kind}")
+    return save_path
 
 
-def _copy_markdown_image(line, input_dir, assets_dir, timestamp, final_lines):
+def _copy_markdown_image(line, input_dir, final_lines, build_block):
     match = re.search(r'\((.*?)\)', line)
     if not match:
         return
@@ -104,8 +176,10 @@ def _copy_markdown_image(line, input_dir, assets_dir, timestamp, final_lines):
     for path in possible_paths:
         if os.path.exists(path) and os.path.isfile(path):
             ext = os.path.splitext(path)[1]
-            new_name = f"IMG_{timestamp}{ext}"
-            shutil.copy(path, os.path.join(assets_dir, new_name))
+            block_fingerprint = fingerprint("image", file_digest(path))
+            new_name, = build_block([
+                (asset_name("IMG", block_fingerprint, ext), "copy", (path,)),
+            ])
             final_lines.append(f"![](assets/{new_name})\n")
             return
 
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+RENDER_WORKERS_ENV = "WRITER_STUDIO_RENDER_WORKERS"
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def configured_workers(workers=None):
+    """渲染进程数：显式参数优先，其次读环境变量；0 或 1 表示在当前进程里顺序渲染。"""
+    if workers is None:
+        workers = os.environ.get(RENDER_WORKERS_ENV, "0")
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        return 0
+    return max(0, workers)
+
+
+def get_process_pool(workers):
+    # 进程池按进程数共享并常驻，避免每次生成都重新拉起子进程、重新加载字体。
+    with _POOLS_LOCK:
+        pool = _POOLS.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+            _POOLS[workers] = pool
+        return pool
+
+
+def pool_context():
+    """子进程不用 fork 启动：进程池是在多线程的服务里按需创建的，fork 时其他线程若正持有字体、
+    缓存或日志的锁，子进程会在第一次渲染时死锁。优先 forkserver，不支持时用 spawn。"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def discard_process_pool(workers):
+    with _POOLS_LOCK:
+        pool = _POOLS.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_jobs(func, jobs, workers=None, progress=None):
+    """执行一批互不依赖的渲染任务，按提交顺序返回结果。
+
+    func 和 jobs 必须可 pickle（模块级函数 + 普通数据），才能发给子进程。
+    progress(done, total) 在每个任务的结果按顺序取回后调用，用于上报进度。
+    """
+    jobs = list(jobs)
+    workers = configured_workers(workers)
+    if workers <= 1 or len(jobs) <= 1:
+        return collect_results((func(job) for job in jobs), len(jobs), progress)
+
+    try:
+        return collect_results(get_process_pool(workers).map(func, jobs), len(jobs), progress)
+    except BrokenProcessPool as e:
+        print(f"⚠️ 渲染进程池异常，改为顺序渲染: {type(e).__name__}: {e}")
+        discard_process_pool(workers)
+        return collect_results((func(job) for job in jobs), len(jobs), progress)
+
+
+def collect_results(results, total, progress=None):
+    collected = []
+    for result in results:
+        collected.append(result)
+        if progress:
+            progress(len(collected), total)
+    return collected
+
+
+def ignore_progress(stage, done=None, total=None):
+    """不需要上报进度时的空回调；生成流程统一按 progress(阶段, 已完成, 总数) 上报。"""
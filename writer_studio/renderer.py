@@ -2,11 +2,14 @@ import math
 import os
 import textwrap
 from datetime import datetime
-from functools import lru_cache
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw
 
-import path_utils
+from .asset_naming import file_signature
+from .autofit import fit_font_size, fit_text_width, measure_bbox, measure_text, wrap_chars
+from .fonts import get_font_registry
+from .grain import DEFAULT_GRAIN_SEED, add_film_grain
+from .image_cache import image_size, load_fitted_image
 from .renderers.social_cards import draw_social_text_images as render_social_text_images
 from .themes import build_style
 from .typography import auto_format_text, strip_markers
@@ -26,25 +29,61 @@ def set_specific_feature(filename):
     SPECIFIC_FEATURE_NAME = filename
 
 
-def get_font_path():
-    base = path_utils.get_internal_path(os.path.join("fonts", STYLE["font_name"]))
-    for ext in [".otf", ".ttf", ".ttc"]:
-        if os.path.exists(base + ext):
-            return base + ext
-    print(f"⚠️ Font not found at: {base}")
-    return None
+class RenderContext:
+    """单次生成的渲染状态：主题样式和本次使用的特性图。
+
+    每次生成各自持有一个实例，不共享可变的模块级状态，
+    因此不同会话的生成可以在多个线程里并行执行。
+    """
+
+    def __init__(self, style=None, feature_name=None):
+        self.style = style if style is not None else build_style()
+        self.feature_name = feature_name
+
+    def load_font(self, size, weight=None):
+        return load_font(size, self.style, weight)
+
+
+def current_render_context(consume_feature=False):
+    """兼容旧调用方：用 set_style / set_specific_feature 设置的全局值构造上下文。"""
+    global SPECIFIC_FEATURE_NAME
+    context = RenderContext(STYLE, SPECIFIC_FEATURE_NAME)
+    if consume_feature:
+        SPECIFIC_FEATURE_NAME = None
+    return context
+
+
+def get_font_path(style=None):
+    return get_font_registry().resolve(style if style is not None else STYLE)
+
 
+# 每类资源实际读取的样式键（按前缀匹配），只有这些键参与资源指纹，
+# 改动无关的配置（例如文字图参数）不会让文章资源换名重绘。
+ASSET_STYLE_KEYS = {
+    "cover": ("canvas_width", "font_name", "author_text", "grain_seed", "cover_"),
+    "header": ("canvas_width", "font_name", "author_text", "grain_seed", "header_"),
+    "heading": ("canvas_width", "font_name", "h_", "gif_"),
+    "quote": ("canvas_width", "font_name", "q_", "cover_accent_color", "footer_gold"),
+}
 
-@lru_cache(maxsize=128)
-def _truetype_cached(path, size):
-    return ImageFont.truetype(path, size)
 
+def style_subset(style, *kinds):
+    prefixes = tuple(prefix for kind in kinds for prefix in ASSET_STYLE_KEYS[kind])
+    return {key: value for key, value in style.items() if key.startswith(prefixes)}
 
-def load_font(size):
-    path = get_font_path()
-    if not path:
-        return ImageFont.load_default()
-    return _truetype_cached(path, size)
+
+def font_signature(style=None):
+    """字体文件的身份信息，用于判断已生成的资源是否仍可复用。"""
+    style = style if style is not None else STYLE
+    registry = get_font_registry()
+    return [
+        file_signature(registry.resolve(style)),
+        file_signature(registry.resolve(style, "serif_bold")),
+    ]
+
+
+def load_font(size, style=None, weight=None):
+    return get_font_registry().load(size, style if style is not None else STYLE, weight)
 
 
 def process_text_lines(text, max_chars=15):
@@ -53,14 +92,6 @@ def process_text_lines(text, max_chars=15):
     return textwrap.wrap(text, width=max_chars)
 
 
-def add_film_grain(img, intensity=0.08):
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    width, height = img.size
-    noise = Image.effect_noise((width, height), (intensity - 0.02) * 255).convert('RGB')
-    return Image.blend(img, noise, 0.03)
-
-
 def draw_rich_text(draw, x, y, text_with_markers, font, base_color, accent_color, init_bold=False):
     parts = text_with_markers.split('\x01')
     current_x = x
@@ -69,36 +100,33 @@ def draw_rich_text(draw, x, y, text_with_markers, font, base_color, accent_color
         if part:
             color = accent_color if is_bold else base_color
             draw.text((current_x, y), part, font=font, fill=color)
-            current_x += font.getlength(part)
+            current_x += measure_text(font, part)
         if i < len(parts) - 1:
             is_bold = not is_bold
     return is_bold
 
 
 def get_rich_bbox(text, font):
-    return font.getbbox(strip_markers(text))
+    return measure_bbox(font, strip_markers(text))
 
 
-def draw_cover(text, save_path):
+def draw_cover(text, save_path, context=None):
+    context = context or current_render_context()
+    style = context.style
     text = text.replace('**', '\x01')
-    w, h = STYLE["canvas_width"], int(STYLE["canvas_width"] / STYLE["cover_ratio"])
-    img = Image.new("RGB", (w, h), STYLE["cover_bg_color"])
+    w, h = style["canvas_width"], int(style["canvas_width"] / style["cover_ratio"])
+    img = Image.new("RGB", (w, h), style["cover_bg_color"])
     draw = ImageDraw.Draw(img)
     main_title = text.split('|')[0].strip()
-    margin = STYLE["cover_margin"]
-    is_vintage = "cover_header_text" in STYLE
+    margin = style["cover_margin"]
+    is_vintage = "cover_header_text" in style
 
     if is_vintage:
-        serif_bold_path = os.path.expanduser("~/Library/Fonts/SourceHanSerif-Bold.ttc")
-        has_serif = os.path.exists(serif_bold_path)
-
         def load_serif(size):
-            if has_serif:
-                return ImageFont.truetype(serif_bold_path, size, index=0)
-            return load_font(size)
+            return context.load_font(size, "serif_bold")
 
-        font_small = load_font(20)
-        header_text = STYLE.get("cover_header_text", "")
+        font_small = context.load_font(20)
+        header_text = style.get("cover_header_text", "")
         current_y = margin
         draw.text((margin, current_y), header_text, font=font_small, fill="#999990")
         current_y += 70
@@ -108,127 +136,103 @@ def draw_cover(text, save_path):
         sub_title = parts[1].strip() if len(parts) > 1 else ""
 
         max_width = w - (margin * 2)
-        title_font_size = STYLE["cover_main_size"]
         sub_reserve = 100 if sub_title else 0
         footer_reserve = 80
         available_title_h = h - current_y - margin - sub_reserve - footer_reserve
 
-        while title_font_size >= 70:
-            font_main = load_serif(title_font_size)
-            title_lines = []
-            current_line = ""
-            for ch in list(main_title_text):
-                test = current_line + ch
-                if font_main.getlength(test) > max_width and current_line:
-                    title_lines.append(current_line)
-                    current_line = ch
-                else:
-                    current_line = test
-            if current_line:
-                title_lines.append(current_line)
+        def title_fits(size):
+            lines = wrap_chars(load_serif(size), main_title_text, max_width)
+            return len(lines) * int(size * 1.35) <= available_title_h
 
-            line_height = int(title_font_size * 1.35)
-            total_title_h = len(title_lines) * line_height
-            if total_title_h <= available_title_h:
-                break
-            title_font_size -= 5
+        title_font_size = fit_font_size(title_fits, style["cover_main_size"], 70, step=5)
+        font_main = load_serif(title_font_size)
+        title_lines = wrap_chars(font_main, main_title_text, max_width)
+        line_height = int(title_font_size * 1.35)
 
         bold_state = False
         for line in title_lines:
             bold_state = draw_rich_text(
                 draw, margin, current_y, line,
                 font=font_main,
-                base_color=STYLE["cover_text_color"],
-                accent_color=STYLE.get("cover_accent_color", STYLE["cover_text_color"]),
+                base_color=style["cover_text_color"],
+                accent_color=style.get("cover_accent_color", style["cover_text_color"]),
                 init_bold=bold_state,
             )
             current_y += line_height
 
         if sub_title:
             current_y += 15
-            sub_size = STYLE.get("cover_sub_size", 42)
+            sub_size = style.get("cover_sub_size", 42)
             font_sub = load_serif(sub_size)
             draw.text((margin, current_y), sub_title, font=font_sub, fill="#555555")
             current_y += int(sub_size * 1.5)
 
-        font_meta = load_font(STYLE["cover_footer_size"])
-        meta_text = STYLE.get("cover_meta_text", STYLE['author_text'])
+        font_meta = context.load_font(style["cover_footer_size"])
+        meta_text = style.get("cover_meta_text", style['author_text'])
         line_y = h - margin - 50
         draw.line([(margin, line_y), (w - margin, line_y)], fill="#CCCCC0", width=1)
         draw.text((margin, line_y + 18), meta_text, font=font_meta, fill="#999990")
     else:
         current_y = margin + 20
-        draw.rectangle([(margin, current_y), (margin + 80, current_y + 6)], fill=STYLE["cover_text_color"])
+        draw.rectangle([(margin, current_y), (margin + 80, current_y + 6)], fill=style["cover_text_color"])
         current_y += 70
         max_width = w - (margin * 2)
-        current_font_size = STYLE["cover_main_size"]
-        min_font_size = 60
-        font_main = load_font(current_font_size)
-        while font_main.getlength(strip_markers(main_title)) > max_width and current_font_size > min_font_size:
-            current_font_size -= 2
-            font_main = load_font(current_font_size)
+        _, font_main = fit_text_width(context.load_font, strip_markers(main_title), max_width, style["cover_main_size"], 60)
         draw_rich_text(
             draw, margin, current_y, main_title,
             font=font_main,
-            base_color=STYLE["cover_text_color"],
-            accent_color=STYLE.get("cover_accent_color", STYLE["cover_text_color"]),
+            base_color=style["cover_text_color"],
+            accent_color=style.get("cover_accent_color", style["cover_text_color"]),
         )
-        font_footer = load_font(STYLE["cover_footer_size"])
+        font_footer = context.load_font(style["cover_footer_size"])
         date_str = datetime.now().strftime("%b %d, %Y").upper()
-        footer_text = f"{STYLE['author_text']}   ·   {date_str}"
+        footer_text = f"{style['author_text']}   ·   {date_str}"
         bbox = font_footer.getbbox(footer_text)
         f_x, f_y = w - margin - (bbox[2] - bbox[0]), h - margin - (bbox[3] - bbox[1])
-        draw.line([(0, f_y - 40), (w, f_y - 40)], fill=STYLE["cover_text_color"], width=1)
-        draw.text((f_x, f_y), footer_text, font=font_footer, fill=STYLE["cover_text_color"])
-    add_film_grain(img).save(save_path)
+        draw.line([(0, f_y - 40), (w, f_y - 40)], fill=style["cover_text_color"], width=1)
+        draw.text((f_x, f_y), footer_text, font=font_footer, fill=style["cover_text_color"])
+    add_film_grain(img, seed=style.get("grain_seed", DEFAULT_GRAIN_SEED)).save(save_path)
 
 
-def draw_header(text, save_path, read_time_mins, asset_dir="input"):
+def draw_header(text, save_path, read_time_mins, asset_dir="input", context=None):
+    context = context or current_render_context(consume_feature=True)
+    style = context.style
     text = text.replace('**', '\x01')
-    global SPECIFIC_FEATURE_NAME
-    current_feature_name = SPECIFIC_FEATURE_NAME
-    SPECIFIC_FEATURE_NAME = None
-    w, h = STYLE["canvas_width"], int(STYLE["canvas_width"] / STYLE["header_ratio"])
-    main_font_size, sub_font_size = STYLE["header_main_size"], STYLE["header_sub_size"]
-    font_footer = load_font(STYLE["header_footer_size"])
-    img = Image.new("RGB", (w, h), STYLE["header_bg_color"])
+    w, h = style["canvas_width"], int(style["canvas_width"] / style["header_ratio"])
+    main_font_size, sub_font_size = style["header_main_size"], style["header_sub_size"]
+    font_footer = context.load_font(style["header_footer_size"])
+    img = Image.new("RGB", (w, h), style["header_bg_color"])
     draw = ImageDraw.Draw(img)
-    margin = STYLE["header_margin"]
+    margin = style["header_margin"]
     max_width = w - (margin * 2)
     out_m = 40
 
-    draw.rectangle([(out_m, out_m), (w - out_m, h - out_m)], outline=STYLE["header_text_color"], width=1)
+    draw.rectangle([(out_m, out_m), (w - out_m, h - out_m)], outline=style["header_text_color"], width=1)
 
     parts = text.split('|', 1)
     main_title = parts[0].strip()
     sub_title = parts[1].strip() if len(parts) > 1 else ""
 
     current_y = margin + 40
-    draw.text((margin, current_y), "ISSUE / THE ARENA", font=font_footer, fill=STYLE["header_text_color"])
+    draw.text((margin, current_y), "ISSUE / THE ARENA", font=font_footer, fill=style["header_text_color"])
     current_y += 60
 
-    font_main = load_font(main_font_size)
-    while font_main.getlength(strip_markers(main_title)) > max_width and main_font_size > 40:
-        main_font_size -= 2
-        font_main = load_font(main_font_size)
+    _, font_main = fit_text_width(context.load_font, strip_markers(main_title), max_width, main_font_size, 40)
     draw_rich_text(
         draw, margin, current_y, main_title,
         font=font_main,
-        base_color=STYLE["header_text_color"],
-        accent_color=STYLE.get("header_accent_color", STYLE["header_text_color"]),
+        base_color=style["header_text_color"],
+        accent_color=style.get("header_accent_color", style["header_text_color"]),
     )
     bbox_main = get_rich_bbox(main_title, font_main)
     current_y += (bbox_main[3] - bbox_main[1]) + 40
 
     if sub_title:
         current_y += 10
-        draw.rectangle([(margin, current_y), (margin + 60, current_y + 4)], fill=STYLE["header_text_color"])
+        draw.rectangle([(margin, current_y), (margin + 60, current_y + 4)], fill=style["header_text_color"])
         current_y += 30
-        font_sub = load_font(sub_font_size)
-        while font_sub.getlength(sub_title) > max_width and sub_font_size > 24:
-            sub_font_size -= 2
-            font_sub = load_font(sub_font_size)
-        draw.text((margin, current_y), sub_title, font=font_sub, fill=STYLE["header_text_color"])
+        _, font_sub = fit_text_width(context.load_font, sub_title, max_width, sub_font_size, 24)
+        draw.text((margin, current_y), sub_title, font=font_sub, fill=style["header_text_color"])
         bbox_sub = font_sub.getbbox(sub_title)
         current_y += (bbox_sub[3] - bbox_sub[1]) + 20
 
@@ -240,24 +244,12 @@ def draw_header(text, save_path, read_time_mins, asset_dir="input"):
     footer_top_y = y_line1 - 20
     available_h, target_w = footer_top_y - text_end_y - 40, w - (margin * 2)
 
-    feature_path = None
-    if current_feature_name:
-        path = os.path.join(asset_dir, current_feature_name)
-        if os.path.exists(path):
-            feature_path = path
-
-    if not feature_path:
-        for candidate in ["feature.png", "feature.jpg", "feature.jpeg"]:
-            path = os.path.join(asset_dir, candidate)
-            if os.path.exists(path):
-                feature_path = path
-                break
-
+    feature_path = resolve_feature_path(asset_dir, context.feature_name)
     if feature_path:
         try:
-            feature_img = Image.open(feature_path).convert("RGBA")
             if available_h > 100:
-                ratio = feature_img.width / feature_img.height
+                source_w, source_h = image_size(feature_path)
+                ratio = source_w / source_h
                 new_h = int(target_w / ratio)
                 if new_h > available_h:
                     new_h = available_h
@@ -265,113 +257,150 @@ def draw_header(text, save_path, read_time_mins, asset_dir="input"):
                     final_x = (w - target_w) // 2
                 else:
                     final_x = margin
-                feature_img = feature_img.resize((target_w, new_h), Image.LANCZOS)
+                feature_img = load_fitted_image(feature_path, (target_w, new_h))
                 img.paste(feature_img, (final_x, text_end_y), feature_img)
         except Exception as e:
             print(f"⚠️ 特性图加载失败 ({feature_path}): {type(e).__name__}: {e}")
     elif available_h > 200:
         cx, cy, r = w // 2, text_end_y + (available_h // 2), 80
-        draw.ellipse([(cx - r, cy - r), (cx + r, cy + r)], outline=STYLE["header_text_color"], width=1)
-        draw.ellipse([(cx - r * 1.5, cy - r * 1.5), (cx + r * 1.5, cy + r * 1.5)], outline=STYLE["header_text_color"], width=1)
-        draw.line([(cx, cy - r * 2), (cx, cy + r * 2)], fill=STYLE["header_text_color"], width=1)
+        draw.ellipse([(cx - r, cy - r), (cx + r, cy + r)], outline=style["header_text_color"], width=1)
+        draw.ellipse([(cx - r * 1.5, cy - r * 1.5), (cx + r * 1.5, cy + r * 1.5)], outline=style["header_text_color"], width=1)
+        draw.line([(cx, cy - r * 2), (cx, cy + r * 2)], fill=style["header_text_color"], width=1)
 
-    draw.text((margin, y_line1), STYLE['author_text'], font=font_footer, fill=STYLE["header_text_color"])
-    draw.text((margin, y_line2), datetime.now().strftime("%B %d, %Y").upper(), font=font_footer, fill=STYLE["header_text_color"])
+    draw.text((margin, y_line1), style['author_text'], font=font_footer, fill=style["header_text_color"])
+    draw.text((margin, y_line2), datetime.now().strftime("%B %d, %Y").upper(), font=font_footer, fill=style["header_text_color"])
     read_text = f"预计阅读 {read_time_mins} 分钟"
     bbox_r = font_footer.getbbox(read_text)
-    draw.text((w - margin - (bbox_r[2] - bbox_r[0]), y_line2), read_text, font=font_footer, fill=STYLE["header_text_color"])
-    add_film_grain(img).save(save_path)
+    draw.text((w - margin - (bbox_r[2] - bbox_r[0]), y_line2), read_text, font=font_footer, fill=style["header_text_color"])
+    add_film_grain(img, seed=style.get("grain_seed", DEFAULT_GRAIN_SEED)).save(save_path)
+
+
+def resolve_feature_path(asset_dir, feature_name=None):
+    if feature_name:
+        path = os.path.join(asset_dir, feature_name)
+        if os.path.exists(path):
+            return path
+
+    for candidate in ["feature.png", "feature.jpg", "feature.jpeg"]:
+        path = os.path.join(asset_dir, candidate)
+        if os.path.exists(path):
+            return path
+    return None
 
 
-def draw_heading_gif(text, save_path, index):
+def draw_heading_gif(text, save_path, index, context=None):
+    context = context or current_render_context()
+    style = context.style
     text = text.replace('**', '\x01')
-    font, num_font = load_font(STYLE["h_font_size"]), load_font(STYLE["h_num_font_size"])
-    w, cx = STYLE["canvas_width"], STYLE["canvas_width"] // 2
+    font, num_font = context.load_font(style["h_font_size"]), context.load_font(style["h_num_font_size"])
+    w, cx = style["canvas_width"], style["canvas_width"] // 2
     lines = process_text_lines(text)
     line_bboxes = [get_rich_bbox(line, font) for line in lines]
     total_text_h = sum(bbox[3] - bbox[1] for bbox in line_bboxes) + (len(lines) * 25) - 25
-    img_h = STYLE["h_padding_top"] + (STYLE["h_num_radius"] * 2) + STYLE["h_text_gap"] + total_text_h + STYLE["h_padding_bottom"]
+    img_h = style["h_padding_top"] + (style["h_num_radius"] * 2) + style["h_text_gap"] + total_text_h + style["h_padding_bottom"]
+    cy, br = style["h_padding_top"] + style["h_num_radius"], style["h_num_radius"]
+
+    # 只有两个圆环在动：线条、序号和标题文字只画一次，整张只量化一次，所有帧共用同一调色板
+    img = Image.new("RGB", (w, img_h), style["h_bg_color"])
+    draw = ImageDraw.Draw(img)
+    draw.line([(0, 20), (w, 20)], fill=style["h_num_color"], width=4)
+    draw.line([(0, 32), (w, 32)], fill=style["h_num_color"], width=1)
+    num_text = str(index)
+    num_bbox = measure_bbox(num_font, num_text)
+    draw.text((cx - (num_bbox[2] - num_bbox[0]) // 2, cy - (num_bbox[3] - num_bbox[1]) // 2 - num_bbox[1] - 2), num_text, font=num_font, fill=style["h_num_color"])
+    cy_t = cy + br + style["h_text_gap"]
+    for line, line_bbox in zip(lines, line_bboxes):
+        draw_rich_text(
+            draw, cx - (line_bbox[2] - line_bbox[0]) // 2, cy_t, line,
+            font=font,
+            base_color=style["h_color"],
+            accent_color=style.get("h_num_color", style["h_color"]),
+        )
+        cy_t += (line_bbox[3] - line_bbox[1]) + 25
+    draw.line([(0, img_h - 20), (w, img_h - 20)], fill=style["h_num_color"], width=4)
+    static_layer = img.convert("P", palette=Image.Palette.ADAPTIVE)
+    ring = nearest_palette_index(static_layer, ImageColor.getrgb(style["h_num_color"]))
+
     frames = []
-    for f in range(STYLE["gif_frames"]):
-        img = Image.new("RGB", (w, img_h), STYLE["h_bg_color"])
-        draw = ImageDraw.Draw(img)
-        offset = math.sin((f / STYLE["gif_frames"]) * math.pi) * 4
-        cy, br = STYLE["h_padding_top"] + STYLE["h_num_radius"], STYLE["h_num_radius"]
-        draw.line([(0, 20), (w, 20)], fill=STYLE["h_num_color"], width=4)
-        draw.line([(0, 32), (w, 32)], fill=STYLE["h_num_color"], width=1)
-        draw.ellipse([(cx - (br + offset), cy - (br + offset)), (cx + (br + offset), cy + (br + offset))], outline=STYLE["h_num_color"], width=1)
-        draw.ellipse([(cx - (br - 6 + offset * 0.6), cy - (br - 6 + offset * 0.6)), (cx + (br - 6 + offset * 0.6), cy + (br - 6 + offset * 0.6))], outline=STYLE["h_num_color"], width=2)
-        num_text = str(index)
-        num_bbox = num_font.getbbox(num_text)
-        draw.text((cx - (num_bbox[2] - num_bbox[0]) // 2, cy - (num_bbox[3] - num_bbox[1]) // 2 - num_bbox[1] - 2), num_text, font=num_font, fill=STYLE["h_num_color"])
-        cy_t = cy + br + STYLE["h_text_gap"]
-        for line, line_bbox in zip(lines, line_bboxes):
-            draw_rich_text(
-                draw, cx - (line_bbox[2] - line_bbox[0]) // 2, cy_t, line,
-                font=font,
-                base_color=STYLE["h_color"],
-                accent_color=STYLE.get("h_num_color", STYLE["h_color"]),
-            )
-            cy_t += (line_bbox[3] - line_bbox[1]) + 25
-        draw.line([(0, img_h - 20), (w, img_h - 20)], fill=STYLE["h_num_color"], width=4)
-        frames.append(img)
-    frames[0].save(save_path, save_all=True, append_images=frames[1:], duration=STYLE["gif_duration"], loop=0)
+    for f in range(style["gif_frames"]):
+        frame = static_layer.copy()
+        draw = ImageDraw.Draw(frame)
+        offset = math.sin((f / style["gif_frames"]) * math.pi) * 4
+        draw.ellipse([(cx - (br + offset), cy - (br + offset)), (cx + (br + offset), cy + (br + offset))], outline=ring, width=1)
+        draw.ellipse([(cx - (br - 6 + offset * 0.6), cy - (br - 6 + offset * 0.6)), (cx + (br - 6 + offset * 0.6), cy + (br - 6 + offset * 0.6))], outline=ring, width=2)
+        frames.append(frame)
+    # 各帧共用全局调色板（不再逐帧写局部色表），编码器只写出与上一帧不同的圆环区域；
+    # disposal=1 保留上一帧作为底图
+    frames[0].save(
+        save_path, save_all=True, append_images=frames[1:],
+        duration=style["gif_duration"], loop=0, disposal=1, palette=static_layer.getpalette(),
+    )
+
+
+def nearest_palette_index(img, rgb):
+    palette = img.getpalette()[:768]
+    colors = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)]
+    return min(range(len(colors)), key=lambda i: sum((a - b) ** 2 for a, b in zip(colors[i], rgb)))
 
 
-def draw_quote(text, save_path):
+def draw_quote(text, save_path, context=None):
+    context = context or current_render_context()
+    style = context.style
     text = text.replace('**', '\x01')
-    font = load_font(STYLE["q_font_size"])
-    w = STYLE["canvas_width"]
-    qm_font = load_font(STYLE["q_font_size"] * 4)
-    lines = process_text_lines(text, (w - STYLE["q_padding_x"] * 2) // STYLE["q_font_size"])
+    font = context.load_font(style["q_font_size"])
+    w = style["canvas_width"]
+    qm_font = context.load_font(style["q_font_size"] * 4)
+    lines = process_text_lines(text, (w - style["q_padding_x"] * 2) // style["q_font_size"])
     line_bboxes = [get_rich_bbox(line, font) for line in lines]
-    total_h = sum(bbox[3] - bbox[1] for bbox in line_bboxes) + (len(lines) * STYLE["q_line_spacing"]) - STYLE["q_line_spacing"]
-    img_h = total_h + (STYLE["q_deco_gap"] * 2)
+    total_h = sum(bbox[3] - bbox[1] for bbox in line_bboxes) + (len(lines) * style["q_line_spacing"]) - style["q_line_spacing"]
+    img_h = total_h + (style["q_deco_gap"] * 2)
     mask = Image.new("L", (w, img_h), 0)
     draw_mask = ImageDraw.Draw(mask)
-    r = STYLE["q_radius"]
+    r = style["q_radius"]
     draw_mask.rounded_rectangle([(0, 0), (w, img_h)], radius=r, fill=255)
-    fold_size = STYLE["q_fold_size"]
+    fold_size = style["q_fold_size"]
     cut_poly = [(w, img_h), (w, img_h - fold_size), (w - fold_size, img_h)]
     draw_mask.polygon(cut_poly, fill=0)
-    card_color_layer = Image.new("RGBA", (w, img_h), STYLE["q_bg_color"])
+    card_color_layer = Image.new("RGBA", (w, img_h), style["q_bg_color"])
     img = Image.new("RGBA", (w, img_h), (0, 0, 0, 0))
     img.paste(card_color_layer, mask=mask)
     draw = ImageDraw.Draw(img)
     watermark_color = (200, 200, 200, 60)
-    draw.text((STYLE["q_padding_x"] - 40, STYLE["q_deco_gap"] - 40), "“", font=qm_font, fill=watermark_color)
-    for y in [STYLE["q_deco_gap"] - 50, img_h - STYLE["q_deco_gap"] + 50]:
-        draw.line([(w // 2 - STYLE["q_deco_width"], y), (w // 2 + STYLE["q_deco_width"], y)], fill=STYLE["q_line_color"], width=4)
-        draw.regular_polygon((w // 2, y, 6), 4, rotation=0, fill=STYLE["q_line_color"])
+    draw.text((style["q_padding_x"] - 40, style["q_deco_gap"] - 40), "“", font=qm_font, fill=watermark_color)
+    for y in [style["q_deco_gap"] - 50, img_h - style["q_deco_gap"] + 50]:
+        draw.line([(w // 2 - style["q_deco_width"], y), (w // 2 + style["q_deco_width"], y)], fill=style["q_line_color"], width=4)
+        draw.regular_polygon((w // 2, y, 6), 4, rotation=0, fill=style["q_line_color"])
     cy = (img_h - total_h) // 2
     bold_state = False
     for line, line_bbox in zip(lines, line_bboxes):
-        lx = w - (line_bbox[2] - line_bbox[0]) - (STYLE["q_padding_x"] + 20) if line.startswith(("——", "--")) else (w - (line_bbox[2] - line_bbox[0])) // 2
+        lx = w - (line_bbox[2] - line_bbox[0]) - (style["q_padding_x"] + 20) if line.startswith(("——", "--")) else (w - (line_bbox[2] - line_bbox[0])) // 2
         bold_state = draw_rich_text(
             draw, lx, cy, line,
             font=font,
-            base_color=STYLE["q_text_color"],
-            accent_color=STYLE.get("q_accent_color", STYLE.get("cover_accent_color", STYLE["q_text_color"])),
+            base_color=style["q_text_color"],
+            accent_color=style.get("q_accent_color", style.get("cover_accent_color", style["q_text_color"])),
             init_bold=bold_state,
         )
-        cy += (line_bbox[3] - line_bbox[1]) + STYLE["q_line_spacing"]
+        cy += (line_bbox[3] - line_bbox[1]) + style["q_line_spacing"]
     flap_poly = [(w - fold_size, img_h - fold_size), (w, img_h - fold_size), (w - fold_size, img_h)]
     draw.polygon(flap_poly, fill="#F2F2F2", outline=None)
-    draw.line([(w - fold_size, img_h), (w - fold_size, img_h - fold_size), (w, img_h - fold_size)], fill=STYLE["footer_gold"], width=1)
+    draw.line([(w - fold_size, img_h), (w - fold_size, img_h - fold_size), (w, img_h - fold_size)], fill=style["footer_gold"], width=1)
     draw.line([(w - fold_size, img_h), (w, img_h - fold_size)], fill="#E0E0E0", width=1)
     img.save(save_path, format="PNG")
 
 
-def draw_social_text_image(title, paragraphs, save_path):
+def draw_social_text_image(title, paragraphs, save_path, context=None):
     page_paths = draw_social_text_images(
         title,
         paragraphs,
         os.path.dirname(save_path),
         os.path.splitext(os.path.basename(save_path))[0],
+        context=context,
     )
     if page_paths and page_paths[0] != save_path:
         os.replace(page_paths[0], save_path)
 
 
-def draw_social_text_images(title, paragraphs, output_dir, base_name):
-    return render_social_text_images(title, paragraphs, output_dir, base_name, STYLE)
+def draw_social_text_images(title, paragraphs, output_dir, base_name, context=None):
+    context = context or current_render_context()
+    return render_social_text_images(title, paragraphs, output_dir, base_name, context.style)
@@ -1,15 +1,35 @@
+import math
 import os
 import re
+import threading
 import time
+from collections import OrderedDict, namedtuple
 from datetime import datetime
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 
-import path_utils
-from ..typography import auto_format_text, strip_markers, wrap_text_by_width
+from ..asset_naming import asset_name, file_digest, file_signature, fingerprint
+from ..fonts import SOCIAL_FONT_SPECS, get_font_registry
+from ..glyph_atlas import GLYPH_ATLAS_STYLE_KEY, glyph_atlas
+from ..grain import DEFAULT_GRAIN_SEED, add_film_grain, noise_frame
+from ..image_cache import REDUCING_GAP, image_size, load_cached_image
+from ..render_pool import ignore_progress, run_jobs
+from ..typography import auto_format_text, format_document, strip_markers, wrap_lines
 
 
 IMAGE_PATTERN = re.compile(r'^!\[(.*?)\]\((.*?)\)(?:\{([^}]*)\})?$')
+# 按指纹命名的文字图页面前缀，内容不变时文件名和 URL 都不变
+SOCIAL_PAGE_PREFIX = "SOCIAL"
+# 编辑器预览用的草稿页：按比例缩小绘制，双线性缩放图片、不加颗粒、PNG 快速压缩；
+# 分页仍按全尺寸计算，与导出结果一致。
+SOCIAL_DRAFT_PREFIX = "DRAFT"
+SOCIAL_PREVIEW_SCALE = 0.5
+SOCIAL_GRAIN_INTENSITY = 0.05
+# 底色和页眉按 (样式指纹, 日期, 比例) 预先画好的空白页
+SOCIAL_TEMPLATE_CACHE_SIZE = 4
+
+_SOCIAL_TEMPLATES = OrderedDict()
+_SOCIAL_TEMPLATES_LOCK = threading.Lock()
 
 
 def extract_social_image_text(content, layout_overrides=None, block_controls=None):
@@ -30,7 +50,8 @@ def extract_social_image_text(content, layout_overrides=None, block_controls=Non
         blocks.append(block)
         block_index += 1
 
-    for raw_line in content.splitlines():
+    # 整篇只格式化一次，图片行原样保留；图片说明单独格式化后存进块里，排版和绘制都直接复用
+    for raw_line in format_document(content).splitlines():
         line = raw_line.strip()
         if not line:
             continue
@@ -41,6 +62,7 @@ def extract_social_image_text(content, layout_overrides=None, block_controls=Non
             add_block({
                 "kind": "image",
                 "alt": image_match.group(1).strip(),
+                "caption": auto_format_text(image_match.group(1).strip()),
                 "src": image_match.group(2).strip(),
                 "attrs": attrs,
                 "image_index": image_index,
@@ -56,10 +78,10 @@ def extract_social_image_text(content, layout_overrides=None, block_controls=Non
             image_index += 1
             continue
         if line.startswith("# "):
-            title = auto_format_text(line.replace("# ", "", 1).strip()).split("|", 1)[0].strip()
+            title = line.replace("# ", "", 1).strip().split("|", 1)[0].strip()
             continue
         if line.startswith("## "):
-            heading = auto_format_text(line.replace("## ", "", 1).strip())
+            heading = line.replace("## ", "", 1).strip()
             if heading:
                 add_block({"kind": "heading", "text": heading})
             continue
@@ -68,7 +90,9 @@ def extract_social_image_text(content, layout_overrides=None, block_controls=Non
         elif line.startswith("> "):
             line = line.replace("> ", "", 1).strip()
         line = re.sub(r'^[-*+]\s+', '', line)
-        line = auto_format_text(line)
+        if line.startswith("!["):
+            # 不是合法图片语法的 ![ 行在整篇格式化时被跳过，这里按正文补上
+            line = auto_format_text(line)
         if line:
             add_block({"kind": "body", "text": line})
     return title, sort_social_blocks(blocks)
@@ -85,23 +109,28 @@ def safe_order(value, fallback):
         return fallback
 
 
-def create_social_cards(content, output_dir, style, base_name=None, image_dirs=None, layout_overrides=None, block_controls=None, return_metadata=False):
+def create_social_cards(content, output_dir, style, base_name=None, image_dirs=None, layout_overrides=None, block_controls=None, return_metadata=False, workers=None, reuse_pages=False, preview_scale=None, progress=None):
     title, blocks = extract_social_image_text(content, layout_overrides=layout_overrides, block_controls=block_controls)
     if not blocks:
         raise ValueError("没有可生成文字图的正文内容")
 
     image_base_name = base_name or f"TEXT_CARD_{int(time.time() * 1000)}"
-    return draw_social_text_images(title, blocks, output_dir, image_base_name, style, image_dirs=image_dirs, return_metadata=return_metadata)
+    return draw_social_text_images(title, blocks, output_dir, image_base_name, style, image_dirs=image_dirs, return_metadata=return_metadata, workers=workers, reuse_pages=reuse_pages, preview_scale=preview_scale, progress=progress)
 
 
-def draw_social_text_images(title, blocks, output_dir, base_name, style, image_dirs=None, return_metadata=False):
-    os.makedirs(output_dir, exist_ok=True)
-    font_body = load_social_font(style, style.get("social_font_size", 36), "normal")
-    font_heading = load_social_font(style, style.get("social_heading_size", 36), "medium")
-    font_caption = load_social_font(style, style.get("social_caption_size", 20), "regular")
-    font_brand = load_social_font(style, style.get("social_brand_size", 34), "medium")
-    font_brand_en = load_social_font(style, style.get("social_brand_en_size", 15), "regular")
-    font_meta = load_social_font(style, style.get("social_meta_size", 18), "regular")
+def layout_social_cards(content, style, image_dirs=None, layout_overrides=None, block_controls=None):
+    """只解析和分页、不绘制像素，返回 (标题, 页数, 分页摘要)，供排版编辑器实时刷新。"""
+    title, blocks = extract_social_image_text(content, layout_overrides=layout_overrides, block_controls=block_controls)
+    if not blocks:
+        raise ValueError("没有可生成文字图的正文内容")
+    _, _, pages = plan_social_pages(blocks, style, image_dirs)
+    return title, len(pages), summarize_pages(pages)
+
+
+def plan_social_pages(blocks, style, image_dirs=None):
+    """加载文字图字体并分页，返回 (字体, 行高, 每页的 PagePart 列表)。"""
+    fonts = load_social_fonts(style)
+    font_body, font_heading, font_caption = fonts[:3]
 
     width = style.get("social_width", style.get("canvas_width", 1080))
     page_height = style.get("social_min_height", 1440)
@@ -128,79 +157,227 @@ def draw_social_text_images(title, blocks, output_dir, base_name, style, image_d
         font_caption,
         image_dirs or [],
     )
+    return fonts, line_height, pages
+
+
+def draw_social_text_images(title, blocks, output_dir, base_name, style, image_dirs=None, return_metadata=False, workers=None, reuse_pages=False, preview_scale=None, progress=None):
+    """绘制所有页。return_metadata 时返回 (路径, 分页摘要, 每页是否重新绘制)。
 
+    reuse_pages 时页面按指纹命名（SOCIAL_<指纹>.png），同名文件已存在即直接复用，
+    并清理目录里本次没有用到的旧页面；否则按 base_name 加页码命名并全部重绘。
+    preview_scale 给出时按该比例绘制草稿页（DRAFT_<指纹>.png），只清理旧的草稿页。
+    progress(阶段, 已完成, 总数) 依次上报 layout 和 pages（复用的页面直接计入已完成）。
+    """
+    progress = progress or ignore_progress
+    os.makedirs(output_dir, exist_ok=True)
+    progress("layout")
+    fonts, line_height, pages = plan_social_pages(blocks, style, image_dirs)
+    # 字体按文件签名（路径、修改时间、大小）计入指纹，原地替换字体文件后旧页面不会被当作可复用
+    fonts_key = [(file_signature(getattr(font, "path", None)), getattr(font, "size", None)) for font in fonts]
+    date_text = datetime.now().strftime("%Y.%m.%d")
+    scale = preview_scale or 1.0
+    prefix = SOCIAL_DRAFT_PREFIX if preview_scale else SOCIAL_PAGE_PREFIX
+
+    # 每页起始的加粗状态先按前面各页的 ** 标记推算出来，页与页之间不再有依赖，
+    # 可以交给渲染进程池并行绘制（WRITER_STUDIO_RENDER_WORKERS，0 或 1 表示顺序渲染）。
+    jobs = []
     saved_paths = []
-    page_layout = summarize_pages(pages)
+    changed = []
+    pending_paths = {}
+    bold_state = False
     total_pages = len(pages)
     for page_index, layout in enumerate(pages, start=1):
-        suffix = f"_{page_index:02d}" if total_pages > 1 else ""
-        save_path = os.path.join(output_dir, f"{base_name}{suffix}.png")
-        draw_social_text_page(
-            layout,
-            save_path,
-            style,
-            font_body,
-            font_heading,
-            font_caption,
-            font_brand,
-            font_brand_en,
-            font_meta,
-            line_height,
-            title=title,
-        )
+        if reuse_pages:
+            page_fingerprint = fingerprint_social_page(layout, style, fonts_key, line_height, title, bold_state, date_text, scale)
+            save_path = os.path.join(output_dir, asset_name(prefix, page_fingerprint, ".png"))
+        else:
+            suffix = f"_{page_index:02d}" if total_pages > 1 else ""
+            save_path = os.path.join(output_dir, f"{base_name}{suffix}.png")
+        render = not (reuse_pages and os.path.isfile(save_path))
+        if render and save_path not in pending_paths:
+            # 先写临时文件再改名，避免中断留下残缺文件被当作可复用页面
+            stem, ext = os.path.splitext(save_path)
+            pending_paths[save_path] = f"{stem}.tmp{ext}" if reuse_pages else save_path
+            jobs.append((layout, pending_paths[save_path], style, line_height, title, bold_state, scale, date_text))
         saved_paths.append(save_path)
+        changed.append(render)
+        bold_state = carry_bold_state(layout, bold_state)
+
+    reused = total_pages - len(jobs)
+    progress("pages", reused, total_pages)
+    run_jobs(render_social_page, jobs, workers, progress=lambda done, total: progress("pages", reused + done, total_pages))
+    for save_path, tmp_path in pending_paths.items():
+        if tmp_path != save_path:
+            os.replace(tmp_path, save_path)
+    if reuse_pages:
+        prune_social_pages(output_dir, saved_paths, prefix)
 
     if return_metadata:
-        return saved_paths, page_layout
+        return saved_paths, summarize_pages(pages), changed
     return saved_paths
 
 
+def fingerprint_social_page(layout, style, fonts_key, line_height, title, init_bold, date_text, scale=1.0):
+    """页面指纹：页内各块的行和图片参数（图片取文件摘要）、样式、字体、起始加粗状态、页眉日期和绘制比例。"""
+    parts = []
+    for block, lines in layout:
+        image = block.image
+        if image is None:
+            parts.append((block.kind, lines))
+            continue
+        parts.append((
+            block.kind, file_digest(image.path), image.layout, image.box, image.zoom, image.crop_x, image.crop_y,
+            image.margin_top, image.margin_bottom, image.caption, image.caption_lines, image.card_height,
+        ))
+    return fingerprint("social_page", parts, style, fonts_key, line_height, title, init_bold, date_text, scale)
+
+
+def prune_social_pages(output_dir, keep_paths, prefix=SOCIAL_PAGE_PREFIX):
+    keep_names = {os.path.basename(path) for path in keep_paths}
+    for name in os.listdir(output_dir):
+        if name.startswith(f"{prefix}_") and name not in keep_names:
+            try:
+                os.remove(os.path.join(output_dir, name))
+            except OSError as e:
+                print(f"⚠️ 无法清理旧页面 {name}: {type(e).__name__}: {e}")
+
+
+def render_social_page(job):
+    """渲染单页文字图。模块级函数，可以被进程池 pickle 后在子进程里执行，字体在子进程里按样式重新加载。"""
+    layout, save_path, style, line_height, title, init_bold, scale, date_text = job
+    draw_social_text_page(
+        layout, save_path, style, *load_social_fonts(style, scale), line_height,
+        title=title, init_bold=init_bold, scale=scale, date_text=date_text,
+    )
+    return save_path
+
+
+def carry_bold_state(layout, bold_state):
+    for block, lines in layout:
+        if block.kind == "image":
+            continue
+        for line in lines:
+            bold_state ^= line.count("**") % 2 == 1
+    return bold_state
+
+
+class MeasuredBlock:
+    """测量一次后的文字图块：分页、页面摘要和绘制都只读取它。
+
+    文字块的 lines 是断好的行；图片块的 image 是 ImagePlacement，加载失败的图片为 None、高度为 0。
+    图片块的 text 是格式化后的图片说明，用于页面摘要。
+    """
+
+    __slots__ = ("kind", "block_index", "text", "lines", "height", "keep_with_next", "page_break_before", "image")
+
+    def __init__(self, kind, block_index, text, lines, height, keep_with_next=False, page_break_before=False, image=None):
+        self.kind = kind
+        self.block_index = block_index
+        self.text = text
+        self.lines = lines
+        self.height = height
+        self.keep_with_next = keep_with_next
+        self.page_break_before = page_break_before
+        self.image = image
+
+
+class ImagePlacement:
+    """图片块的绘制参数：源文件、版式、图片框和裁切调整，以及断好的图片说明。"""
+
+    __slots__ = ("path", "layout", "box", "zoom", "crop_x", "crop_y", "margin_top", "margin_bottom", "caption", "caption_lines", "card_height")
+
+    def __init__(self, path, layout, box, zoom, crop_x, crop_y, margin_top, margin_bottom, caption, caption_lines, card_height):
+        self.path = path
+        self.layout = layout
+        self.box = box
+        self.zoom = zoom
+        self.crop_x = crop_x
+        self.crop_y = crop_y
+        self.margin_top = margin_top
+        self.margin_bottom = margin_bottom
+        self.caption = caption
+        self.caption_lines = caption_lines
+        self.card_height = card_height
+
+
+# 一页中的一段：所属块和这一页放下的行（图片块为空元组）
+PagePart = namedtuple("PagePart", ["block", "lines"])
+
+
 def paginate_blocks(blocks, font_body, font_heading, max_text_width, line_height, paragraph_gap, content_start_y, content_bottom_y, style, font_caption, image_dirs):
+    measured = measure_social_blocks(
+        blocks, font_body, font_heading, max_text_width, line_height,
+        content_bottom_y - content_start_y, style, font_caption, image_dirs,
+    )
+    return paginate_measured_blocks(measured, line_height, paragraph_gap, content_start_y, content_bottom_y)
+
+
+def measure_social_blocks(blocks, font_body, font_heading, max_text_width, line_height, page_capacity, style, font_caption, image_dirs):
+    """一次测量所有块：正文断行、图片定版式和尺寸，结果供分页和绘制复用。"""
+    breaker = style.get("social_line_breaker")
+    measured = []
+    for block in blocks:
+        if not isinstance(block, dict):
+            block = {"kind": "body", "text": str(block)}
+        kind = block.get("kind", "body")
+        if kind == "image":
+            measured.append(prepare_image_block(block, style, max_text_width, page_capacity, font_caption, image_dirs))
+            continue
+        text = block.get("text", "")
+        lines = wrap_lines(text, font_heading if kind == "heading" else font_body, max_text_width, breaker)
+        measured.append(MeasuredBlock(
+            kind,
+            block.get("block_index"),
+            text,
+            lines,
+            len(lines) * line_height,
+            bool(block.get("keep_with_next", False)),
+            bool(block.get("page_break_before", False)),
+        ))
+    return measured
+
+
+def paginate_measured_blocks(measured, line_height, paragraph_gap, content_start_y, content_bottom_y):
+    """按已测量的高度分页，不再测量文字或读取图片；返回每页的 PagePart 列表。"""
     pages = []
     current_page = []
     current_y = content_start_y
     page_capacity = content_bottom_y - content_start_y
 
-    for index, block in enumerate(blocks):
-        normalized = normalize_social_block(block)
-        if normalized.get("page_break_before") and current_page:
+    for index, block in enumerate(measured):
+        if block.page_break_before and current_page:
             pages.append(current_page)
             current_page = []
             current_y = content_start_y
 
-        if normalized.get("keep_with_next") and index + 1 < len(blocks) and current_page:
-            current_height = estimate_social_block_height(normalized, font_body, font_heading, max_text_width, line_height, style, font_caption, image_dirs, page_capacity)
-            next_height = estimate_social_block_height(normalize_social_block(blocks[index + 1]), font_body, font_heading, max_text_width, line_height, style, font_caption, image_dirs, page_capacity)
+        if block.keep_with_next and index + 1 < len(measured) and current_page:
             gap = paragraph_gap if current_page else 0
-            combined_height = current_height + paragraph_gap + next_height
-            if current_height <= page_capacity and combined_height <= page_capacity and current_y + gap + combined_height > content_bottom_y:
+            combined_height = block.height + paragraph_gap + measured[index + 1].height
+            if block.height <= page_capacity and combined_height <= page_capacity and current_y + gap + combined_height > content_bottom_y:
                 pages.append(current_page)
                 current_page = []
                 current_y = content_start_y
 
-        if normalized["kind"] == "image":
-            image_block = prepare_image_block(normalized, style, max_text_width, content_bottom_y - content_start_y, font_caption, image_dirs)
-            if not image_block:
+        if block.kind == "image":
+            if block.image is None:
                 continue
             gap = paragraph_gap if current_page else 0
-            if current_page and current_y + gap + image_block["height"] > content_bottom_y:
+            if current_page and current_y + gap + block.height > content_bottom_y:
                 pages.append(current_page)
                 current_page = []
                 current_y = content_start_y
                 gap = 0
-            current_page.append(image_block)
-            current_y += gap + image_block["height"]
+            current_page.append(PagePart(block, ()))
+            current_y += gap + block.height
             continue
 
-        block_font = font_heading if normalized["kind"] == "heading" else font_body
-        lines = wrap_text_by_width(normalized["text"], block_font, max_text_width)
-        paragraph_height = len(lines) * line_height
+        lines = block.lines
         gap = paragraph_gap if current_page else 0
         if (
             lines
-            and paragraph_height <= page_capacity
+            and block.height <= page_capacity
             and current_page
-            and current_y + gap + paragraph_height > content_bottom_y
+            and current_y + gap + block.height > content_bottom_y
         ):
             pages.append(current_page)
             current_page = []
@@ -220,14 +397,7 @@ def paginate_blocks(blocks, font_body, font_heading, max_text_width, line_height
 
             chunk = lines[:available_lines]
             lines = lines[available_lines:]
-            current_page.append({
-                "kind": normalized["kind"],
-                "lines": chunk,
-                "block_index": normalized.get("block_index"),
-                "text": normalized.get("text", ""),
-                "page_break_before": normalized.get("page_break_before", False),
-                "keep_with_next": normalized.get("keep_with_next", False),
-            })
+            current_page.append(PagePart(block, chunk))
             current_y += gap + len(chunk) * line_height
 
             if lines:
@@ -240,28 +410,18 @@ def paginate_blocks(blocks, font_body, font_heading, max_text_width, line_height
     return pages
 
 
-def estimate_social_block_height(block, font_body, font_heading, max_text_width, line_height, style, font_caption, image_dirs, page_capacity):
-    if block["kind"] == "image":
-        image_block = prepare_image_block(block, style, max_text_width, page_capacity, font_caption, image_dirs)
-        return image_block["height"] if image_block else 0
-    block_font = font_heading if block["kind"] == "heading" else font_body
-    lines = wrap_text_by_width(block.get("text", ""), block_font, max_text_width)
-    return len(lines) * line_height
-
-
 def summarize_pages(pages):
     summary = []
     for page_index, page in enumerate(pages, start=1):
         blocks = []
-        for block in page:
-            block_index = block.get("block_index")
-            if block_index is None:
+        for part in page:
+            block = part.block
+            if block.block_index is None:
                 continue
-            text = block.get("alt") if block.get("kind") == "image" else block.get("text", "")
             blocks.append({
-                "block_index": block_index,
-                "kind": block.get("kind"),
-                "text": summarize_block_text(text),
+                "block_index": block.block_index,
+                "kind": block.kind,
+                "text": summarize_block_text(block.text),
             })
         summary.append({
             "page": page_index,
@@ -271,21 +431,10 @@ def summarize_pages(pages):
 
 
 def summarize_block_text(text):
-    value = strip_markers(auto_format_text(str(text or ""))).strip()
+    value = strip_markers(str(text or "")).strip()
     return value[:28] + "..." if len(value) > 28 else value
 
 
-def normalize_social_block(block):
-    if isinstance(block, dict):
-        normalized = {
-            "kind": block.get("kind", "body"),
-            "text": block.get("text", ""),
-        }
-        normalized.update(block)
-        return normalized
-    return {"kind": "body", "text": str(block)}
-
-
 def parse_image_attrs(raw_attrs):
     attrs = {}
     for token in raw_attrs.split():
@@ -298,45 +447,47 @@ def parse_image_attrs(raw_attrs):
 
 
 def prepare_image_block(block, style, max_text_width, page_capacity, font_caption, image_dirs):
+    """测量图片块，返回 kind 为 image 的 MeasuredBlock；图片缺失或无法读取时 image 为 None、高度为 0。"""
+    caption = block.get("caption")
+    if caption is None:
+        caption = auto_format_text(block.get("alt", "").strip())
+    measured = MeasuredBlock(
+        "image",
+        block.get("block_index"),
+        caption,
+        (),
+        0,
+        bool(block.get("keep_with_next", False)),
+        bool(block.get("page_break_before", False)),
+    )
     image_path = resolve_image_path(block.get("src", ""), image_dirs)
     if not image_path:
-        return None
+        return measured
 
     try:
-        with Image.open(image_path) as source:
-            source_width, source_height = source.size
+        source_width, source_height = image_size(image_path)
     except Exception:
-        return None
+        return measured
 
     layout = resolve_image_layout(block, source_width, source_height)
     size = block.get("size", "auto")
-    caption = auto_format_text(block.get("alt", "").strip())
     show_caption = bool(block.get("show_caption", True) and caption)
-    caption_lines = wrap_text_by_width(caption, font_caption, max_text_width) if show_caption else []
+    caption_lines = wrap_lines(caption, font_caption, max_text_width) if show_caption else ()
     caption_height = len(caption_lines) * 30 + (14 if caption_lines else 0)
     margin_top = clamp_int(block.get("margin_top"), 0, 120, 0)
     margin_bottom = clamp_int(block.get("margin_bottom"), 0, 120, 0)
-    adjustment = {
-        "zoom": clamp_int(block.get("zoom"), 100, 180, 100),
-        "crop_x": clamp_int(block.get("crop_x"), -100, 100, 0),
-        "crop_y": clamp_int(block.get("crop_y"), -100, 100, 0),
-        "margin_top": margin_top,
-        "margin_bottom": margin_bottom,
-    }
+    zoom = clamp_int(block.get("zoom"), 100, 180, 100)
+    crop_x = clamp_int(block.get("crop_x"), -100, 100, 0)
+    crop_y = clamp_int(block.get("crop_y"), -100, 100, 0)
 
     if layout == "side":
-        height = 330
-        return {
-            **block,
-            **adjustment,
-            "kind": "image",
-            "path": image_path,
-            "layout": layout,
-            "height": height + margin_top + margin_bottom,
-            "card_height": height,
-            "caption_lines": caption_lines[:5],
-            "image_box": (285, 230),
-        }
+        card_height = 330
+        measured.height = card_height + margin_top + margin_bottom
+        measured.image = ImagePlacement(
+            image_path, layout, (285, 230), zoom, crop_x, crop_y, margin_top, margin_bottom,
+            caption, caption_lines[:5], card_height,
+        )
+        return measured
 
     target_width = image_target_width(layout, size, max_text_width, style)
     target_height = round(target_width * source_height / source_width)
@@ -345,17 +496,12 @@ def prepare_image_block(block, style, max_text_width, page_capacity, font_captio
         target_height = max_image_height
         target_width = round(target_height * source_width / source_height)
 
-    return {
-        **block,
-        **adjustment,
-        "kind": "image",
-        "path": image_path,
-        "layout": layout,
-        "height": margin_top + target_height + caption_height + margin_bottom,
-        "image_height": target_height,
-        "caption_lines": caption_lines,
-        "image_box": (target_width, target_height),
-    }
+    measured.height = margin_top + target_height + caption_height + margin_bottom
+    measured.image = ImagePlacement(
+        image_path, layout, (target_width, target_height), zoom, crop_x, crop_y, margin_top, margin_bottom,
+        caption, caption_lines, None,
+    )
+    return measured
 
 
 def clamp_int(value, minimum, maximum, default):
@@ -420,73 +566,88 @@ def image_max_height(layout, page_capacity, style):
     return round(page_capacity * style.get("social_image_max_height", 0.50))
 
 
-def draw_image_block(canvas, draw, block, margin_x, y, style, font_caption, text_color, muted, rule_color):
+def draw_image_block(canvas, draw, block, margin_x, y, style, font_caption, text_color, muted, rule_color, scale=1.0):
+    """坐标按全尺寸排版计算，绘制时乘以 scale；返回全尺寸下的下一块起点。"""
     width = style.get("social_width", style.get("canvas_width", 1080))
     max_text_width = width - margin_x * 2
-    y += block.get("margin_top", 0)
-    if block.get("layout") == "side":
-        return draw_side_image_block(canvas, draw, block, margin_x, y, max_text_width, font_caption, text_color, muted, rule_color) + block.get("margin_bottom", 0)
-
-    box_width, box_height = block["image_box"]
-    image_x = margin_x + (max_text_width - box_width) // 2
-    with Image.open(block["path"]).convert("RGB") as source:
-        rendered = render_image_to_box(
-            source,
-            box_width,
-            box_height,
-            block.get("zoom", 100),
-            block.get("crop_x", 0),
-            block.get("crop_y", 0),
-            fit="cover" if block.get("zoom", 100) > 100 else "contain",
-        )
-    canvas.paste(rendered, (image_x, y))
-    draw.rounded_rectangle([(image_x, y), (image_x + rendered.width, y + rendered.height)], radius=3, outline=rule_color, width=1)
+    image = block.image
+    y += image.margin_top
+    if image.layout == "side":
+        return draw_side_image_block(canvas, draw, image, margin_x, y, max_text_width, font_caption, text_color, muted, rule_color, scale) + image.margin_bottom
+
+    box_width, box_height = image.box
+    image_x = scaled(margin_x + (max_text_width - box_width) // 2, scale)
+    image_y = scaled(y, scale)
+    rendered = load_box_image(
+        image,
+        scaled(box_width, scale),
+        scaled(box_height, scale),
+        "cover" if image.zoom > 100 else "contain",
+        image_resample(scale),
+    )
+    canvas.paste(rendered, (image_x, image_y))
+    draw.rounded_rectangle([(image_x, image_y), (image_x + rendered.width, image_y + rendered.height)], radius=scaled(3, scale), outline=rule_color, width=1)
 
-    current_y = y + rendered.height + 14
-    for line in block.get("caption_lines", []):
-        draw.text((margin_x, current_y), line, font=font_caption, fill=muted)
+    # render_image_to_box 总是返回整个图片框大小
+    current_y = y + box_height + 14
+    for line in image.caption_lines:
+        draw.text((scaled(margin_x, scale), scaled(current_y, scale)), line, font=font_caption, fill=muted)
         current_y += 30
-    return current_y + block.get("margin_bottom", 0)
-
-
-def draw_side_image_block(canvas, draw, block, margin_x, y, max_text_width, font_caption, text_color, muted, rule_color):
-    card_height = block.get("card_height", block["height"])
-    card_x = margin_x
-    card_w = max_text_width
-    draw.rounded_rectangle([(card_x, y), (card_x + card_w, y + card_height)], radius=10, fill="#FBFAF5", outline=rule_color, width=1)
-
-    image_w, image_h = block["image_box"]
-    image_x = card_x + 34
-    image_y = y + 42
-    with Image.open(block["path"]).convert("RGB") as source:
-        resized = render_image_to_box(
-            source,
-            image_w,
-            image_h,
-            block.get("zoom", 100),
-            block.get("crop_x", 0),
-            block.get("crop_y", 0),
-            fit="cover",
-        )
+    return current_y + image.margin_bottom
+
+
+def draw_side_image_block(canvas, draw, image, margin_x, y, max_text_width, font_caption, text_color, muted, rule_color, scale=1.0):
+    card_height = image.card_height
+    card_x = scaled(margin_x, scale)
+    card_y = scaled(y, scale)
+    card_w = scaled(max_text_width, scale)
+    draw.rounded_rectangle([(card_x, card_y), (card_x + card_w, card_y + scaled(card_height, scale))], radius=scaled(10, scale), fill="#FBFAF5", outline=rule_color, width=1)
+
+    image_w, image_h = scaled(image.box[0], scale), scaled(image.box[1], scale)
+    image_x = card_x + scaled(34, scale)
+    image_y = card_y + scaled(42, scale)
+    resized = load_box_image(image, image_w, image_h, "cover", image_resample(scale))
     paste_x = image_x + (image_w - resized.width) // 2
     paste_y = image_y + (image_h - resized.height) // 2
     canvas.paste(resized, (paste_x, paste_y))
-    draw.rounded_rectangle([(paste_x, paste_y), (paste_x + resized.width, paste_y + resized.height)], radius=4, outline=rule_color, width=1)
+    draw.rounded_rectangle([(paste_x, paste_y), (paste_x + resized.width, paste_y + resized.height)], radius=scaled(4, scale), outline=rule_color, width=1)
 
-    text_x = image_x + image_w + 42
-    text_w = card_x + card_w - 34 - text_x
+    text_x = image_x + image_w + scaled(42, scale)
+    text_w = card_x + card_w - scaled(34, scale) - text_x
     title = "图片说明"
     draw.text((text_x, image_y), title, font=font_caption, fill=muted)
-    text_y = image_y + 42
-    caption = block.get("alt", "")
-    lines = wrap_text_by_width(auto_format_text(caption), font_caption, text_w)[:5]
+    text_y = image_y + scaled(42, scale)
+    lines = wrap_lines(image.caption, font_caption, text_w)[:5]
     for line in lines:
         draw.text((text_x, text_y), line, font=font_caption, fill=text_color)
-        text_y += 32
+        text_y += scaled(32, scale)
     return y + card_height
 
 
-def render_image_to_box(source, box_width, box_height, zoom=100, crop_x=0, crop_y=0, fit="contain"):
+def load_box_image(image, box_width, box_height, fit, resample):
+    """按图片框尺寸和裁切参数缓存 render_image_to_box 的结果，重绘同一页或同一张图时不再解码。"""
+    return load_cached_image(
+        image.path,
+        ("social_box", box_width, box_height, image.zoom, image.crop_x, image.crop_y, fit, resample),
+        lambda source: render_image_to_box(source, box_width, box_height, image.zoom, image.crop_x, image.crop_y, fit=fit, resample=resample),
+    )
+
+
+def scaled(value, scale):
+    """全尺寸坐标换算到绘制比例；全尺寸时原样返回，保证导出结果逐像素不变。"""
+    return value if scale == 1 else round(value * scale)
+
+
+def image_resample(scale):
+    return Image.LANCZOS if scale == 1 else Image.BILINEAR
+
+
+def render_image_to_box(source, box_width, box_height, zoom=100, crop_x=0, crop_y=0, fit="contain", resample=Image.LANCZOS):
+    """按 zoom 和裁切焦点把图片放进图片框，返回图片框大小的 RGB 图。
+
+    先在缩放后的坐标里算出可见窗口，再映射回原图，只对窗口附近的像素重采样，
+    不再整图放大后丢掉大半。source 可以是尚未解码的 Image.open 结果，JPEG 会按目标尺寸 draft 缩小解码。
+    """
     zoom_scale = max(1.0, min(1.8, float(zoom or 100) / 100))
     if fit == "cover":
         scale = max(box_width / source.width, box_height / source.height) * zoom_scale
@@ -495,9 +656,9 @@ def render_image_to_box(source, box_width, box_height, zoom=100, crop_x=0, crop_
 
     resized_width = max(1, round(source.width * scale))
     resized_height = max(1, round(source.height * scale))
-    resized = source.resize((resized_width, resized_height), Image.LANCZOS)
 
     if resized_width <= box_width and resized_height <= box_height:
+        resized = resample_window(source, (resized_width, resized_height), (0, 0, resized_width, resized_height), resample)
         background = Image.new("RGB", (box_width, box_height), "#FBFAF5")
         paste_x = (box_width - resized_width) // 2
         paste_y = (box_height - resized_height) // 2
@@ -510,17 +671,53 @@ def render_image_to_box(source, box_width, box_height, zoom=100, crop_x=0, crop_
     focus_y = (float(crop_y or 0) + 100) / 200
     left = round(overflow_x * focus_x)
     top = round(overflow_y * focus_y)
-    return resized.crop((left, top, left + box_width, top + box_height))
+    window = (left, top, min(left + box_width, resized_width), min(top + box_height, resized_height))
+    visible = resample_window(source, (resized_width, resized_height), window, resample)
+    if visible.size == (box_width, box_height):
+        return visible
+    # 只有一边溢出时另一边不足图片框，与整图缩放后越界裁切一样补黑
+    padded = Image.new("RGB", (box_width, box_height))
+    padded.paste(visible, (0, 0))
+    return padded
+
+
+def resample_window(source, resized_size, window, resample):
+    """相当于 source.resize(resized_size).crop(window)，但只裁出窗口对应的原图区域
+    （外扩滤波器半径）再重采样，大倍率缩小时先整数倍 reduce。"""
+    # JPEG 按 DCT 缩小解码，保留目标尺寸 REDUCING_GAP 倍的余量再交给 LANCZOS，画质与整图解码几乎一致
+    source.draft("RGB", (round(resized_size[0] * REDUCING_GAP), round(resized_size[1] * REDUCING_GAP)))
+    step_x = source.width / resized_size[0]
+    step_y = source.height / resized_size[1]
+    left, top, right, bottom = window[0] * step_x, window[1] * step_y, window[2] * step_x, window[3] * step_y
+    # LANCZOS 的支撑半径是 3 个输出像素，缩小时按倍率放大
+    margin_x = math.ceil(3 * max(step_x, 1)) + 1
+    margin_y = math.ceil(3 * max(step_y, 1)) + 1
+    crop_box = (
+        max(0, math.floor(left) - margin_x),
+        max(0, math.floor(top) - margin_y),
+        min(source.width, math.ceil(right) + margin_x),
+        min(source.height, math.ceil(bottom) + margin_y),
+    )
+    region = source.crop(crop_box)
+    if region.mode != "RGB":
+        region = region.convert("RGB")
+    return region.resize(
+        (window[2] - window[0], window[3] - window[1]),
+        resample,
+        box=(left - crop_box[0], top - crop_box[1], right - crop_box[0], bottom - crop_box[1]),
+        reducing_gap=REDUCING_GAP,
+    )
 
 
-def draw_social_text_page(layout, save_path, style, font_body, font_heading, font_caption, font_brand, font_brand_en, font_meta, line_height, title=""):
-    width = style.get("social_width", style.get("canvas_width", 1080))
-    image_height = style.get("social_min_height", 1440)
+def draw_social_text_page(layout, save_path, style, font_body, font_heading, font_caption, font_brand, font_brand_en, font_meta, line_height, title="", init_bold=False, scale=1.0, date_text=None):
+    """绘制一页。scale 不为 1 时是草稿页：字体由调用方按比例加载，坐标按全尺寸排版换算，
+    不加颗粒并用最快的 PNG 压缩。底色和页眉取自缓存的页面模板，每页只画正文。"""
     margin_x = style.get("social_margin_x", 78)
     margin_top = style.get("social_margin_top", 76)
     paragraph_gap = style.get("social_paragraph_gap", 48)
+    date_text = date_text or datetime.now().strftime("%Y.%m.%d")
 
-    img = Image.new("RGB", (width, image_height), style.get("social_bg_color", "#F4F4EF"))
+    img = social_page_template(style, font_brand, font_brand_en, font_meta, date_text, scale).copy()
     draw = ImageDraw.Draw(img)
 
     accent = style.get("social_accent_color", style.get("cover_accent_color", "#C8332B"))
@@ -528,45 +725,96 @@ def draw_social_text_page(layout, save_path, style, font_body, font_heading, fon
     muted = style.get("social_muted_color", "#686864")
     rule_color = style.get("social_rule_color", "#B9BFB7")
 
-    draw_social_header(draw, style, font_brand, font_brand_en, font_meta, margin_x, margin_top, width, accent, text_color, muted, rule_color)
-
     y = margin_top + 72 + 72
-    bold_state = False
-    for group_index, block in enumerate(layout):
+    bold_state = init_bold
+    use_atlas = bool(style.get(GLYPH_ATLAS_STYLE_KEY, False))
+    for group_index, (block, lines) in enumerate(layout):
         if group_index > 0:
             y += paragraph_gap
-        if block["kind"] == "image":
-            y = draw_image_block(img, draw, block, margin_x, y, style, font_caption, text_color, muted, rule_color)
+        if block.kind == "image":
+            y = draw_image_block(img, draw, block, margin_x, y, style, font_caption, text_color, muted, rule_color, scale)
             continue
-        is_heading = block["kind"] == "heading"
+        is_heading = block.kind == "heading"
         block_font = font_heading if is_heading else font_body
         block_color = accent if is_heading else text_color
-        for line in block["lines"]:
+        for line in lines:
             bold_state = draw_rich_text(
                 draw,
-                margin_x,
-                y,
+                scaled(margin_x, scale),
+                scaled(y, scale),
                 line.replace("**", "\x01"),
                 font=block_font,
                 base_color=block_color,
                 accent_color=accent,
                 init_bold=bold_state,
+                use_atlas=use_atlas,
             )
             y += line_height
 
-    add_film_grain(img, intensity=0.05).save(save_path, format="PNG")
+    if scale != 1:
+        img.save(save_path, format="PNG", compress_level=1)
+        return
+    add_film_grain(img, intensity=SOCIAL_GRAIN_INTENSITY, seed=style.get("grain_seed", DEFAULT_GRAIN_SEED)).save(save_path, format="PNG")
+
+
+def social_page_template(style, font_brand, font_brand_en, font_meta, date_text, scale=1.0):
+    """底色加品牌页眉的空白页，按 (样式指纹, 日期, 比例) 缓存，每个进程里同一样式的页眉只画一次。
+    返回的模板是共享的，各页从 copy() 开始绘制。全尺寸模板建好时顺带生成同尺寸的颗粒噪点帧，
+    之后每页加颗粒只做一次混合。"""
+    key = fingerprint("social_template", style, date_text, scale)
+    with _SOCIAL_TEMPLATES_LOCK:
+        template = _SOCIAL_TEMPLATES.get(key)
+        if template is not None:
+            _SOCIAL_TEMPLATES.move_to_end(key)
+            return template
+
+    width = style.get("social_width", style.get("canvas_width", 1080))
+    image_height = style.get("social_min_height", 1440)
+    margin_x = style.get("social_margin_x", 78)
+    margin_top = style.get("social_margin_top", 76)
+    canvas = Image.new("RGB", (scaled(width, scale), scaled(image_height, scale)), style.get("social_bg_color", "#F4F4EF"))
+    draw_social_header(
+        ImageDraw.Draw(canvas),
+        style,
+        font_brand,
+        font_brand_en,
+        font_meta,
+        margin_x,
+        margin_top,
+        width,
+        style.get("social_accent_color", style.get("cover_accent_color", "#C8332B")),
+        style.get("social_text_color", "#171717"),
+        style.get("social_muted_color", "#686864"),
+        style.get("social_rule_color", "#B9BFB7"),
+        scale,
+        date_text,
+    )
+    if scale == 1:
+        noise_frame(canvas.size, SOCIAL_GRAIN_INTENSITY, style.get("grain_seed", DEFAULT_GRAIN_SEED))
+    with _SOCIAL_TEMPLATES_LOCK:
+        _SOCIAL_TEMPLATES[key] = canvas
+        _SOCIAL_TEMPLATES.move_to_end(key)
+        while len(_SOCIAL_TEMPLATES) > SOCIAL_TEMPLATE_CACHE_SIZE:
+            _SOCIAL_TEMPLATES.popitem(last=False)
+    return canvas
+
 
+def clear_social_templates():
+    with _SOCIAL_TEMPLATES_LOCK:
+        _SOCIAL_TEMPLATES.clear()
 
-def draw_social_header(draw, style, font_brand, font_brand_en, font_meta, margin_x, margin_top, width, accent, text_color, muted, rule_color):
-    brand_x = margin_x + 30
+
+def draw_social_header(draw, style, font_brand, font_brand_en, font_meta, margin_x, margin_top, width, accent, text_color, muted, rule_color, scale=1.0, date_text=None):
+    margin_x, margin_top, width = scaled(margin_x, scale), scaled(margin_top, scale), scaled(width, scale)
+    brand_x = margin_x + scaled(30, scale)
     logo_line_color = style.get("social_logo_line_color", accent)
     logo_alt_color = style.get("social_logo_alt_color", accent)
     brand_name = style.get("brand_name", "Writer Studio")
     brand_bbox = draw.textbbox((brand_x, margin_top), brand_name, font=font_brand)
     anchor_top = brand_bbox[1] + 2
     anchor_bottom = brand_bbox[3] - 1
-    draw.rectangle([(margin_x, anchor_top), (margin_x + 9, anchor_bottom)], fill=logo_line_color)
-    draw.rectangle([(margin_x, anchor_top), (margin_x + 24, anchor_top + 5)], fill=logo_line_color)
+    draw.rectangle([(margin_x, anchor_top), (margin_x + scaled(9, scale), anchor_bottom)], fill=logo_line_color)
+    draw.rectangle([(margin_x, anchor_top), (margin_x + scaled(24, scale), anchor_top + scaled(5, scale))], fill=logo_line_color)
     draw_brand_name(
         draw,
         brand_x,
@@ -578,16 +826,17 @@ def draw_social_header(draw, style, font_brand, font_brand_en, font_meta, margin
         logo_alt_color,
     )
     brand_width = font_brand.getlength(brand_name)
-    draw.text((brand_x + brand_width + 28, margin_top + 17), style.get("brand_en", "WRITER STUDIO").upper(), font=font_brand_en, fill=muted)
-    date_text = datetime.now().strftime("%Y.%m.%d")
+    draw.text((brand_x + brand_width + scaled(28, scale), margin_top + scaled(17, scale)), style.get("brand_en", "WRITER STUDIO").upper(), font=font_brand_en, fill=muted)
+    date_text = date_text or datetime.now().strftime("%Y.%m.%d")
     date_bbox = font_meta.getbbox(date_text)
-    draw.text((width - margin_x - (date_bbox[2] - date_bbox[0]), margin_top + 11), date_text, font=font_meta, fill=muted)
+    draw.text((width - margin_x - (date_bbox[2] - date_bbox[0]), margin_top + scaled(11, scale)), date_text, font=font_meta, fill=muted)
 
-    line_y = margin_top + 66
+    line_y = margin_top + scaled(66, scale)
     line_end_x = margin_x + int((width - margin_x * 2) * 0.7)
     draw.line([(margin_x, line_y), (line_end_x, line_y)], fill=rule_color, width=1)
-    for tx in [margin_x, margin_x + 92, margin_x + 184, line_end_x]:
-        draw.line([(tx, line_y - 5), (tx, line_y + 5)], fill=rule_color, width=1)
+    tick = scaled(5, scale)
+    for tx in [margin_x, margin_x + scaled(92, scale), margin_x + scaled(184, scale), line_end_x]:
+        draw.line([(tx, line_y - tick), (tx, line_y + tick)], fill=rule_color, width=1)
 
 
 def draw_brand_name(draw, x, y, brand_name, accent_text, font, base_color, accent_color):
@@ -606,14 +855,17 @@ def draw_brand_name(draw, x, y, brand_name, accent_text, font, base_color, accen
             current_x += font.getlength(accent_text)
 
 
-def draw_rich_text(draw, x, y, text_with_markers, font, base_color, accent_color, init_bold=False):
+def draw_rich_text(draw, x, y, text_with_markers, font, base_color, accent_color, init_bold=False, use_atlas=False):
     parts = text_with_markers.split('\x01')
     current_x = x
     is_bold = init_bold
     for i, part in enumerate(parts):
         if part:
             color = accent_color if is_bold else base_color
-            draw.text((current_x, y), part, font=font, fill=color)
+            if use_atlas:
+                glyph_atlas(font).draw(draw, (current_x, y), part, color)
+            else:
+                draw.text((current_x, y), part, font=font, fill=color)
             current_x += font.getlength(part)
         if i < len(parts) - 1:
             is_bold = not is_bold
@@ -621,33 +873,12 @@ def draw_rich_text(draw, x, y, text_with_markers, font, base_color, accent_color
 
 
 def load_social_font(style, size, weight="regular"):
-    paths = {
-        "normal": "/Users/hugo/Library/Fonts/SourceHanSansSC-Normal.otf",
-        "regular": "/Users/hugo/Library/Fonts/SourceHanSansSC-Regular.otf",
-        "medium": "/Users/hugo/Library/Fonts/SourceHanSansSC-Medium.otf",
-    }
-    for key in [weight, "regular", "normal"]:
-        path = paths.get(key)
-        if path and os.path.exists(path):
-            return ImageFont.truetype(path, size)
-
-    theme_font = get_theme_font_path(style)
-    return ImageFont.truetype(theme_font, size) if theme_font else ImageFont.load_default()
-
-
-def get_theme_font_path(style):
-    font_name = style.get("font_name")
-    if not font_name:
-        return None
-    base = path_utils.get_internal_path(os.path.join("fonts", font_name))
-    for ext in [".otf", ".ttf", ".ttc"]:
-        if os.path.exists(base + ext):
-            return base + ext
-    return None
+    return get_font_registry().load(size, style, weight)
 
 
-def add_film_grain(img, intensity=0.08):
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    noise = Image.effect_noise(img.size, (intensity - 0.02) * 255).convert('RGB')
-    return Image.blend(img, noise, 0.03)
+def load_social_fonts(style, scale=1.0):
+    """按 SOCIAL_FONT_SPECS 的顺序加载正文、小标题、图片说明、品牌名、品牌英文和日期字体，草稿页按比例缩小字号。"""
+    return tuple(
+        load_social_font(style, max(1, scaled(style.get(key, default), scale)), weight)
+        for key, default, weight in SOCIAL_FONT_SPECS
+    )
@@ -1,7 +1,6 @@
 import html as html_utils
 import os
 import re
-import time
 
 
 STYLE_CONFIG = {
@@ -72,12 +71,11 @@ def render_preview_document(md_lines, output_dir, folder_name, main_title, style
         theme = style.get("theme_name", "black_gold") if style else "black_gold"
         if "social_bg_color" in (style or {}):
             theme = "editorial_card"
-        cache_buster = int(time.time() * 1000)
+        # 生成的资源按内容寻址命名，内容变了 URL 就变，预览里不再需要时间戳防缓存。
         article_html = markdown_to_wechat_html(
             "\n".join(md_lines),
             assets_map=None,
             theme=theme,
-            cache_buster=cache_buster,
         )
 
         page_bg = "#ececea" if theme == "editorial_card" else "#f5f5f5"
@@ -1,37 +1,250 @@
 import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+from .advance_tables import get_advance_table
+from .autofit import measure_text
+
+
+# 引号替换和中英文间距合成一个正则，一次扫描完成：
+# 直引号和弯双引号按出现顺序两两配成「」，落单的弯引号按方向替换，落单的直引号保留；
+# 单引号一律替换成『』；汉字与（可带 Markdown 标记的）字母数字之间补一个空格。
+FORMAT_RULES = (
+    r'(?P<quote>["“”])'
+    r'|(?P<single>[‘’])'
+    r'|(?<=[\u4e00-\u9fa5])(?=[*_`]*[A-Za-z0-9])'
+    r'|(?<=[A-Za-z0-9])(?P<markers>[*_`]*)(?=[\u4e00-\u9fa5])'
+)
+FORMAT_PATTERN = re.compile(FORMAT_RULES)
+# 整篇格式化时 Markdown 图片行整行匹配后原样保留
+DOCUMENT_FORMAT_PATTERN = re.compile(r'(?P<image>^[^\S\n]*!\[[^\n]*)|' + FORMAT_RULES, re.MULTILINE)
+QUOTE_PARTNER_PATTERN = re.compile(r'[^"“”]*["“”]')
+LINE_QUOTE_PARTNER_PATTERN = re.compile(r'[^"“”\n]*["“”]')
+SINGLE_QUOTES = {'‘': '『', '’': '』'}
+UNPAIRED_QUOTES = {'"': '"', '“': '「', '”': '」'}
 
 
 def auto_format_text(text):
-    text = re.sub(r'["“”]([^"“”]*)["“”]', r'「\1」', text)
-    text = text.replace('“', '「').replace('”', '」')
-    text = text.replace('‘', '『').replace('’', '』')
-    text = re.sub(r'([\u4e00-\u9fa5])([*_\`]*[A-Za-z0-9])', r'\1 \2', text)
-    text = re.sub(r'([A-Za-z0-9][*_\`]*)([\u4e00-\u9fa5])', r'\1 \2', text)
-    return text
+    return _format_text(text, FORMAT_PATTERN, QUOTE_PARTNER_PATTERN)
+
+
+def format_document(text):
+    """整篇 Markdown 一次格式化，结果与逐行调用 auto_format_text 相同（引号不跨行配对），
+    图片行原样保留。"""
+    return _format_text(text, DOCUMENT_FORMAT_PATTERN, LINE_QUOTE_PARTNER_PATTERN)
+
+
+def _format_text(text, pattern, partner_pattern):
+    closing = False
+
+    def replace(match):
+        nonlocal closing
+        kind = match.lastgroup
+        if kind == "quote":
+            if closing:
+                closing = False
+                return "」"
+            if partner_pattern.match(text, match.end()):
+                closing = True
+                return "「"
+            return UNPAIRED_QUOTES[match.group()]
+        if kind == "single":
+            return SINGLE_QUOTES[match.group()]
+        if kind == "markers":
+            return match.group() + " "
+        if kind == "image":
+            return match.group()
+        return " "
+
+    return pattern.sub(replace, text)
 
 
 def strip_markers(text):
     return text.replace('\x01', '')
 
 
+# 逐词累加宽度时预留的误差带（按字号比例）：累计宽度离行宽还远时直接追加，
+# 进入误差带后才对整行精确测量，断行结果与逐次整行测量一致。
+WRAP_EDGE_SLACK = 0.25
+
+
 def wrap_text_by_width(text, font, max_width):
     tokens = tokenize_wrap_text(text)
+    table = get_advance_table(font)
+    slack = getattr(font, "size", 0) * WRAP_EDGE_SLACK
     lines = []
     current = ""
+    current_width = 0
     for token in tokens:
         if token.isspace() and not current:
             continue
         candidate = current + token
-        if current and font.getlength(strip_markers(candidate)) > max_width:
-            lines.append(current.rstrip())
-            current = token.lstrip()
-        else:
-            current = candidate
+        candidate_width = current_width + token_width(font, token, table)
+        if current and candidate_width >= max_width - slack:
+            # 接近或超过边界：字距调整可能改变结果，按整行精确测量并校正累计宽度，
+            # 每行只在行尾附近测量一两次
+            candidate_width = measure_text(font, strip_markers(candidate))
+            if candidate_width > max_width:
+                lines.append(current.rstrip())
+                current = token.lstrip()
+                current_width = token_width(font, current, table)
+                continue
+        current = candidate
+        current_width = candidate_width
     if current:
         lines.append(current.rstrip())
     return refine_wrapped_lines(lines, font, max_width)
 
 
+def token_width(font, token, table=None):
+    """估算用的词宽：单字优先查步进表，其余走按 (字体, 文本) 缓存的精确测量。"""
+    token = strip_markers(token)
+    if table is not None and len(token) == 1:
+        advance = table.advance(token)
+        if advance is not None:
+            return advance
+    return measure_text(font, token)
+
+
+# 动态规划断行的代价：标点避头尾和短行按重罚计入，只有无法避免时才会出现；
+# 其余按行尾留白的平方计入，让各行长度更均匀（末行不计留白）。
+BREAK_LEADING_PUNCTUATION_COST = 10000
+BREAK_TRAILING_OPENING_COST = 10000
+BREAK_SHORT_LINE_COST = 5000
+BREAK_RAGGED_COST = 100
+BREAK_WINDOW = 0.12
+LEADING_PUNCTUATION = set("，。！？；：、,.!?;:)）]】}》」』’”％%")
+OPENING_PUNCTUATION = set("(（[【{《「『‘“")
+MEANINGFUL_CHAR_PATTERN = re.compile(r'[A-Za-z0-9\u4e00-\u9fff]')
+
+
+def wrap_text_optimal(text, font, max_width):
+    """一次动态规划完成断行：避头尾标点和「行内不少于 3 个有效字」作为代价，
+    不再贪心断行后逐遍修补。逐词宽度做前缀和估算，最后逐行精确核对一次，
+    若有行因字距超出行宽则退回贪心断行。
+    """
+    tokens = tokenize_wrap_text(text)
+    while tokens and tokens[0].isspace():
+        tokens.pop(0)
+    # 行尾空白不参与断行，否则只剩空白时找不到下一个非空白词，下标越界
+    while tokens and tokens[-1].isspace():
+        tokens.pop()
+    if not tokens:
+        return []
+
+    table = get_advance_table(font)
+    count = len(tokens)
+    offsets = [0.0]
+    meaningful = [0]
+    for token in tokens:
+        offsets.append(offsets[-1] + token_width(font, token, table))
+        meaningful.append(meaningful[-1] + len(MEANINGFUL_CHAR_PATTERN.findall(token)))
+    # 每个位置之后第一个非空白词、之前最后一个非空白词，用于去掉行首行尾空白
+    next_solid = [count] * (count + 1)
+    for index in range(count - 1, -1, -1):
+        next_solid[index] = index if not tokens[index].isspace() else next_solid[index + 1]
+    last_solid = [-1] * (count + 1)
+    for index in range(count):
+        last_solid[index + 1] = index if not tokens[index].isspace() else last_solid[index]
+    starts_with_closing = [token[0] in LEADING_PUNCTUATION for token in tokens]
+    # 每个位置之前连续句读标点的起点：这段标点悬挂在行宽之外，不计入行宽
+    hang_start = list(range(count + 1))
+    for index in range(1, count + 1):
+        if starts_with_closing[index - 1] and hang_start[index - 1] > 0:
+            hang_start[index] = hang_start[index - 1]
+
+    # 只考虑行宽落在 [max_width * (1 - BREAK_WINDOW), max_width] 的断点（末行、倒数第二行和超宽单词例外），
+    # 用前缀和二分定位，每个起点只评估几个候选
+    window = max_width * BREAK_WINDOW
+    # 末行之前的一行可以更短，给末行让出字数，这一段不受窗口限制
+    tail_start = bisect_left(offsets, offsets[count] - max_width)
+    ends_with_opening = [token[-1] in OPENING_PUNCTUATION for token in tokens]
+    infinity = float("inf")
+    best = [infinity] * (count + 1)
+    previous = [0] * (count + 1)
+    best[0] = 0.0
+    for start in range(count):
+        if best[start] == infinity:
+            continue
+        first = next_solid[start]
+        base = offsets[first]
+        line_cost = best[start]
+        if start and starts_with_closing[first]:
+            line_cost += BREAK_LEADING_PUNCTUATION_COST
+        widest = max(first + 1, bisect_right(offsets, base + max_width) - 1)
+        # 与贪心断行一致，行尾的句读标点允许悬挂出行宽
+        while widest < count and starts_with_closing[widest]:
+            widest += 1
+        lowest = max(first + 1, bisect_left(offsets, base + max_width - window))
+        if widest >= tail_start:
+            lowest = max(first + 1, min(lowest, tail_start))
+        for end in range(min(widest, lowest), widest + 1):
+            last = last_solid[end]
+            if last < first:
+                continue
+            cost = line_cost
+            if start and meaningful[last + 1] - meaningful[first] < 3:
+                cost += BREAK_SHORT_LINE_COST
+            if end != count:
+                if ends_with_opening[last]:
+                    cost += BREAK_TRAILING_OPENING_COST
+                slack = max_width - offsets[hang_start[last + 1]] + base
+                if slack > 0:
+                    cost += BREAK_RAGGED_COST * (slack / max_width) ** 2
+            if cost < best[end]:
+                best[end] = cost
+                previous[end] = start
+
+    lines = []
+    end = count
+    while end > 0:
+        start = previous[end]
+        first, last = next_solid[start], last_solid[end]
+        line = "".join(tokens[first:last + 1])
+        body = "".join(tokens[first:max(first + 1, hang_start[last + 1])])
+        if last > first and measure_text(font, strip_markers(body)) > max_width:
+            return wrap_text_by_width(text, font, max_width)
+        lines.append(line)
+        end = start
+    lines.reverse()
+    return lines
+
+
+LINE_BREAKERS = {
+    "greedy": wrap_text_by_width,
+    "optimal": wrap_text_optimal,
+}
+
+
+def get_line_breaker(name=None):
+    """按样式里的 social_line_breaker 选择断行器，未知取值回退到贪心断行。"""
+    return LINE_BREAKERS.get(name or "greedy", wrap_text_by_width)
+
+
+# 断行结果按 (文本, 字体对象, 行宽, 断行器) 缓存：分页估高、正式分页和绘制图片说明时
+# 同一段文字会反复断行。字体对象本身已包含字号，强引用保证对象不会被回收后复用 id。
+WRAP_CACHE_SIZE = 2048
+
+
+def wrap_lines(text, font, max_width, breaker=None):
+    """带缓存的断行，返回行的元组（共享结果，不可原地修改）。"""
+    return _wrap_lines_cached(text, font, max_width, breaker or "greedy")
+
+
+@lru_cache(maxsize=WRAP_CACHE_SIZE)
+def _wrap_lines_cached(text, font, max_width, breaker):
+    return tuple(get_line_breaker(breaker)(text, font, max_width))
+
+
+def wrap_cache_info():
+    info = _wrap_lines_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize, "max_entries": info.maxsize}
+
+
+def clear_wrap_cache():
+    _wrap_lines_cached.cache_clear()
+
+
 def tokenize_wrap_text(text):
     pattern = r'[A-Za-z0-9]+(?:[._/+&-][A-Za-z0-9]+)*|\s+|.'
     return re.findall(pattern, text)
@@ -99,7 +312,7 @@ def avoid_short_lines(lines, font, max_width):
             line = "".join(move_tokens) + base_line
 
         new_previous = "".join(tokens).rstrip()
-        if new_previous and font.getlength(strip_markers(line)) <= max_width:
+        if new_previous and measure_text(font, strip_markers(line)) <= max_width:
             lines[index - 1] = new_previous
             lines[index] = line
 
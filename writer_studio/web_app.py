@@ -1,13 +1,21 @@
 import os
 from functools import wraps
+from urllib.parse import quote
 
-from flask import Flask, jsonify, render_template, request, send_from_directory
+from flask import Flask, Response, abort, jsonify, render_template, request, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 
-from . import web_services
+from . import jobs, web_services
+from .asset_naming import is_content_addressed_asset
 from .config import TEMP_BASE_DIR, load_server_config
 from .file_safety import get_session_paths, safe_child_path, sanitize_name
+from .fonts import warm_up_fonts_in_background
 from .logging_setup import configure_logging
+from .themes import THEMES, build_style
+
+
+# 按内容寻址的生成资源文件名随内容变化，可以让浏览器永久缓存。
+IMMUTABLE_ASSET_MAX_AGE = 365 * 24 * 3600
 
 
 def create_app():
@@ -22,6 +30,7 @@ def create_app():
     configure_logging(flask_app)
     os.makedirs(TEMP_BASE_DIR, exist_ok=True)
     register_routes(flask_app)
+    warm_up_fonts_in_background(build_style(theme) for theme in THEMES)
     return flask_app
 
 
@@ -59,6 +68,43 @@ def register_routes(flask_app):
         data = request.get_json(silent=True) or {}
         return web_services.generate_social_image(data)
 
+    @flask_app.route('/api/jobs/<kind>', methods=['POST'])
+    def submit_generation_job(kind):
+        data = request.get_json(silent=True) or {}
+        try:
+            return jsonify(web_services.submit_generation_job(kind, data))
+        except ValueError as e:
+            return error_response(flask_app, e, 400)
+        except jobs.JobQueueFull as e:
+            return error_response(flask_app, e, 429)
+
+    @flask_app.route('/api/jobs/<job_id>', methods=['GET'])
+    @json_api
+    def generation_job_status(job_id):
+        return web_services.generation_job_status(job_id)
+
+    @flask_app.route('/api/jobs/<job_id>/events', methods=['GET'])
+    def generation_job_events(job_id):
+        job = jobs.get_job(job_id)
+        if job is None:
+            return error_response(flask_app, FileNotFoundError(f"任务不存在或已过期：{job_id}"), 404)
+        # 浏览器 EventSource 断线重连时带上 Last-Event-ID，从下一个事件继续
+        try:
+            after = int(request.headers.get('Last-Event-ID', request.args.get('after', -1)))
+        except ValueError:
+            after = -1
+        return Response(
+            stream_with_context(jobs.sse_events(job, after)),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @flask_app.route('/api/social_layout', methods=['POST'])
+    @json_api
+    def social_layout():
+        data = request.get_json(silent=True) or {}
+        return web_services.social_layout(data)
+
     @flask_app.route('/api/publish', methods=['POST'])
     @json_api
     def publish():
@@ -71,8 +117,14 @@ def register_routes(flask_app):
 
     @flask_app.route('/output/<path:session_id>/<path:filename>/<path:filepath>')
     def serve_output_session(session_id, filename, filepath):
+        if web_services.is_social_zip_path(filepath):
+            return social_zip_response(session_id, filename, filepath)
         _, output_dir = get_session_paths(session_id)
         target_dir = safe_child_path(output_dir, sanitize_name(filename, 'untitled'))
+        if is_content_addressed_asset(filepath):
+            response = send_from_directory(target_dir, filepath, max_age=IMMUTABLE_ASSET_MAX_AGE)
+            response.cache_control.immutable = True
+            return response
         return send_from_directory(target_dir, filepath)
 
     @flask_app.route('/api/upload_image', methods=['POST'])
@@ -125,6 +177,21 @@ def register_routes(flask_app):
         }
 
 
+def social_zip_response(session_id, filename, zip_name):
+    """文字图 ZIP 在下载时才打包：缓存有效时直接发送文件，否则边打包边分块发送。"""
+    try:
+        zip_path, chunks = web_services.open_social_zip(session_id, filename, zip_name)
+    except FileNotFoundError:
+        abort(404)
+    if zip_path:
+        return send_file(zip_path, mimetype='application/zip', as_attachment=True, download_name=zip_name)
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/zip',
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(zip_name)}"},
+    )
+
+
 def error_response(flask_app, error, status_code):
     if status_code >= 500:
         flask_app.logger.exception(error)
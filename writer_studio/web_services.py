@@ -1,3 +1,5 @@
+import io
+import json
 import os
 import re
 import subprocess
@@ -6,9 +8,9 @@ import uuid
 import zipfile
 
 import app
-from PIL import Image
 from scripts.plugins import blog_publisher
 
+from . import jobs
 from .artifacts import html_artifact, image_artifact, output_url, zip_artifact
 from .config import ALLOWED_IMAGE_EXTENSIONS, ALLOWED_THEMES, load_server_config
 from .file_safety import (
@@ -17,16 +19,19 @@ from .file_safety import (
     sanitize_name,
     sanitize_session_id,
 )
+from .image_cache import image_size
 from .obsidian import (
     list_markdown_files as list_obsidian_markdown_files,
     load_markdown_file as load_obsidian_markdown_file,
 )
-from .renderers.social_cards import create_social_cards
+from .renderers.social_cards import SOCIAL_PREVIEW_SCALE, create_social_cards, layout_social_cards
 from .themes import build_style
 from .wechat_publisher import WeChatPublisher
 
 
-GENERATION_LOCK = threading.Lock()
+# 生成过程不再共享全局渲染状态，只需保证同一输出目录不会被两个请求同时重建。
+OUTPUT_FOLDER_LOCKS = {}
+OUTPUT_FOLDER_LOCKS_GUARD = threading.Lock()
 MARKDOWN_IMAGE_PATTERN = re.compile(r'^!\[(.*?)\]\((.*?)\)(?:\{[^}]*\})?$')
 SOCIAL_PRESETS = {
     "balanced": {
@@ -78,7 +83,13 @@ def normalize_theme(theme):
     return theme_name if theme_name in ALLOWED_THEMES else 'black_gold'
 
 
-def generate_preview(data):
+def output_folder_lock(output_folder):
+    key = os.path.abspath(output_folder)
+    with OUTPUT_FOLDER_LOCKS_GUARD:
+        return OUTPUT_FOLDER_LOCKS.setdefault(key, threading.Lock())
+
+
+def generate_preview(data, progress=None):
     filename = sanitize_name(data.get('filename', 'untitled'), 'untitled')
     session_id = str(data.get('session_id') or '').strip()
     theme = normalize_theme(data.get('theme'))
@@ -94,13 +105,14 @@ def generate_preview(data):
     with open(md_path, 'w', encoding='utf-8') as f:
         f.write(content)
 
-    with GENERATION_LOCK:
+    with output_folder_lock(safe_child_path(output_dir, filename)):
         app.main(
             target_md=md_file,
             input_dir=input_dir,
             output_dir=output_dir,
             theme=theme,
             author_name=author_name,
+            progress=progress,
         )
 
     preview_html = find_preview_html(output_dir, filename)
@@ -120,34 +132,28 @@ def generate_preview(data):
     }
 
 
-def generate_social_image(data):
-    filename = sanitize_name(data.get('filename', 'untitled'), 'untitled')
-    session_id = str(data.get('session_id') or '').strip()
-    theme = normalize_theme(data.get('theme'))
-    author_name = str(data.get('author_name') or '作者').strip()
-    content = data.get('content') or ''
-
-    input_dir, output_dir = get_session_paths(session_id)
-    output_folder = safe_child_path(output_dir, filename)
-    assets_dir = safe_child_path(output_folder, "assets")
-    os.makedirs(assets_dir, exist_ok=True)
-
-    style = build_style(theme, author_name)
-    apply_social_brand_overrides(style, data)
-    social_preset = normalize_social_preset(data.get('social_preset'))
-    apply_social_preset(style, social_preset)
-    layout_overrides = normalize_layout_overrides(data.get('social_layout_overrides'))
-    block_controls = normalize_block_controls(data.get('social_block_controls'))
-    quality_checks = build_social_quality_checks(content, [input_dir, assets_dir])
-    image_paths, page_layout = create_social_cards(
-        content,
-        assets_dir,
-        style,
-        image_dirs=[input_dir, assets_dir],
-        layout_overrides=layout_overrides,
-        block_controls=block_controls,
-        return_metadata=True,
-    )
+def generate_social_image(data, progress=None):
+    social = prepare_social_request(data)
+    filename, session_id, content = social["filename"], social["session_id"], social["content"]
+    image_dirs = [social["input_dir"], social["assets_dir"]]
+    quality_checks = build_social_quality_checks(content, image_dirs)
+    preview_scale = social["style"].get("social_preview_scale", SOCIAL_PREVIEW_SCALE) if social["quality"] == "preview" else None
+    with output_folder_lock(social["output_folder"]):
+        os.makedirs(social["assets_dir"], exist_ok=True)
+        image_paths, page_layout, image_changed = create_social_cards(
+            content,
+            social["assets_dir"],
+            social["style"],
+            image_dirs=image_dirs,
+            layout_overrides=social["layout_overrides"],
+            block_controls=social["block_controls"],
+            return_metadata=True,
+            reuse_pages=True,
+            preview_scale=preview_scale,
+            progress=progress,
+        )
+        # 草稿预览不提供 ZIP；全尺寸导出只记下页面列表，ZIP 在下载时才打包
+        zip_name = save_social_pages(social["output_folder"], image_paths, filename) if not preview_scale else None
     image_names = [os.path.basename(path) for path in image_paths]
 
     image_urls = [
@@ -155,26 +161,106 @@ def generate_social_image(data):
         for image_name in image_names
     ]
     artifacts = [
-        image_artifact(url, image_name, index=index, total=len(image_urls))
-        for index, (url, image_name) in enumerate(zip(image_urls, image_names), start=1)
+        image_artifact(url, image_name, index=index, total=len(image_urls), changed=changed)
+        for index, (url, image_name, changed) in enumerate(zip(image_urls, image_names, image_changed), start=1)
     ]
-    zip_name = create_social_zip(output_folder, image_paths, filename)
-    zip_url = output_url(session_id, filename, zip_name)
-    artifacts.append(zip_artifact(zip_url, zip_name, count=len(image_paths)))
-    quality_checks.extend(build_social_post_checks(content, image_paths))
+    zip_url = output_url(session_id, filename, zip_name) if zip_name else ""
+    if zip_name:
+        artifacts.append(zip_artifact(zip_url, zip_name, count=len(image_paths)))
+    quality_checks.extend(build_social_post_checks(content, len(image_paths)))
     return {
         "status": "success",
         "image_url": image_urls[0],
         "image_urls": image_urls,
+        "image_changed": image_changed,
         "zip_url": zip_url,
         "zip_filename": zip_name,
         "page_count": len(image_urls),
+        "quality": social["quality"],
         "output_type": "social_cards",
         "artifacts": artifacts,
         "quality_checks": quality_checks,
         "page_layout": page_layout,
+        "social_preset": social["social_preset"],
+        "message": f"文字图{'预览' if preview_scale else ''}已生成，共 {len(image_urls)} 张",
+    }
+
+
+# 可以放进后台任务队列的生成接口：提交后立即返回任务 id，进度通过 SSE 推送，结果与同步接口相同
+GENERATION_JOBS = {
+    "save_and_generate": generate_preview,
+    "generate_social_image": generate_social_image,
+}
+
+
+def submit_generation_job(kind, data):
+    handler = GENERATION_JOBS.get(kind)
+    if handler is None:
+        raise ValueError(f"未知的生成任务：{kind}")
+    job = jobs.submit_job(kind, handler, data)
+    return {
+        "status": "success",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+    }
+
+
+def generation_job_status(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise FileNotFoundError(f"任务不存在或已过期：{job_id}")
+    return {"status": "success", **job.snapshot()}
+
+
+def social_layout(data):
+    """只分页不绘图：返回分页摘要和排版检查，供调整块顺序、分页控制时实时刷新。"""
+    social = prepare_social_request(data)
+    content = social["content"]
+    image_dirs = [social["input_dir"], social["assets_dir"]]
+    _, page_count, page_layout = layout_social_cards(
+        content,
+        social["style"],
+        image_dirs=image_dirs,
+        layout_overrides=social["layout_overrides"],
+        block_controls=social["block_controls"],
+    )
+    quality_checks = build_social_quality_checks(content, image_dirs)
+    quality_checks.extend(build_social_post_checks(content, page_count))
+    return {
+        "status": "success",
+        "page_count": page_count,
+        "page_layout": page_layout,
+        "quality_checks": quality_checks,
+        "social_preset": social["social_preset"],
+    }
+
+
+def prepare_social_request(data):
+    filename = sanitize_name(data.get('filename', 'untitled'), 'untitled')
+    session_id = str(data.get('session_id') or '').strip()
+    theme = normalize_theme(data.get('theme'))
+    author_name = str(data.get('author_name') or '作者').strip()
+
+    input_dir, output_dir = get_session_paths(session_id)
+    output_folder = safe_child_path(output_dir, filename)
+
+    style = build_style(theme, author_name)
+    apply_social_brand_overrides(style, data)
+    social_preset = normalize_social_preset(data.get('social_preset'))
+    apply_social_preset(style, social_preset)
+    return {
+        "filename": filename,
+        "session_id": session_id,
+        "content": data.get('content') or '',
+        "input_dir": input_dir,
+        "output_folder": output_folder,
+        "assets_dir": safe_child_path(output_folder, "assets"),
+        "style": style,
         "social_preset": social_preset,
-        "message": f"文字图已生成，共 {len(image_urls)} 张",
+        "layout_overrides": normalize_layout_overrides(data.get('social_layout_overrides')),
+        "block_controls": normalize_block_controls(data.get('social_block_controls')),
+        "quality": normalize_social_quality(data.get('quality')),
     }
 
 
@@ -196,6 +282,11 @@ def normalize_social_preset(preset):
     return preset_name if preset_name in SOCIAL_PRESETS else 'balanced'
 
 
+def normalize_social_quality(quality):
+    """preview 按比例绘制草稿页供编辑器预览；其余一律按全尺寸导出。"""
+    return 'preview' if str(quality or '').strip() == 'preview' else 'full'
+
+
 def apply_social_preset(style, preset):
     style.update(SOCIAL_PRESETS.get(preset, SOCIAL_PRESETS["balanced"])["style"])
 
@@ -243,15 +334,112 @@ def clamp_number(value, minimum, maximum, default):
     return max(minimum, min(maximum, number))
 
 
-def create_social_zip(output_folder, image_paths, filename):
-    zip_name = f"{sanitize_name(filename, 'social_cards')}_social_cards.zip"
-    zip_path = safe_child_path(output_folder, zip_name)
-    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
-        for image_path in image_paths:
-            archive.write(image_path, arcname=os.path.basename(image_path))
+# 文字图 ZIP 不在生成时打包：生成只记下页面列表，下载时按列表从页面文件流式打包（ZIP_STORED，
+# PNG 几乎压缩不动），边发送边写入缓存文件；页面列表不变时直接发送缓存的 ZIP。
+SOCIAL_ZIP_SUFFIX = "_social_cards.zip"
+SOCIAL_PAGES_NAME = ".social_cards.json"
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+def save_social_pages(output_folder, image_paths, filename):
+    """记录导出页面的顺序，返回下载时使用的 ZIP 文件名。"""
+    base_name = sanitize_name(filename, 'social_cards')
+    zip_name = f"{base_name}{SOCIAL_ZIP_SUFFIX}"
+    path = safe_child_path(output_folder, SOCIAL_PAGES_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "zip_name": zip_name,
+            "base_name": base_name,
+            "pages": [os.path.relpath(path, output_folder) for path in image_paths],
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
     return zip_name
 
 
+def is_social_zip_path(filepath):
+    return "/" not in filepath and filepath.endswith(SOCIAL_ZIP_SUFFIX)
+
+
+def open_social_zip(session_id, filename, zip_name):
+    """返回 (缓存的 ZIP 路径, None)，或缓存已过期时返回 (None, 逐块产出 ZIP 字节的迭代器)。"""
+    _, output_dir = get_session_paths(session_id)
+    output_folder = safe_child_path(output_dir, sanitize_name(filename, 'untitled'))
+    with output_folder_lock(output_folder):
+        try:
+            with open(safe_child_path(output_folder, SOCIAL_PAGES_NAME), encoding='utf-8') as f:
+                pages = json.load(f)
+        except (OSError, ValueError):
+            raise FileNotFoundError(f"文字图尚未导出：{zip_name}")
+        if pages.get("zip_name") != zip_name:
+            raise FileNotFoundError(f"文字图尚未导出：{zip_name}")
+        page_paths = [safe_child_path(output_folder, page) for page in pages["pages"]]
+    missing = [path for path in page_paths if not os.path.isfile(path)]
+    if missing:
+        raise FileNotFoundError(f"文字图页面不存在：{os.path.basename(missing[0])}")
+
+    zip_path = safe_child_path(output_folder, zip_name)
+    # 页面按内容寻址命名，页面列表写进 zip 注释；列表没变说明每页内容都没变，直接复用缓存的 zip。
+    pages_comment = "\n".join(os.path.basename(path) for path in page_paths).encode('utf-8')
+    if read_zip_comment(zip_path) == pages_comment:
+        return zip_path, None
+    return None, stream_social_zip(zip_path, page_paths, pages["base_name"], pages_comment)
+
+
+def stream_social_zip(zip_path, page_paths, base_name, comment):
+    """按 ZIP_STORED 逐块产出 ZIP，同时写入临时文件，完整发送后才替换缓存；中途断开则丢弃临时文件。"""
+    tmp_path = f"{zip_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as cache_file:
+        sink = ZipChunkSink(cache_file)
+        try:
+            with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+                for index, page_path in enumerate(page_paths, start=1):
+                    info = zipfile.ZipInfo.from_file(page_path, arcname=f"{base_name}_{index:02d}.png")
+                    with open(page_path, 'rb') as page, archive.open(info, 'w') as entry:
+                        for chunk in iter(lambda: page.read(ZIP_CHUNK_SIZE), b''):
+                            entry.write(chunk)
+                            yield from sink.drain()
+                archive.comment = comment
+            yield from sink.drain()
+        except BaseException:
+            cache_file.close()
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, zip_path)
+
+
+class ZipChunkSink(io.RawIOBase):
+    """不可 seek 的写入端：zipfile 写入的字节暂存起来等待发送，同时写入缓存文件。"""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.cache_file.write(data)
+        self.chunks.append(data)
+        return len(data)
+
+    def drain(self):
+        """取出已写入的字节，没有新数据时不产出（空块在分块传输里表示结束）。"""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        if data:
+            yield data
+
+
+def read_zip_comment(zip_path):
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            return archive.comment
+    except (OSError, zipfile.BadZipFile):
+        return None
+
+
 def build_social_quality_checks(content, image_dirs):
     checks = []
     images = extract_markdown_images(content)
@@ -270,8 +458,7 @@ def build_social_quality_checks(content, image_dirs):
             checks.append(quality_check('error', f'找不到图片：{image["src"]}'))
             continue
         try:
-            with Image.open(image_path) as source:
-                width, height = source.size
+            width, height = image_size(image_path)
         except Exception:
             checks.append(quality_check('error', f'图片无法读取：{image["src"]}'))
             continue
@@ -282,9 +469,8 @@ def build_social_quality_checks(content, image_dirs):
     return checks
 
 
-def build_social_post_checks(content, image_paths):
+def build_social_post_checks(content, page_count):
     checks = []
-    page_count = len(image_paths)
     if page_count > 9:
         checks.append(quality_check('warning', f'已生成 {page_count} 张，接近小红书多图发布上限，建议检查是否需要拆成两篇。'))
     elif page_count >= 6: